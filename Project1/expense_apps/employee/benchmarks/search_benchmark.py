@@ -0,0 +1,125 @@
+"""
+Benchmark of expense description search: the FTS5 index against LIKE '%q%'.
+
+Builds a throwaway database with the application's schema and triggers, loads
+--rows expenses spread over --users users, then times user-scoped searches
+through ApprovalRepository.search_expense_fields and through the equivalent
+LIKE query, reporting the median of --repeat runs per query.
+
+Usage (from the employee app directory; 1M rows take a few minutes to load):
+    python benchmarks/search_benchmark.py --rows 1000000 --users 10
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.repository import ApprovalRepository, DatabaseConnection, EXPENSE_FIELDS  # noqa: E402
+
+
+COMMON_WORDS = ['client', 'lunch', 'dinner', 'taxi', 'hotel', 'flight', 'parking', 'supplies', 'conference',
+                'train', 'mileage', 'software', 'subscription', 'training', 'meeting', 'office']
+
+LIKE_SQL = '''
+    SELECT e.id AS id, e.amount AS amount, e.description AS description, e.date AS date,
+           e.approval_status AS status, e.approval_comment AS comment, e.approval_review_date AS review_date
+    FROM expenses e
+    WHERE e.user_id = ? AND e.description LIKE ?
+    ORDER BY e.date DESC
+    LIMIT ?
+'''
+
+
+def vocabulary(size: int, rng: random.Random) -> list:
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return COMMON_WORDS + [''.join(rng.choice(letters) for _ in range(rng.randint(5, 9))) for _ in range(size)]
+
+
+def pick_word(words: list, rng: random.Random) -> str:
+    # About a third of words are everyday ones, so common terms match many rows
+    return rng.choice(COMMON_WORDS) if rng.random() < 0.3 else rng.choice(words)
+
+
+def load(db: DatabaseConnection, rows: int, users: int, seed: int) -> list:
+    """Insert users, expenses and pending approvals through the live triggers; return the vocabulary."""
+    rng = random.Random(seed)
+    words = vocabulary(5000, rng)
+    conn = db.get_connection()
+    conn.executemany("INSERT INTO users (id, username, password, role) VALUES (?, ?, 'x', 'Employee')",
+                     [(user_id, f'bench{user_id}') for user_id in range(1, users + 1)])
+    batch = 10000
+    for start in range(1, rows + 1, batch):
+        ids = range(start, min(start + batch, rows + 1))
+        conn.executemany(
+            "INSERT INTO expenses (id, user_id, amount, description, date) VALUES (?, ?, ?, ?, ?)",
+            [(expense_id, rng.randint(1, users), round(rng.uniform(1, 500), 2),
+              ' '.join(pick_word(words, rng) for _ in range(rng.randint(2, 6))),
+              f'20{rng.randint(20, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}')
+             for expense_id in ids])
+        conn.executemany("INSERT INTO approvals (expense_id, status) VALUES (?, 'pending')",
+                         [(expense_id,) for expense_id in ids])
+        conn.commit()
+        print(f'  loaded {ids[-1]:,} rows', end='\r', flush=True)
+    print()
+    conn.close()
+    return words
+
+
+def median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db', help='Database file to create (default: a temporary file)')
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='search-bench-'), 'bench.db')
+    db = DatabaseConnection(path)
+    db.initialize_database()
+    print(f'Loading {args.rows:,} expenses for {args.users} users into {path}')
+    started = time.perf_counter()
+    words = load(db, args.rows, args.users, args.seed)
+    print(f'Loaded in {time.perf_counter() - started:.1f}s')
+
+    repository = ApprovalRepository(db)
+    fields = tuple(EXPENSE_FIELDS)
+    rare = words[len(COMMON_WORDS) + 7]
+    queries = [
+        ('common word', ['lunch']),
+        ('rare word', [rare]),
+        ('two words', ['client', 'dinner']),
+        ('prefix', [rare[:4]]),
+        ('no match', ['zzzzzzzz'])
+    ]
+    like_conn = db.get_connection()
+
+    print(f"\n{'query':<12} {'fts5 ms':>10} {'like ms':>10} {'speedup':>9} {'rows':>6}")
+    for label, terms in queries:
+        match = ' '.join(f'"{term}"*' for term in terms)
+        # LIKE can only look for the words as one phrase; use the first, as a client-side filter would
+        pattern = f'%{terms[0]}%'
+        found = repository.search_expense_fields(1, match, fields, args.limit)
+        fts = median_ms(lambda: repository.search_expense_fields(1, match, fields, args.limit), args.repeat)
+        like = median_ms(lambda: like_conn.execute(LIKE_SQL, (1, pattern, args.limit)).fetchall(), args.repeat)
+        print(f'{label:<12} {fts:>10.2f} {like:>10.2f} {like / fts:>8.1f}x {len(found):>6}')
+    like_conn.close()
+
+
+if __name__ == '__main__':
+    main()
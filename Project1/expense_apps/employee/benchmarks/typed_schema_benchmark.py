@@ -0,0 +1,144 @@
+"""
+Benchmark of the typed expense indexes: integer date_day/amount_cents against date text/amount reals.
+
+Builds a throwaway database with the application's schema, loads --rows
+expenses spread over --users users, then adds the (user_id, date) and
+(user_id, amount) indexes the typed ones replaced, and a plain (user_id,
+date_day) one, which the wider list index has since taken over. Reports each
+index's size from dbstat and the median of --repeat runs of user-scoped
+range scans through either index (forced with INDEXED BY).
+
+Usage (from the employee app directory; 1M rows take a few minutes to load):
+    python benchmarks/typed_schema_benchmark.py --rows 1000000 --users 10
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.repository import DatabaseConnection  # noqa: E402
+
+
+COMPARED_INDEXES = {
+    'idx_expenses_user_date': 'CREATE INDEX idx_expenses_user_date ON expenses (user_id, date)',
+    'idx_expenses_user_amount': 'CREATE INDEX idx_expenses_user_amount ON expenses (user_id, amount)',
+    'idx_expenses_user_day': 'CREATE INDEX IF NOT EXISTS idx_expenses_user_day ON expenses (user_id, date_day)'
+}
+
+# label: (text/real query, typed query, text/real params, typed params); user_id is bound first
+RANGE_SCANS = {
+    'one month': (
+        'SELECT COUNT(*) FROM expenses INDEXED BY idx_expenses_user_date '
+        'WHERE user_id = ? AND date BETWEEN ? AND ?',
+        'SELECT COUNT(*) FROM expenses INDEXED BY idx_expenses_user_day '
+        'WHERE user_id = ? AND date_day BETWEEN ? AND ?',
+        ('2024-03-01', '2024-03-31'), (19783, 19813)),
+    'one year': (
+        'SELECT COUNT(*) FROM expenses INDEXED BY idx_expenses_user_date '
+        'WHERE user_id = ? AND date BETWEEN ? AND ?',
+        'SELECT COUNT(*) FROM expenses INDEXED BY idx_expenses_user_day '
+        'WHERE user_id = ? AND date_day BETWEEN ? AND ?',
+        ('2024-01-01', '2024-12-31'), (19723, 20088)),
+    'amount band': (
+        'SELECT COUNT(*) FROM expenses INDEXED BY idx_expenses_user_amount '
+        'WHERE user_id = ? AND amount BETWEEN ? AND ?',
+        'SELECT COUNT(*) FROM expenses INDEXED BY idx_expenses_user_cents '
+        'WHERE user_id = ? AND amount_cents BETWEEN ? AND ?',
+        (100.0, 250.0), (10000, 25000)),
+    'latest 50': (
+        'SELECT id FROM expenses INDEXED BY idx_expenses_user_date '
+        'WHERE user_id = ? ORDER BY date DESC, id DESC LIMIT 50',
+        'SELECT id FROM expenses INDEXED BY idx_expenses_user_day '
+        'WHERE user_id = ? ORDER BY date_day DESC, id DESC LIMIT 50',
+        (), ())
+}
+
+
+def load(db: DatabaseConnection, rows: int, users: int, seed: int):
+    """Insert users, expenses and pending approvals through the live triggers."""
+    rng = random.Random(seed)
+    conn = db.get_connection()
+    conn.executemany("INSERT INTO users (id, username, password, role) VALUES (?, ?, 'x', 'Employee')",
+                     [(user_id, f'bench{user_id}') for user_id in range(1, users + 1)])
+    batch = 10000
+    for start in range(1, rows + 1, batch):
+        ids = range(start, min(start + batch, rows + 1))
+        conn.executemany(
+            "INSERT INTO expenses (id, user_id, amount, description, date) VALUES (?, ?, ?, 'Expense', ?)",
+            [(expense_id, rng.randint(1, users), round(rng.uniform(1, 500), 2),
+              f'20{rng.randint(20, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}')
+             for expense_id in ids])
+        conn.executemany("INSERT INTO approvals (expense_id, status) VALUES (?, 'pending')",
+                         [(expense_id,) for expense_id in ids])
+        conn.commit()
+        print(f'  loaded {ids[-1]:,} rows', end='\r', flush=True)
+    print()
+    conn.close()
+
+
+def index_sizes(conn, names) -> dict:
+    """Bytes of b-tree pages per index, from the dbstat virtual table."""
+    placeholders = ', '.join('?' * len(names))
+    return dict(conn.execute(f"SELECT name, SUM(pgsize) FROM dbstat WHERE name IN ({placeholders}) GROUP BY name",
+                             tuple(names)).fetchall())
+
+
+def median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db', help='Database file to create (default: a temporary file)')
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='typed-bench-'), 'bench.db')
+    db = DatabaseConnection(path)
+    db.initialize_database()
+    print(f'Loading {args.rows:,} expenses for {args.users} users into {path}')
+    started = time.perf_counter()
+    load(db, args.rows, args.users, args.seed)
+    print(f'Loaded in {time.perf_counter() - started:.1f}s')
+
+    conn = db.get_connection()
+    for sql in COMPARED_INDEXES.values():
+        conn.execute(sql)
+    conn.commit()
+
+    sizes = index_sizes(conn, ['idx_expenses_user_date', 'idx_expenses_user_day',
+                               'idx_expenses_user_amount', 'idx_expenses_user_cents'])
+    print(f"\n{'index':<26} {'MiB':>8}")
+    for name, size in sizes.items():
+        print(f'{name:<26} {size / 2 ** 20:>8.2f}')
+    print(f"date text -> date_day:    {sizes['idx_expenses_user_date'] / sizes['idx_expenses_user_day']:.2f}x smaller")
+    print(f"amount real -> cents:     {sizes['idx_expenses_user_amount'] / sizes['idx_expenses_user_cents']:.2f}x "
+          f"smaller")
+
+    print(f"\n{'range scan':<12} {'text ms':>10} {'typed ms':>10} {'speedup':>9} {'rows':>8}")
+    for label, (legacy_sql, typed_sql, legacy_params, typed_params) in RANGE_SCANS.items():
+        legacy_rows = conn.execute(legacy_sql, (1,) + legacy_params).fetchall()
+        typed_rows = conn.execute(typed_sql, (1,) + typed_params).fetchall()
+        assert legacy_rows == typed_rows, f'{label}: indexes disagree'
+        legacy = median_ms(lambda: conn.execute(legacy_sql, (1,) + legacy_params).fetchall(), args.repeat)
+        typed = median_ms(lambda: conn.execute(typed_sql, (1,) + typed_params).fetchall(), args.repeat)
+        count = typed_rows[0][0] if label != 'latest 50' else len(typed_rows)
+        print(f'{label:<12} {legacy:>10.2f} {typed:>10.2f} {legacy / typed:>8.1f}x {count:>8,}')
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,64 @@
 """
 Main Flask application with dependency injection setup.
 """
+import os
+import click
 from flask import Flask
 from src.repository import (
     DatabaseConnection, 
+    DatabaseExecutor,
     UserRepository, 
     ExpenseRepository, 
-    ApprovalRepository
+    ApprovalRepository,
+    IdempotencyRepository
 )
-from src.service import AuthenticationService, ExpenseService
-from src.api import auth_bp, expense_bp
+from src.service import (
+    AuthenticationService,
+    ExpenseService,
+    ExpenseCache,
+    ChangeNotifier,
+    IdempotencyStore,
+    ReadinessService,
+    ReadinessThresholds
+)
+from src.api import (
+    auth_bp, expense_bp, debug_bp, AsgiApp, init_load_shedding, init_unit_of_work, init_query_deadlines
+)
+from src.monitoring import init_server_timing, init_metrics, init_request_profiling, StackSampler, MemoryTracker
+
+
+SECRET_KEY = 'your-secret-key-change-this-in-production'
+
+
+def create_expense_cache(db_connection: DatabaseConnection):
+    """Build the per-user expense read cache, or None when EXPENSE_CACHE_ENABLED is false."""
+    if os.getenv('EXPENSE_CACHE_ENABLED', 'true').lower() != 'true':
+        return None
+    
+    # Change events carry commits by the Java manager app to the users they affect
+    return ExpenseCache(
+        max_entries=int(os.getenv('EXPENSE_CACHE_MAX_ENTRIES', '1024')),
+        max_bytes=int(os.getenv('EXPENSE_CACHE_MAX_BYTES', str(16 * 1024 * 1024))),
+        ttl=float(os.getenv('EXPENSE_CACHE_TTL', '30')),
+        changes=db_connection.change_detector()
+    )
+
+
+def create_idempotency_store(db_connection: DatabaseConnection) -> IdempotencyStore:
+    """Build the store that replays retried expense submissions carrying an Idempotency-Key."""
+    return IdempotencyStore(
+        IdempotencyRepository(db_connection),
+        ttl=float(os.getenv('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600))),
+        cache_size=int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '10000'))
+    )
+
+
+def events_stream_cap(threads: int):
+    """Open event streams allowed per worker: EVENTS_MAX_STREAMS, else half of `threads` (None: no cap)."""
+    configured = int(os.getenv('EVENTS_MAX_STREAMS', '0'))
+    if configured:
+        return configured
+    return max(1, threads // 2) if threads else None
 
 
 def create_app():
@@ -17,7 +66,7 @@ def create_app():
     app = Flask(__name__, static_folder='src/static')
     
     # Configure Flask
-    app.config['SECRET_KEY'] = 'your-secret-key-change-this-in-production'
+    app.config['SECRET_KEY'] = SECRET_KEY
     app.config['JSON_SORT_KEYS'] = False
     
     # Initialize database connection
@@ -32,21 +81,86 @@ def create_app():
     # Initialize services
     jwt_secret_key = app.config['SECRET_KEY']  # Use Flask's secret key for JWT
     auth_service = AuthenticationService(user_repository, jwt_secret_key)
-    expense_service = ExpenseService(expense_repository, approval_repository)
+    expense_service = ExpenseService(expense_repository, approval_repository,
+                                     create_expense_cache(db_connection),
+                                     create_idempotency_store(db_connection))
+    
+    readiness_service = ReadinessService(
+        db_connection,
+        ReadinessThresholds.from_env(),
+        interval_ms=float(os.getenv('READY_PROBE_INTERVAL_MS', '1000')),
+        capacity=int(os.getenv('SERVER_THREADS', '0')) or None
+    )
+    
+    # One change poller per worker feeds every /api/expenses/events stream
+    change_notifier = ChangeNotifier(
+        db_connection.change_detector(),
+        interval=float(os.getenv('EVENTS_POLL_INTERVAL_MS', '500')) / 1000,
+        # Each open stream holds a request thread; leave some for everything else
+        max_listeners=events_stream_cap(int(os.getenv('SERVER_THREADS', '0')))
+    )
+    app.config['EVENTS_HEARTBEAT_SECONDS'] = float(os.getenv('EVENTS_HEARTBEAT_SECONDS', '15'))
+    app.config['EVENTS_MAX_SECONDS'] = float(os.getenv('EVENTS_MAX_SECONDS', '300'))
     
     # Inject services into Flask app context
     app.auth_service = auth_service
     app.expense_service = expense_service
+    app.readiness_service = readiness_service
+    app.change_notifier = change_notifier
+    
+    # Report auth/service/db/json time per request in a Server-Timing header
+    init_server_timing(app)
+    
+    # Per-route request counts, latency and errors at /metrics
+    init_metrics(app)
+    
+    # cProfile individual requests on demand (no-op unless PROFILE_REQUESTS_DIR is set)
+    init_request_profiling(app)
     
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(expense_bp)
     
+    # Shed load in front of the blueprints instead of queueing on the SQLite lock
+    init_load_shedding(app, blueprints=(auth_bp.name, expense_bp.name))
+    
+    # Abort statements past their route class's database budget and answer 504
+    init_query_deadlines(app, blueprints=(auth_bp.name, expense_bp.name))
+    
+    # One connection and transaction per admitted request, committed on success
+    init_unit_of_work(app, db_connection, read_only_endpoints=('auth.login', 'auth.logout'))
+    
+    # Diagnostics endpoints under /debug, off unless explicitly enabled
+    if os.getenv('DEBUG_ENDPOINTS', 'false').lower() == 'true':
+        app.stack_sampler = StackSampler(hz=float(os.getenv('PROFILE_SAMPLE_HZ', '100')))
+        app.memory_tracker = MemoryTracker()
+        app.register_blueprint(debug_bp)
+    
+    # `flask --app main rebuild-summary [--check]` verifies expense_summary and repairs drift
+    @app.cli.command('rebuild-summary')
+    @click.option('--check', is_flag=True, help='Only report drift; exit 1 if there is any.')
+    def rebuild_summary(check):
+        """Recompute the per-user expense summary from expenses and approvals."""
+        drift = expense_repository.verify_summary(repair=not check)
+        if not drift:
+            click.echo('expense_summary is consistent')
+        elif check:
+            click.echo(f'expense_summary has {drift} drifted rows')
+            raise SystemExit(1)
+        else:
+            click.echo(f'expense_summary rebuilt, {drift} drifted rows repaired')
+    
     # Add basic health check endpoint
     @app.route('/health')
     def health_check():
         return {'status': 'healthy', 'message': 'Employee Expense Management API is running'}
     
+    # Readiness: cached DB probe plus load thresholds, 503 when this worker should be skipped
+    @app.route('/health/ready')
+    def readiness_check():
+        ready, report = app.readiness_service.check()
+        return {'status': 'ready' if ready else 'not ready', **report}, 200 if ready else 503
+    
     # Add basic API info endpoint
     @app.route('/api')
     def api_info():
@@ -74,6 +188,18 @@ def create_app():
     return app
 
 
+def create_asgi_app():
+    """Create the ASGI application: the Flask app, its requests run on a bounded thread pool."""
+    # Connections, keep-alives and request bodies stay on the event loop; each request
+    # that has arrived takes one of DB_POOL_SIZE threads to run through the Flask app
+    pool_size = int(os.getenv('DB_POOL_SIZE', '8'))
+    app = create_app()
+    # An event stream holds its pool thread between chunks
+    app.change_notifier.max_listeners = events_stream_cap(pool_size)
+    # Bodies are read into memory before Flask sees them, so they are capped there
+    return AsgiApp(app, DatabaseExecutor(max_workers=pool_size), max_body_size=app.config.get('MAX_CONTENT_LENGTH'))
+
+
 def create_sample_data():
     """Create sample users for testing (call this manually if needed)."""
     from src.repository import DatabaseConnection, User, UserRepository
@@ -109,7 +235,11 @@ if __name__ == '__main__':
     print("  POST /api/auth/logout - Employee logout")
     print("  GET  /api/auth/status - Check auth status")
     print("  POST /api/expenses - Submit new expense")
-    print("  GET  /api/expenses - Get all user expenses")
+    print("  GET  /api/expenses - Get user expenses (filter by date, amount, status; sort by date or amount)")
+    print("  GET  /api/expenses/changes?since=<v> - Expenses changed since a version")
+    print("  GET  /api/expenses/events - Stream of review status changes (SSE)")
+    print("  GET  /api/expenses/summary - Counts and totals by status and month")
+    print("  GET  /api/expenses/search?q=<words> - Ranked search of expense descriptions")
     print("  GET  /api/expenses/<id> - Get specific expense")
     print("  PUT  /api/expenses/<id> - Update expense (if pending)")
     print("  DELETE /api/expenses/<id> - Delete expense (if pending)")
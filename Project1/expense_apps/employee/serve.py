@@ -0,0 +1,123 @@
+"""
+Production entry point: pre-forking multi-worker server for the API.
+
+The master builds the Flask app once (preload), freezes the garbage collector
+before each fork so the preloaded objects stay shared copy-on-write, and forks
+worker processes that accept from one shared listening socket. Workers use
+threads and keep HTTP/1.1 connections alive between requests.
+
+Signals handled by the master:
+    SIGHUP          reload: rebuild the app, start new workers, drain the old ones
+    SIGTERM         graceful shutdown: stop accepting, drain in-flight requests
+    SIGINT/SIGQUIT  fast shutdown
+    SIGTTIN/SIGTTOU add/remove one worker
+
+Each worker writes its metrics to METRICS_MULTIPROC_DIR (a fresh temporary
+directory unless set) so /metrics reports totals across all workers.
+
+Usage:
+    python serve.py --workers 4 --port 5000
+"""
+import argparse
+import gc
+import glob
+import os
+import sys
+import tempfile
+from gunicorn.app.base import BaseApplication
+
+from main import create_app
+
+
+def default_worker_count() -> int:
+    """Number of workers to run when none is configured: one per usable CPU."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def pre_fork(server, worker):
+    """Move everything allocated so far into the permanent generation before forking."""
+    gc.collect()
+    gc.freeze()
+
+
+class ExpenseApiServer(BaseApplication):
+    """Gunicorn application that preloads the Flask app in the master process."""
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return create_app()
+
+    def reload(self):
+        # Build a fresh app on SIGHUP instead of re-forking the old one
+        super().reload()
+        self.callable = None
+
+
+def build_options(args: argparse.Namespace) -> dict:
+    """Translate command line arguments into gunicorn settings."""
+    return {
+        'bind': f"{args.host}:{args.port}",
+        'workers': max(1, args.workers),
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'keepalive': args.keepalive,
+        'graceful_timeout': args.graceful_timeout,
+        'timeout': args.timeout,
+        'backlog': args.backlog,
+        'preload_app': True,
+        'pre_fork': pre_fork,
+        'accesslog': '-',
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Serve the Employee Expense Management API.')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=default_worker_count(),
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--threads', type=int, default=8,
+                        help='request threads per worker')
+    parser.add_argument('--keepalive', type=int, default=5,
+                        help='seconds to hold an idle keep-alive connection')
+    parser.add_argument('--graceful-timeout', type=int, default=30,
+                        help='seconds to let workers drain on reload/shutdown')
+    parser.add_argument('--timeout', type=int, default=30,
+                        help='seconds before a silent worker is killed and restarted')
+    parser.add_argument('--backlog', type=int, default=2048)
+    return parser.parse_args(argv)
+
+
+def prepare_metrics_dir() -> str:
+    """Point workers at a clean directory for their multiprocess metrics files."""
+    directory = os.getenv('METRICS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for stale in glob.glob(os.path.join(directory, 'metrics_*.json')):
+            os.remove(stale)
+    else:
+        directory = tempfile.mkdtemp(prefix='expense-metrics-')
+        os.environ['METRICS_MULTIPROC_DIR'] = directory
+    return directory
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    prepare_metrics_dir()
+    # Lets /health/ready report how many of a worker's threads are busy
+    os.environ['SERVER_THREADS'] = str(args.threads)
+    ExpenseApiServer(build_options(args)).run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
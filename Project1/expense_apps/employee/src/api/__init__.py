@@ -3,8 +3,18 @@ API package for Flask controllers.
 """
 from .auth_controller import auth_bp
 from .expense_controller import expense_bp
+from .debug_controller import debug_bp
+from .load_shedding import init_load_shedding
+from .transactions import init_unit_of_work
+from .query_deadlines import init_query_deadlines
+from .asgi_app import AsgiApp
 
 __all__ = [
     'auth_bp',
-    'expense_bp'
+    'expense_bp',
+    'debug_bp',
+    'AsgiApp',
+    'init_load_shedding',
+    'init_unit_of_work',
+    'init_query_deadlines'
 ]
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+ASGI application serving the Flask app, one request at a time per pool thread.
+
+The event loop accepts connections, keeps idle keep-alive clients and reads
+request bodies; only a request that has fully arrived takes a thread from the
+bounded DatabaseExecutor, where it runs through the Flask app with all of its
+routing, auth, error handling, unit of work, idempotency and load shedding.
+"""
+import asyncio
+import io
+import json
+import sys
+from typing import Callable, List, Optional, Tuple
+
+from src.repository.db_executor import DatabaseExecutor
+
+
+# Largest request body read into memory when the app sets no MAX_CONTENT_LENGTH
+DEFAULT_MAX_BODY_SIZE = 1024 * 1024
+
+
+def build_environ(scope: dict, body: bytes) -> dict:
+    """PEP 3333 environ for an ASGI HTTP scope and its request body."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue  # the body has already been read in full
+        key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class AsgiApp:
+    """ASGI callable running a WSGI app's requests on a bounded thread pool."""
+
+    def __init__(self, wsgi_app: Callable, db_executor: DatabaseExecutor, max_body_size: Optional[int] = None):
+        self.wsgi_app = wsgi_app
+        self.db_executor = db_executor
+        self.max_body_size = max_body_size or DEFAULT_MAX_BODY_SIZE
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        # Refused before any of it is read when the client announces it, else once it grows past the cap
+        declared = dict(scope.get('headers', [])).get(b'content-length', b'')
+        if declared.isdigit() and int(declared) > self.max_body_size:
+            await self._too_large(send)
+            return
+        chunks: List[bytes] = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_size:
+                await self._too_large(send)
+                return
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                break
+        body = b''.join(chunks)
+
+        # A client that goes away mid-stream stops an event stream at its next chunk
+        disconnected = asyncio.Event()
+        watcher = asyncio.ensure_future(self._watch_disconnect(receive, disconnected))
+        try:
+            await self._respond(build_environ(scope, body), send, disconnected)
+        finally:
+            watcher.cancel()
+
+    async def _respond(self, environ: dict, send: Callable, disconnected: asyncio.Event):
+        started: List[Tuple[int, List[Tuple[bytes, bytes]]]] = []
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            started[:] = [(int(status.split(' ', 1)[0]),
+                           [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers])]
+            return lambda data: None  # the legacy write() callable; Flask never uses it
+
+        chunks = await self.db_executor.run(self.wsgi_app, environ, start_response)
+        iterator = iter(chunks)
+        try:
+            status, headers = started[0]
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+            while not disconnected.is_set():
+                chunk = await self.db_executor.run(next, iterator, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            close: Optional[Callable] = getattr(chunks, 'close', None)
+            if close is not None:
+                await self.db_executor.run(close)
+
+    async def _too_large(self, send: Callable):
+        body = json.dumps({'error': f'Request body exceeds {self.max_body_size} bytes'}).encode()
+        await send({'type': 'http.response.start', 'status': 413,
+                    'headers': [(b'content-type', b'application/json'),
+                                (b'content-length', str(len(body)).encode()),
+                                (b'connection', b'close')]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    @staticmethod
+    async def _watch_disconnect(receive: Callable, disconnected: asyncio.Event):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+                return
+
+    async def _lifespan(self, receive: Callable, send: Callable):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.db_executor.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
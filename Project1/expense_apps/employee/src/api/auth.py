@@ -1,9 +1,12 @@
 """
 Authentication utilities and decorators for Flask API.
 """
+import os
 from functools import wraps
 from flask import request, jsonify, current_app
 from src.service.authentication_service import AuthenticationService
+from src.monitoring.server_timing import timed
+from src.monitoring.profiling import PROFILE_HEADER, verify_profile_request
 
 
 def get_auth_service() -> AuthenticationService:
@@ -21,9 +24,10 @@ def require_employee_auth(f):
         if not token:
             return jsonify({'error': 'Authentication required'}), 401
         
-        # Verify token and get user
+        # Verify token and get user (JWT decode plus user lookup)
         auth_service = get_auth_service()
-        user = auth_service.get_user_from_token(token)
+        with timed('auth'):
+            user = auth_service.get_user_from_token(token)
         
         if not user or user.role != 'Employee':
             return jsonify({'error': 'Access denied'}), 403
@@ -35,6 +39,30 @@ def require_employee_auth(f):
     return decorated_function
 
 
+def require_debug_signature(f):
+    """Decorator to require an X-Profile-Request header signed with PROFILE_SECRET on diagnostics endpoints.
+    
+    Without PROFILE_SECRET every request is refused; the JWT secret is never used instead.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        secret = os.getenv('PROFILE_SECRET')
+        if not secret:
+            return jsonify({'error': 'Diagnostics are disabled: PROFILE_SECRET is not set'}), 403
+        
+        header = request.headers.get(PROFILE_HEADER)
+        
+        if not header:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        if not verify_profile_request(secret, header, request.method, request.path):
+            return jsonify({'error': 'Access denied'}), 403
+        
+        return f(*args, **kwargs)
+    
+    return decorated_function
+
+
 def get_current_user():
     """Get the current authenticated user from request context."""
     return getattr(request, 'current_user', None)
\ No newline at end of file
@@ -3,6 +3,7 @@ Authentication endpoints for login and logout.
 """
 from flask import Blueprint, request, jsonify, make_response, current_app
 from src.service.authentication_service import AuthenticationService
+from src.monitoring.server_timing import timed
 
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -29,7 +30,8 @@ def login():
             return jsonify({'error': 'Username and password required'}), 400
         
         auth_service = get_auth_service()
-        user = auth_service.authenticate_user(username, password)
+        with timed('service'):
+            user = auth_service.authenticate_user(username, password)
         
         if not user:
             return jsonify({'error': 'Invalid credentials'}), 401
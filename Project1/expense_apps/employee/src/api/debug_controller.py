@@ -0,0 +1,142 @@
+"""
+Diagnostics endpoints, registered only when DEBUG_ENDPOINTS is enabled.
+"""
+import sqlite3
+import time
+from flask import Blueprint, Response, request, jsonify, current_app
+from src.api.auth import require_debug_signature
+from src.monitoring.memory import MemoryTracker, count_live_objects
+from src.monitoring.sampler import StackSampler
+from src.repository.approval_model import Approval
+from src.repository.expense_model import Expense
+
+
+debug_bp = Blueprint('debug', __name__, url_prefix='/debug')
+
+
+def get_stack_sampler() -> StackSampler:
+    """Get the process-wide stack sampler from Flask app context."""
+    return current_app.stack_sampler
+
+
+def get_memory_tracker() -> MemoryTracker:
+    """Get the tracemalloc snapshot store from Flask app context."""
+    return current_app.memory_tracker
+
+
+@debug_bp.before_app_request
+def start_sampler():
+    """Keep the sampler running in every worker that serves requests."""
+    get_stack_sampler().ensure_started()
+
+
+@debug_bp.route('/profile', methods=['GET'])
+@require_debug_signature
+def profile():
+    """Sample all threads for ?seconds= and return collapsed stacks, hottest first."""
+    sampler = get_stack_sampler()
+    try:
+        seconds = float(request.args.get('seconds', 30))
+    except ValueError:
+        return jsonify({'error': 'seconds must be a number'}), 400
+
+    if not 0 < seconds <= sampler.history_seconds:
+        return jsonify({'error': f'seconds must be between 0 and {sampler.history_seconds}'}), 400
+
+    # ?wait=false returns what was already sampled instead of the next window
+    if request.args.get('wait', 'true').lower() != 'false':
+        time.sleep(seconds)
+
+    stacks = sampler.collapsed(seconds)
+    body = ''.join(f"{stack} {count}\n"
+                   for stack, count in sorted(stacks.items(), key=lambda item: -item[1]))
+    return Response(body, mimetype='text/plain')
+
+
+@debug_bp.route('/memory', methods=['GET'])
+@require_debug_signature
+def memory_status():
+    """Report tracemalloc state and how many suspect objects are alive."""
+    status = get_memory_tracker().status()
+    status['live_objects'] = count_live_objects({
+        'Expense': Expense,
+        'Approval': Approval,
+        'sqlite3.Connection': sqlite3.Connection
+    })
+    return jsonify(status)
+
+
+@debug_bp.route('/memory/start', methods=['POST'])
+@require_debug_signature
+def memory_start():
+    """Start tracemalloc with ?frames= frames per allocation (default 1)."""
+    try:
+        frames = int(request.args.get('frames', 1))
+    except ValueError:
+        return jsonify({'error': 'frames must be an integer'}), 400
+
+    if frames < 1:
+        return jsonify({'error': 'frames must be at least 1'}), 400
+
+    tracker = get_memory_tracker()
+    tracker.start(frames)
+    return jsonify(tracker.status())
+
+
+@debug_bp.route('/memory/stop', methods=['POST'])
+@require_debug_signature
+def memory_stop():
+    """Stop tracemalloc and discard snapshots."""
+    tracker = get_memory_tracker()
+    tracker.stop()
+    return jsonify(tracker.status())
+
+
+@debug_bp.route('/memory/snapshots/<name>', methods=['POST'])
+@require_debug_signature
+def memory_snapshot(name):
+    """Take a named snapshot."""
+    try:
+        snapshot = get_memory_tracker().take(name)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+    return jsonify({
+        'name': name,
+        'traced_bytes': sum(stat.size for stat in snapshot.statistics('filename'))
+    }), 201
+
+
+@debug_bp.route('/memory/diff', methods=['GET'])
+@require_debug_signature
+def memory_diff():
+    """Top-N allocation growth from ?base= to ?target= (default: a fresh snapshot)."""
+    tracker = get_memory_tracker()
+    base_name = request.args.get('base')
+    target_name = request.args.get('target')
+    group_by = request.args.get('group_by', 'lineno')
+
+    if not base_name:
+        return jsonify({'error': 'base snapshot name required'}), 400
+
+    if group_by not in ('lineno', 'filename'):
+        return jsonify({'error': 'group_by must be lineno or filename'}), 400
+
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    try:
+        base = tracker.get(base_name)
+        target = tracker.get(target_name) if target_name else tracker.take('latest')
+    except KeyError as e:
+        return jsonify({'error': f'Snapshot not found: {e.args[0]}'}), 404
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+    return jsonify({
+        'base': base_name,
+        'target': target_name or 'latest',
+        'diffs': tracker.diff(base, target, limit, group_by)
+    })
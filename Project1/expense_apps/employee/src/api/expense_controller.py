@@ -1,9 +1,17 @@
 """
 Expense management endpoints.
 """
-from flask import Blueprint, request, jsonify, current_app
+import json
+import time
+from flask import Blueprint, Response, request, jsonify, current_app
 from src.api.auth import require_employee_auth, get_current_user
-from src.service.expense_service import ExpenseService
+from src.api.transactions import database_busy_response
+from src.api.query_deadlines import query_timeout_response
+from src.service.expense_service import ExpenseService, DEFAULT_SEARCH_LIMIT, EXPENSE_FILTER_PARAMS
+from src.service.idempotency import IdempotencyKeyInUse, IdempotencyKeyMismatch
+from src.repository.retry import DatabaseBusyError
+from src.repository.query_deadline import QueryTimeoutError
+from src.monitoring.server_timing import timed
 
 
 expense_bp = Blueprint('expense', __name__, url_prefix='/api/expenses')
@@ -39,12 +47,14 @@ def submit_expense():
         current_user = get_current_user()
         expense_service = get_expense_service()
         
-        expense = expense_service.submit_expense(
-            user_id=current_user.id,
-            amount=amount,
-            description=description,
-            date=date
-        )
+        with timed('service'):
+            expense = expense_service.submit_expense(
+                user_id=current_user.id,
+                amount=amount,
+                description=description,
+                date=date,
+                idempotency_key=request.headers.get('Idempotency-Key')
+            )
         
         return jsonify({
             'message': 'Expense submitted successfully',
@@ -57,6 +67,12 @@ def submit_expense():
             }
         }), 201
         
+    except DatabaseBusyError:
+        return database_busy_response()
+    except IdempotencyKeyInUse as e:
+        return jsonify({'error': str(e)}), 409
+    except IdempotencyKeyMismatch as e:
+        return jsonify({'error': str(e)}), 422
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -68,15 +84,73 @@ def submit_expense():
 def get_expenses():
     """Get all expenses for the current user."""
     try:
-        status_filter = request.args.get('status')  # Optional filter: pending, approved, denied
+        status_filter = request.args.get('status')  # Optional filter: pending, approved, denied, or a list
+        # Optional filter/sort: date_from, date_to, month, min_amount, max_amount, sort
+        filter_args = {name: request.args.get(name) for name in EXPENSE_FILTER_PARAMS}
+        fields = request.args.get('fields')  # Optional projection, e.g. id,amount,status
+        ids = request.args.get('ids')  # Optional batch read, e.g. 1,2,3
         
         current_user = get_current_user()
         expense_service = get_expense_service()
         
-        expenses_with_status = expense_service.get_expense_history(
-            user_id=current_user.id,
-            status_filter=status_filter
-        )
+        if fields is not None:
+            try:
+                fields = expense_service.select_fields(fields)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
+        if ids is not None:
+            try:
+                expense_ids = [int(expense_id) for expense_id in ids.split(',') if expense_id.strip()]
+            except ValueError:
+                return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+            
+            try:
+                with timed('service'):
+                    expenses_data, not_found = expense_service.get_expenses_by_ids(
+                        expense_ids=expense_ids,
+                        user_id=current_user.id,
+                        fields=fields
+                    )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            return jsonify({
+                'expenses': expenses_data,
+                'count': len(expenses_data),
+                'not_found': not_found
+            })
+        
+        if any(value is not None for value in filter_args.values()) or ',' in (status_filter or ''):
+            try:
+                expense_filter = expense_service.build_expense_filter(status=status_filter, **filter_args)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            with timed('service'):
+                expenses_data = expense_service.filter_expenses(current_user.id, expense_filter, fields)
+            return jsonify({
+                'expenses': expenses_data,
+                'count': len(expenses_data)
+            })
+        
+        if fields is not None:
+            with timed('service'):
+                expenses_data = expense_service.get_expense_history_fields(
+                    user_id=current_user.id,
+                    fields=fields,
+                    status_filter=status_filter
+                )
+            return jsonify({
+                'expenses': expenses_data,
+                'count': len(expenses_data)
+            })
+        
+        with timed('service'):
+            expenses_with_status = expense_service.get_expense_history(
+                user_id=current_user.id,
+                status_filter=status_filter
+            )
         
         expenses_data = []
         for expense, approval in expenses_with_status:
@@ -95,19 +169,174 @@ def get_expenses():
             'count': len(expenses_data)
         })
         
+    except QueryTimeoutError:
+        # Also raised here when a coalesced read this request waited on ran out of its budget
+        return query_timeout_response()
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve expenses', 'details': str(e)}), 500
 
 
+@expense_bp.route('/changes', methods=['GET'])
+@require_employee_auth
+def get_expense_changes():
+    """Get expenses changed or deleted since a version, for clients keeping a local copy."""
+    try:
+        try:
+            since = int(request.args.get('since', '0'))
+        except ValueError:
+            return jsonify({'error': 'since must be an integer version'}), 400
+        
+        current_user = get_current_user()
+        expense_service = get_expense_service()
+        
+        try:
+            with timed('service'):
+                changes = expense_service.get_changes(current_user.id, since)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify(changes)
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to retrieve expense changes', 'details': str(e)}), 500
+
+
+@expense_bp.route('/search', methods=['GET'])
+@require_employee_auth
+def search_expenses():
+    """Search the user's expense descriptions, best matches first, a page at a time."""
+    try:
+        fields = request.args.get('fields')
+        try:
+            limit = int(request.args.get('limit', DEFAULT_SEARCH_LIMIT))
+            offset = int(request.args.get('offset', '0'))
+        except ValueError:
+            return jsonify({'error': 'limit and offset must be integers'}), 400
+        
+        current_user = get_current_user()
+        expense_service = get_expense_service()
+        
+        try:
+            if fields is not None:
+                fields = expense_service.select_fields(fields)
+            with timed('service'):
+                results = expense_service.search_expenses(
+                    current_user.id, request.args.get('q', ''), limit=limit, offset=offset, fields=fields)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify(results)
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to search expenses', 'details': str(e)}), 500
+
+
+@expense_bp.route('/summary', methods=['GET'])
+@require_employee_auth
+def get_expense_summary():
+    """Get the user's expense count and total overall, per status and per month."""
+    try:
+        current_user = get_current_user()
+        expense_service = get_expense_service()
+        
+        with timed('service'):
+            summary = expense_service.get_summary(current_user.id)
+        
+        return jsonify(summary)
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to retrieve expense summary', 'details': str(e)}), 500
+
+
+def _sse_message(event: str, data: dict, event_id: int) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@expense_bp.route('/events', methods=['GET'])
+@require_employee_auth
+def stream_expense_events():
+    """Stream review status changes of the user's expenses as Server-Sent Events."""
+    # EventSource resends the last id it saw when it reconnects
+    last_event_id = request.headers.get('Last-Event-ID')
+    try:
+        since = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID must be an integer version'}), 400
+    if since is not None and since < 0:
+        return jsonify({'error': 'Last-Event-ID must be a non-negative version'}), 400
+    
+    # Everything the stream needs is captured here; the request context ends before it runs
+    user_id = get_current_user().id
+    expense_service = get_expense_service()
+    notifier = current_app.change_notifier
+    heartbeat = current_app.config.get('EVENTS_HEARTBEAT_SECONDS', 15)
+    max_seconds = current_app.config.get('EVENTS_MAX_SECONDS', 300)
+    
+    # Each open stream holds a request thread, so the worker admits only max_listeners of them
+    stop_listening = notifier.try_listen()
+    if stop_listening is None:
+        response = jsonify({'error': 'Too many open event streams, please retry'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '3'
+        return response
+    
+    def stream():
+        try:
+            # Take the count before reading, so a change landing in between still wakes us
+            seen = notifier.count(user_id)
+            version, changes = expense_service.get_status_changes(user_id, since)
+            yield "retry: 3000\n\n"
+            # Gives the client an id to resume from even if nothing changes before it reconnects
+            yield _sse_message('ready', {'version': version}, version)
+            for change in changes:
+                yield _sse_message('status', change, version)
+            
+            # Closing after max_seconds frees the thread; the client reconnects with Last-Event-ID
+            deadline = time.monotonic() + max_seconds
+            while time.monotonic() < deadline:
+                count = notifier.wait(user_id, seen, min(heartbeat, max(0, deadline - time.monotonic())))
+                if count == seen:
+                    yield ": heartbeat\n\n"
+                    continue
+                seen = count
+                version, changes = expense_service.get_status_changes(user_id, version)
+                for change in changes:
+                    yield _sse_message('status', change, version)
+        finally:
+            stop_listening()
+    
+    response = Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Frees the slot even when the stream is closed before its first chunk
+    response.call_on_close(stop_listening)
+    return response
+
+
 @expense_bp.route('/<int:expense_id>', methods=['GET'])
 @require_employee_auth
 def get_expense(expense_id):
     """Get a specific expense by ID."""
     try:
+        fields = request.args.get('fields')  # Optional projection, e.g. id,amount,status
+        
         current_user = get_current_user()
         expense_service = get_expense_service()
         
-        result = expense_service.get_expense_with_status(expense_id, current_user.id)
+        if fields is not None:
+            try:
+                fields = expense_service.select_fields(fields)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            with timed('service'):
+                expense_data = expense_service.get_expense_fields(expense_id, current_user.id, fields)
+            if not expense_data:
+                return jsonify({'error': 'Expense not found'}), 404
+            
+            return jsonify({'expense': expense_data})
+        
+        with timed('service'):
+            result = expense_service.get_expense_with_status(expense_id, current_user.id)
         
         if not result:
             return jsonify({'error': 'Expense not found'}), 404
@@ -155,13 +384,14 @@ def update_expense(expense_id):
         current_user = get_current_user()
         expense_service = get_expense_service()
         
-        updated_expense = expense_service.update_expense(
-            expense_id=expense_id,
-            user_id=current_user.id,
-            amount=amount,
-            description=description,
-            date=date
-        )
+        with timed('service'):
+            updated_expense = expense_service.update_expense(
+                expense_id=expense_id,
+                user_id=current_user.id,
+                amount=amount,
+                description=description,
+                date=date
+            )
         
         if not updated_expense:
             return jsonify({'error': 'Expense not found'}), 404
@@ -176,6 +406,8 @@ def update_expense(expense_id):
             }
         })
         
+    except DatabaseBusyError:
+        return database_busy_response()
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -190,13 +422,16 @@ def delete_expense(expense_id):
         current_user = get_current_user()
         expense_service = get_expense_service()
         
-        success = expense_service.delete_expense(expense_id, current_user.id)
+        with timed('service'):
+            success = expense_service.delete_expense(expense_id, current_user.id)
         
         if not success:
             return jsonify({'error': 'Expense not found'}), 404
         
         return jsonify({'message': 'Expense deleted successfully'})
         
+    except DatabaseBusyError:
+        return database_busy_response()
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -0,0 +1,143 @@
+"""
+Adaptive concurrency limiting for the API blueprints.
+
+Each bucket (reads and writes) admits up to `limit` concurrent requests and
+adjusts the limit with AIMD on the database time measured for each request:
+the limit grows by about one per round of fast requests and is cut by a
+constant factor, at most once per round, when database time exceeds the
+target or a request fails. Requests over the limit wait briefly for a slot
+and are then rejected with 503 and Retry-After, before any auth or database
+work is done.
+"""
+import os
+import threading
+import time
+from typing import Iterable, Optional
+from flask import Flask, g, jsonify, request
+from src.monitoring.metrics import REGISTRY
+from src.monitoring.server_timing import current_timer
+
+
+READ_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+SHED_REQUESTS = REGISTRY.counter(
+    'http_requests_shed_total', 'Requests rejected by the concurrency limiter.', ('bucket',))
+CONCURRENCY_LIMIT = REGISTRY.gauge(
+    'concurrency_limit', 'Current adaptive concurrency limit.', ('bucket',))
+CONCURRENCY_IN_FLIGHT = REGISTRY.gauge(
+    'concurrency_in_flight', 'Requests holding a concurrency slot.', ('bucket',))
+CONCURRENCY_QUEUED = REGISTRY.gauge(
+    'concurrency_queued', 'Requests waiting for a concurrency slot.', ('bucket',))
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit with a short, bounded wait queue."""
+
+    def __init__(self, name: str, initial_limit: int, min_limit: int = 1, max_limit: int = 256,
+                 target_latency: float = 0.05, backoff: float = 0.9, max_queue: Optional[int] = None):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.max_queue = max_queue if max_queue is not None else max_limit
+        self.in_flight = 0
+        self.waiting = 0
+        self._last_drop = 0.0
+        self._cond = threading.Condition()
+        CONCURRENCY_LIMIT.labels(name).set(int(self.limit))
+
+    def _has_slot(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def acquire(self, timeout: float) -> Optional[float]:
+        """Take a slot, waiting up to `timeout` seconds; returns the admission time or None."""
+        with self._cond:
+            if not self._has_slot():
+                if self.waiting >= self.max_queue or timeout <= 0:
+                    return None
+                self.waiting += 1
+                CONCURRENCY_QUEUED.labels(self.name).inc()
+                try:
+                    if not self._cond.wait_for(self._has_slot, timeout):
+                        return None
+                finally:
+                    self.waiting -= 1
+                    CONCURRENCY_QUEUED.labels(self.name).dec()
+            self.in_flight += 1
+            CONCURRENCY_IN_FLIGHT.labels(self.name).inc()
+            # Also restores the limit in a worker whose inherited series were reset after fork
+            CONCURRENCY_LIMIT.labels(self.name).set(int(self.limit))
+            return time.monotonic()
+
+    def release(self, admitted: float, latency: float, failed: bool = False):
+        """Return a slot and adapt the limit to the latency the request observed."""
+        with self._cond:
+            self.in_flight -= 1
+            CONCURRENCY_IN_FLIGHT.labels(self.name).dec()
+            if failed or latency > self.target_latency:
+                # Requests admitted before the last cut describe the old limit; don't cut again
+                if admitted >= self._last_drop:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._last_drop = time.monotonic()
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            CONCURRENCY_LIMIT.labels(self.name).set(int(self.limit))
+            self._cond.notify_all()
+
+
+def init_load_shedding(app: Flask, blueprints: Iterable[str] = ('auth', 'expense')):
+    """Limit concurrent requests to the given blueprints, configured from LIMIT_* env vars."""
+    target_latency = float(os.getenv('LIMIT_TARGET_DB_LATENCY_MS', '50')) / 1000
+    queue_timeout = float(os.getenv('LIMIT_QUEUE_TIMEOUT_MS', '100')) / 1000
+    retry_after = os.getenv('LIMIT_RETRY_AFTER', '1')
+    limiters = {
+        'read': AdaptiveLimiter('read', int(os.getenv('LIMIT_READ_INITIAL', '32')),
+                                max_limit=int(os.getenv('LIMIT_READ_MAX', '128')),
+                                target_latency=target_latency),
+        # Writes serialize on SQLite's single writer lock, so start them much lower
+        'write': AdaptiveLimiter('write', int(os.getenv('LIMIT_WRITE_INITIAL', '4')),
+                                 max_limit=int(os.getenv('LIMIT_WRITE_MAX', '16')),
+                                 target_latency=target_latency)
+    }
+    blueprints = frozenset(blueprints)
+
+    @app.before_request
+    def admit_request():
+        if request.blueprint not in blueprints:
+            return None
+
+        bucket = 'read' if request.method in READ_METHODS else 'write'
+        limiter = limiters[bucket]
+        admitted = limiter.acquire(queue_timeout)
+        if admitted is None:
+            SHED_REQUESTS.labels(bucket).inc()
+            response = jsonify({'error': 'Server is busy, please retry'})
+            response.status_code = 503
+            response.headers['Retry-After'] = retry_after
+            return response
+
+        g.concurrency_slot = (limiter, admitted, time.perf_counter())
+        return None
+
+    @app.after_request
+    def note_status(response):
+        if 'concurrency_slot' in g:
+            g.concurrency_failed = response.status_code >= 500
+        return response
+
+    @app.teardown_request
+    def release_slot(exc):
+        slot = g.pop('concurrency_slot', None)
+        if slot is None:
+            return
+        limiter, admitted, started = slot
+        timer = current_timer()
+        if timer is not None and 'db' in timer.durations:
+            latency = timer.durations['db']
+        else:
+            latency = time.perf_counter() - started
+        limiter.release(admitted, latency, failed=exc is not None or g.get('concurrency_failed', False))
+
+    return limiters
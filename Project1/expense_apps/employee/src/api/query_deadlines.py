@@ -0,0 +1,76 @@
+"""
+Database time budgets per route class, so one runaway query cannot hold a worker.
+"""
+import os
+from typing import Dict, Iterable, Optional
+from flask import Flask, g, jsonify, request
+from src.api.load_shedding import READ_METHODS
+from src.repository.query_deadline import QueryDeadline, QueryTimeoutError
+
+
+# Default budgets in milliseconds; QUERY_DEADLINE_<CLASS>_MS overrides each, 0 disables it
+DEFAULT_BUDGETS_MS = {
+    'auth': 1000,
+    'read': 2000,
+    'write': 5000
+}
+
+
+def query_timeout_response():
+    """504 for a request whose database work ran past its budget, its own or a shared query's."""
+    response = jsonify({'error': 'Request took too long, please retry'})
+    response.status_code = 504
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+def route_class(blueprint: Optional[str], method: str) -> str:
+    """Budget class of a request: auth, or read/write by method."""
+    if blueprint == 'auth':
+        return 'auth'
+    return 'read' if method in READ_METHODS else 'write'
+
+
+def load_query_budgets() -> Dict[str, float]:
+    """Budget in seconds per route class, from QUERY_DEADLINE_<CLASS>_MS env vars."""
+    return {name: float(os.getenv(f'QUERY_DEADLINE_{name.upper()}_MS', str(default))) / 1000
+            for name, default in DEFAULT_BUDGETS_MS.items()}
+
+
+def init_query_deadlines(app: Flask, blueprints: Iterable[str] = ('auth', 'expense')) -> Dict[str, float]:
+    """Abort statements of requests to the given blueprints once their class's budget is spent.
+
+    A request whose statement was aborted gets 504 in place of the error
+    response its controller produced, and so does an uncaught
+    QueryTimeoutError, such as one shared from another request's coalesced read.
+    """
+    budgets = load_query_budgets()
+    blueprints = frozenset(blueprints)
+
+    @app.before_request
+    def start_query_deadline():
+        if request.blueprint not in blueprints:
+            return
+        name = route_class(request.blueprint, request.method)
+        if budgets[name] > 0:
+            g.query_deadline = QueryDeadline(budgets[name], name)
+            g.query_deadline.bind()
+
+    @app.after_request
+    def report_query_timeout(response):
+        deadline = g.get('query_deadline')
+        if deadline is not None and deadline.timed_out and response.status_code >= 500:
+            response = query_timeout_response()
+        return response
+
+    @app.errorhandler(QueryTimeoutError)
+    def query_timed_out(error):
+        return query_timeout_response()
+
+    @app.teardown_request
+    def end_query_deadline(exc):
+        deadline = g.pop('query_deadline', None)
+        if deadline is not None:
+            deadline.unbind()
+
+    return budgets
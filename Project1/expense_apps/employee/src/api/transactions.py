@@ -0,0 +1,63 @@
+"""
+Request-scoped unit of work: one connection and one transaction per request.
+"""
+from typing import Iterable
+from flask import Flask, g, jsonify, request
+from src.api.load_shedding import READ_METHODS
+from src.repository.database import DatabaseConnection
+from src.repository.retry import DatabaseBusyError
+from src.repository.unit_of_work import UnitOfWork
+
+
+def database_busy_response():
+    """503 for a request that could not get the database lock within the retry policy."""
+    response = jsonify({'error': 'Database is busy, please retry'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+def init_unit_of_work(app: Flask, db_connection: DatabaseConnection, read_only_endpoints: Iterable[str] = ()):
+    """Run each request's repository calls in one transaction, committed when the response is a success.
+
+    Writes (any method but GET/HEAD/OPTIONS, except `read_only_endpoints`)
+    begin with BEGIN IMMEDIATE. A 4xx/5xx response or an exception rolls
+    everything back, so a multi-step operation never half-applies. A unit
+    that cannot begin or commit because the database stays locked answers
+    503 with Retry-After, wherever in the request that happened.
+    """
+    read_only_endpoints = frozenset(read_only_endpoints)
+
+    @app.before_request
+    def begin_unit_of_work():
+        write = request.method not in READ_METHODS and request.endpoint not in read_only_endpoints
+        g.unit_of_work = UnitOfWork(db_connection, write=write)
+        g.unit_of_work.bind()
+
+    @app.after_request
+    def finish_unit_of_work(response):
+        unit_of_work = g.get('unit_of_work')
+        if unit_of_work is not None:
+            # Runs before the body is streamed, so an event stream holds no transaction open.
+            # A failed commit raises here and becomes a 500, whose own pass rolls back.
+            if response.status_code < 400:
+                try:
+                    unit_of_work.commit()
+                except DatabaseBusyError:
+                    # The transaction is still open; teardown rolls it back
+                    return database_busy_response()
+            else:
+                unit_of_work.rollback()
+        return response
+
+    @app.errorhandler(DatabaseBusyError)
+    def database_busy(error):
+        # BEGIN IMMEDIATE runs on a request's first query, e.g. in require_employee_auth
+        return database_busy_response()
+
+    @app.teardown_request
+    def release_unit_of_work(exc):
+        unit_of_work = g.pop('unit_of_work', None)
+        if unit_of_work is not None:
+            unit_of_work.rollback()
+            unit_of_work.unbind()
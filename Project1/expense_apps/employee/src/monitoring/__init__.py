@@ -0,0 +1,25 @@
+"""
+Monitoring package for request timing and runtime diagnostics.
+"""
+from .server_timing import init_server_timing, timed, current_timer
+from .profiling import init_request_profiling, sign_profile_request
+from .sampler import StackSampler
+from .memory import MemoryTracker, count_live_objects
+from .metrics import REGISTRY, MetricsRegistry, Counter, Gauge, Histogram, init_metrics
+
+__all__ = [
+    'init_server_timing',
+    'timed',
+    'current_timer',
+    'REGISTRY',
+    'MetricsRegistry',
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'init_metrics',
+    'init_request_profiling',
+    'sign_profile_request',
+    'StackSampler',
+    'MemoryTracker',
+    'count_live_objects'
+]
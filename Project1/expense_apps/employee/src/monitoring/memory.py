@@ -0,0 +1,83 @@
+"""
+tracemalloc snapshots and live object counts for tracking memory growth.
+"""
+import gc
+import threading
+import tracemalloc
+from collections import OrderedDict
+from typing import Dict, List
+
+
+class MemoryTracker:
+    """Keeps a bounded set of named tracemalloc snapshots and compares them."""
+
+    def __init__(self, max_snapshots: int = 10):
+        self.max_snapshots = max_snapshots
+        self._snapshots: 'OrderedDict[str, tracemalloc.Snapshot]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, frames: int = 1):
+        """Start tracing allocations, recording up to `frames` frames each."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        """Stop tracing and drop stored snapshots."""
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+
+    def status(self) -> Dict:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            'tracing': tracing,
+            'frames': tracemalloc.get_traceback_limit() if tracing else 0,
+            'traced_bytes': current,
+            'peak_traced_bytes': peak,
+            'snapshots': list(self._snapshots)
+        }
+
+    def take(self, name: str) -> tracemalloc.Snapshot:
+        """Take a snapshot and store it under `name`, evicting the oldest if full."""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+        with self._lock:
+            self._snapshots.pop(name, None)
+            self._snapshots[name] = snapshot
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def get(self, name: str) -> tracemalloc.Snapshot:
+        """Return a stored snapshot, raising KeyError if there is none by that name."""
+        with self._lock:
+            return self._snapshots[name]
+
+    def diff(self, base: tracemalloc.Snapshot, target: tracemalloc.Snapshot,
+             limit: int = 20, group_by: str = 'lineno') -> List[Dict]:
+        """Top allocation differences from base to target, largest growth first."""
+        stats = target.compare_to(base, group_by)
+        return [{
+            'file': stat.traceback[0].filename,
+            'line': stat.traceback[0].lineno,
+            'size_diff': stat.size_diff,
+            'count_diff': stat.count_diff,
+            'size': stat.size,
+            'count': stat.count
+        } for stat in stats[:limit]]
+
+
+def count_live_objects(types: Dict[str, type]) -> Dict[str, int]:
+    """Count objects tracked by the garbage collector that are instances of each type."""
+    counts = {name: 0 for name in types}
+    for obj in gc.get_objects():
+        for name, cls in types.items():
+            if isinstance(obj, cls):
+                counts[name] += 1
+    return counts
@@ -0,0 +1,390 @@
+"""
+Prometheus text-format metrics with an optional file-backed multiprocess mode.
+
+Metrics are created on the module-level REGISTRY. Recording a value only takes
+a short per-series lock. When METRICS_MULTIPROC_DIR is set (serve.py does this
+for its pre-forked workers), each process periodically writes its values to
+<dir>/metrics_<pid>.json, and any worker answering /metrics merges every file:
+counters and histograms are summed across all processes that ever ran, gauges
+across the processes still alive.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from flask import Flask, Response, g, request
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    """Base class for a named metric family with a fixed set of label names."""
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> object:
+        """Return the child series for the given label values, creating it if needed."""
+        key = tuple(str(value) for value in values)
+        series = self._series.get(key)
+        if series is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                series = self._series.setdefault(key, self._new_series())
+        return series
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def _default(self):
+        """The unlabelled series, for metrics declared without label names."""
+        return self.labels()
+
+    def value(self, *values):
+        """Current value of a series in this process."""
+        return self.labels(*values).value()
+
+    def reset(self):
+        """Zero every series in place, so handles taken from labels() keep reporting."""
+        with self._lock:
+            for series in list(self._series.values()):
+                series.reset()
+
+    def snapshot(self) -> Dict[Tuple[str, ...], object]:
+        return {key: series.value() for key, series in list(self._series.items())}
+
+
+class _Value:
+    __slots__ = ('_value', '_lock')
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        self._value = value
+
+    def value(self) -> float:
+        return self._value
+
+    def reset(self):
+        self._value = 0.0
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    type = 'counter'
+
+    def _new_series(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+    type = 'gauge'
+
+    def _new_series(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+
+class _HistogramValue:
+    __slots__ = ('_buckets', '_counts', '_sum', '_lock')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, amount: float):
+        index = bisect_left(self._buckets, amount)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += amount
+
+    def value(self) -> List[float]:
+        """Per-bucket (non-cumulative) counts followed by the sum."""
+        return self._counts + [self._sum]
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * len(self._counts)
+            self._sum = 0.0
+
+
+class Histogram(_Metric):
+    """Distribution of observations in fixed buckets."""
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, amount: float):
+        self._default().observe(amount)
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._flusher: Optional[threading.Thread] = None
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """Return the metric registered under `name`, if any."""
+        return self._metrics.get(name)
+
+    def register_collector(self, collector: Callable[[], None]):
+        """Register a callback that refreshes gauges right before each scrape."""
+        self._collectors.append(collector)
+
+    # Multiprocess support
+
+    @property
+    def multiprocess_dir(self) -> Optional[str]:
+        return os.getenv('METRICS_MULTIPROC_DIR') or None
+
+    def ensure_process(self, flush_interval: float = 1.0):
+        """Reset inherited values after a fork and start this process's flusher."""
+        pid = os.getpid()
+        if pid != self._pid:
+            # Values copied from the parent are already reported by the parent's own file;
+            # series are zeroed, not dropped, as modules hold on to their labelled handles
+            self._pid = pid
+            self._flusher = None
+            for metric in list(self._metrics.values()):
+                metric.reset()
+
+        if self.multiprocess_dir and self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_forever, args=(flush_interval,),
+                                             name='metrics-flush', daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush)
+
+    def _flush_forever(self, interval: float):
+        while True:
+            time.sleep(interval)
+            self.flush()
+
+    def _snapshot(self) -> dict:
+        return {
+            metric.name: {
+                'type': metric.type,
+                'help': metric.documentation,
+                'labelnames': list(metric.labelnames),
+                'buckets': list(getattr(metric, 'buckets', ())),
+                'samples': [[list(key), value] for key, value in metric.snapshot().items()]
+            }
+            for metric in list(self._metrics.values())
+        }
+
+    def flush(self):
+        """Write this process's values to the multiprocess directory."""
+        directory = self.multiprocess_dir
+        if not directory:
+            return
+        path = os.path.join(directory, f"metrics_{os.getpid()}.json")
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _collect_snapshots(self) -> List[Tuple[dict, bool]]:
+        """Snapshots to merge, each paired with whether its process is alive."""
+        own = self._snapshot()
+        directory = self.multiprocess_dir
+        if not directory:
+            return [(own, True)]
+
+        snapshots = [(own, True)]
+        for filename in os.listdir(directory):
+            if not (filename.startswith('metrics_') and filename.endswith('.json')):
+                continue
+            pid = int(filename[len('metrics_'):-len('.json')])
+            if pid == os.getpid():
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    snapshots.append((json.load(f), _pid_alive(pid)))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self) -> str:
+        """Render every metric, merged across processes, in Prometheus text format."""
+        for collector in self._collectors:
+            collector()
+
+        merged: Dict[str, dict] = {}
+        for snapshot, alive in self._collect_snapshots():
+            for name, family in snapshot.items():
+                target = merged.setdefault(name, {**family, 'samples': {}})
+                if family['type'] == 'gauge' and not alive:
+                    continue
+                for labels, value in family['samples']:
+                    key = tuple(labels)
+                    if family['type'] == 'histogram':
+                        current = target['samples'].get(key)
+                        target['samples'][key] = value if current is None else \
+                            [a + b for a, b in zip(current, value)]
+                    else:
+                        target['samples'][key] = target['samples'].get(key, 0.0) + value
+
+        lines = []
+        for name, family in merged.items():
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            labelnames = family['labelnames']
+            for key, value in sorted(family['samples'].items()):
+                if family['type'] == 'histogram':
+                    lines.extend(_histogram_lines(name, labelnames, key, family['buckets'], value))
+                else:
+                    lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _histogram_lines(name: str, labelnames: Sequence[str], key: Sequence[str],
+                     buckets: Sequence[float], value: List[float]) -> List[str]:
+    counts, total = value[:-1], value[-1]
+    lines = []
+    cumulative = 0
+    for bound, count in zip(list(buckets) + ['+Inf'], counts):
+        cumulative += count
+        le = bound if bound == '+Inf' else _format_value(bound)
+        labels = _format_labels(labelnames, key, 'le="%s"' % le)
+        lines.append(f"{name}_bucket{labels} {_format_value(cumulative)}")
+    lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(total)}")
+    lines.append(f"{name}_count{_format_labels(labelnames, key)} {_format_value(cumulative)}")
+    return lines
+
+
+REGISTRY = MetricsRegistry()
+
+
+def init_metrics(app: Flask, registry: MetricsRegistry = REGISTRY):
+    """Record per-route request metrics and expose them at /metrics."""
+    requests_total = registry.counter(
+        'http_requests_total', 'HTTP requests handled.', ('blueprint', 'route', 'method', 'status'))
+    errors_total = registry.counter(
+        'http_request_errors_total', 'HTTP requests that ended in a 5xx response.',
+        ('blueprint', 'route', 'method'))
+    duration = registry.histogram(
+        'http_request_duration_seconds', 'HTTP request latency.', ('blueprint', 'route', 'method'))
+    in_flight = registry.gauge(
+        'http_requests_in_flight', 'HTTP requests currently being handled.')
+
+    def record(status_code: int):
+        g.metrics_recorded = True
+        blueprint = request.blueprint or 'app'
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        method = request.method
+        requests_total.labels(blueprint, route, method, status_code).inc()
+        duration.labels(blueprint, route, method).observe(time.perf_counter() - g.metrics_started)
+        if status_code >= 500:
+            errors_total.labels(blueprint, route, method).inc()
+
+    @app.before_request
+    def start_request_metrics():
+        registry.ensure_process()
+        in_flight.inc()
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_started' in g:
+            record(response.status_code)
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        if 'metrics_started' not in g:
+            return
+        if not g.get('metrics_recorded'):
+            # An unhandled exception skipped after_request
+            record(500)
+        g.pop('metrics_started')
+        in_flight.dec()
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,185 @@
+"""
+Opt-in cProfile capture of individual requests.
+
+Enabled only when PROFILE_REQUESTS_DIR and PROFILE_SECRET are both set;
+otherwise init_request_profiling registers no hooks at all. A request is
+profiled when it carries an X-Profile-Request header of the form
+"<unix time>:<hex hmac>", where the HMAC (SHA-256, keyed with PROFILE_SECRET) covers
+"<unix time>:<METHOD>:<path>". Use sign_profile_request to build the header.
+
+Each profiled request writes <stamp>_<METHOD>_<route>_<ms>ms.pstats (for
+pstats/snakeviz) and a matching .collapsed file (for flamegraph.pl/speedscope)
+and reports the shared file stem in an X-Profile-Id response header. Only the
+newest PROFILE_KEEP profiles are kept.
+"""
+import cProfile
+import hashlib
+import hmac
+import logging
+import os
+import pstats
+import re
+import time
+from typing import Dict, Optional, Tuple
+from flask import Flask, g, request
+
+
+PROFILE_HEADER = 'X-Profile-Request'
+MAX_SIGNATURE_AGE = 300  # seconds
+
+logger = logging.getLogger(__name__)
+
+
+def sign_profile_request(secret: str, method: str, path: str, timestamp: Optional[int] = None) -> str:
+    """Build the X-Profile-Request header value for a request."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    message = f"{timestamp}:{method.upper()}:{path}".encode('utf-8')
+    signature = hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+    return f"{timestamp}:{signature}"
+
+
+def verify_profile_request(secret: str, header: str, method: str, path: str,
+                           now: Optional[float] = None) -> bool:
+    """Check the header's signature and that it was issued recently."""
+    try:
+        timestamp, _ = header.split(':', 1)
+        timestamp = int(timestamp)
+    except ValueError:
+        return False
+
+    now = time.time() if now is None else now
+    if abs(now - timestamp) > MAX_SIGNATURE_AGE:
+        return False
+
+    expected = sign_profile_request(secret, method, path, timestamp)
+    return hmac.compare_digest(expected, header)
+
+
+def _frame_label(func: Tuple[str, int, str]) -> str:
+    filename, lineno, name = func
+    if filename == '~':
+        label = name  # built-in, e.g. "<method 'execute' of 'sqlite3.Cursor' objects>"
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{lineno})"
+    return label.replace(';', ',')
+
+
+def collapsed_stacks(stats: pstats.Stats, max_depth: int = 64) -> Dict[str, int]:
+    """
+    Convert profile stats into collapsed stacks weighted in microseconds.
+
+    cProfile only records caller/callee pairs, so each function's time is split
+    across its call paths in proportion to the time spent under each caller.
+    """
+    entries = stats.stats
+    callees: Dict[tuple, Dict[tuple, tuple]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge
+
+    stacks: Dict[str, int] = {}
+
+    def walk(func, path, share, self_time):
+        labels = path + [_frame_label(func)]
+        weight = int(round(self_time * 1_000_000))
+        if weight:
+            key = ';'.join(labels)
+            stacks[key] = stacks.get(key, 0) + weight
+        if len(labels) >= max_depth:
+            return
+        for callee, (_, _, edge_tt, edge_ct) in callees.get(func, {}).items():
+            if callee == func or _frame_label(callee) in path:
+                continue  # recursion: keep its time on the outer frame
+            callee_ct = entries[callee][3]
+            callee_share = share * edge_ct / callee_ct if callee_ct else 0.0
+            walk(callee, labels, callee_share, share * edge_tt)
+
+    for func, (_, _, tt, _, callers) in entries.items():
+        if not callers:
+            walk(func, [], 1.0, tt)
+
+    return stacks
+
+
+class ProfileWriter:
+    """Writes profiles into a directory, keeping only the newest ones."""
+
+    def __init__(self, directory: str, keep: int = 50):
+        self.directory = directory
+        self.keep = max(1, keep)
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, profiler: cProfile.Profile, method: str, route: str, elapsed_ms: float) -> str:
+        """Save pstats and collapsed-stack files and return their shared name."""
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+        now = time.time()
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.localtime(now)) + f"{int(now * 1e6) % 1000000:06d}"
+        name = f"{stamp}_{method}_{slug}_{elapsed_ms:.0f}ms"
+        base = os.path.join(self.directory, name)
+
+        stats = pstats.Stats(profiler)
+        stats.dump_stats(base + '.pstats')
+        with open(base + '.collapsed', 'w') as f:
+            for stack, weight in sorted(collapsed_stacks(stats).items()):
+                f.write(f"{stack} {weight}\n")
+
+        self._rotate()
+        return name
+
+    def _rotate(self):
+        profiles = sorted(name for name in os.listdir(self.directory) if name.endswith('.pstats'))
+        for old in profiles[:-self.keep]:
+            stem = old[:-len('.pstats')]
+            for suffix in ('.pstats', '.collapsed'):
+                try:
+                    os.remove(os.path.join(self.directory, stem + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+def init_request_profiling(app: Flask):
+    """Register the profiling hooks if PROFILE_REQUESTS_DIR and PROFILE_SECRET are configured."""
+    directory = os.getenv('PROFILE_REQUESTS_DIR')
+    if not directory:
+        return
+
+    # Never fall back to SECRET_KEY: it signs the session JWTs
+    secret = os.getenv('PROFILE_SECRET')
+    if not secret:
+        logger.warning('request profiling disabled: PROFILE_REQUESTS_DIR is set but PROFILE_SECRET is not')
+        return
+    writer = ProfileWriter(directory, keep=int(os.getenv('PROFILE_KEEP', '50')))
+
+    @app.before_request
+    def start_profile():
+        header = request.headers.get(PROFILE_HEADER)
+        if not header:
+            return
+        if not verify_profile_request(secret, header, request.method, request.path):
+            logger.warning('rejected profile request', extra={'path': request.path})
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return  # another profiler is already active
+        g.profile_started = time.perf_counter()
+        g.profiler = profiler
+
+    @app.after_request
+    def finish_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - g.pop('profile_started')) * 1000
+        route = request.url_rule.rule if request.url_rule else request.path
+        response.headers['X-Profile-Id'] = writer.write(profiler, request.method, route, elapsed_ms)
+        return response
+
+    @app.teardown_request
+    def discard_profile(exc):
+        # after_request is skipped on unhandled exceptions; never leave a profiler running
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
@@ -0,0 +1,94 @@
+"""
+Statistical wall-clock sampler for the whole process.
+
+A daemon thread reads sys._current_frames() at a fixed rate and counts the
+stack of every other thread, bucketed per second and kept for a bounded
+history. Unlike cProfile it sees all threads at once (request threads,
+waits on SQLite locks, background work) at a cost of one stack walk per
+thread per sample.
+"""
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ',')
+
+
+def collapse_frame(frame, max_depth: int = 128) -> str:
+    """Render a frame and its callers as one root-to-leaf collapsed stack."""
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler:
+    """Samples every thread's stack at `hz` and keeps `history_seconds` of counts."""
+
+    def __init__(self, hz: float = 100, history_seconds: int = 300):
+        if hz <= 0:
+            raise ValueError("hz must be positive")
+        self.interval = 1.0 / hz
+        self.history_seconds = history_seconds
+        self._buckets: Deque[Tuple[int, Dict[str, int]]] = deque()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+        self._stopped = threading.Event()
+
+    def ensure_started(self):
+        """Start sampling in this process; a forked worker gets its own thread."""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            if self._pid != os.getpid():
+                self._buckets.clear()  # samples inherited from the parent process
+                self._pid = os.getpid()
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            self.sample(exclude=own_id)
+
+    def sample(self, exclude: Optional[int] = None):
+        """Record one sample of every thread except `exclude`."""
+        stacks = [collapse_frame(frame) for thread_id, frame in sys._current_frames().items()
+                  if thread_id != exclude]
+        second = int(time.monotonic())
+        with self._lock:
+            if not self._buckets or self._buckets[-1][0] != second:
+                self._buckets.append((second, {}))
+                while self._buckets and self._buckets[0][0] <= second - self.history_seconds:
+                    self._buckets.popleft()
+            counts = self._buckets[-1][1]
+            for stack in stacks:
+                counts[stack] = counts.get(stack, 0) + 1
+
+    def collapsed(self, seconds: float) -> Dict[str, int]:
+        """Merged sample counts for roughly the last `seconds` seconds."""
+        since = time.monotonic() - seconds
+        merged: Dict[str, int] = {}
+        with self._lock:
+            for second, counts in self._buckets:
+                if second + 1 <= since:
+                    continue
+                for stack, count in counts.items():
+                    merged[stack] = merged.get(stack, 0) + count
+        return merged
@@ -0,0 +1,98 @@
+"""
+Per-request timing breakdown, emitted as a Server-Timing header and log fields.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+from flask import Flask, g, request
+from flask.json.provider import DefaultJSONProvider
+
+
+logger = logging.getLogger(__name__)
+
+_current_timer: ContextVar[Optional['RequestTimer']] = ContextVar('server_timing', default=None)
+
+
+class RequestTimer:
+    """Accumulates time spent per named phase (auth, service, db, json) for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+        self._active = set()
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def as_milliseconds(self) -> Dict[str, float]:
+        timings = {name: round(seconds * 1000, 3) for name, seconds in self.durations.items()}
+        timings['total'] = round((time.perf_counter() - self.started) * 1000, 3)
+        return timings
+
+    def header(self) -> str:
+        return ', '.join(f"{name};dur={ms}" for name, ms in self.as_milliseconds().items())
+
+
+def current_timer() -> Optional[RequestTimer]:
+    """The timer of the request being handled, if any."""
+    return _current_timer.get()
+
+
+@contextmanager
+def timed(name: str):
+    """Attribute the enclosed block to `name` on the current request's timer.
+
+    Nested blocks with the same name are counted once, and the block is free
+    when no request timer is active (CLI, tests, background threads).
+    """
+    timer = _current_timer.get()
+    if timer is None or name in timer._active:
+        yield
+        return
+
+    timer._active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer._active.discard(name)
+        timer.add(name, time.perf_counter() - start)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that records serialization time as 'json'."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        with timed('json'):
+            return super().dumps(obj, **kwargs)
+
+
+def init_server_timing(app: Flask):
+    """Time every request and report the breakdown on the response."""
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def start_timer():
+        g.server_timing_token = _current_timer.set(RequestTimer())
+
+    @app.after_request
+    def emit_timing(response):
+        timer = _current_timer.get()
+        if timer is not None:
+            response.headers['Server-Timing'] = timer.header()
+            logger.info('request timing', extra={
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'timings_ms': timer.as_milliseconds()
+            })
+        return response
+
+    @app.teardown_request
+    def reset_timer(exc):
+        token = g.pop('server_timing_token', None)
+        if token is not None:
+            _current_timer.reset(token)
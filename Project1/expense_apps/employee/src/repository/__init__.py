@@ -2,19 +2,41 @@
 Repository package for database operations.
 """
 from .database import DatabaseConnection
+from .db_executor import DatabaseExecutor
+from .unit_of_work import UnitOfWork, run_after_commit
+from .retry import RetryPolicy, DatabaseBusyError
+from .query_deadline import QueryDeadline, QueryTimeoutError
+from .data_version import DataVersion
+from .change_detector import ChangeDetector, ChangeEvent
 from .user_model import User
 from .expense_model import Expense
 from .approval_model import Approval
+from .expense_filter import ExpenseFilter, EXPENSE_SORTS
 from .user_repository import UserRepository
 from .expense_repository import ExpenseRepository
-from .approval_repository import ApprovalRepository
+from .approval_repository import ApprovalRepository, EXPENSE_FIELDS
+from .idempotency_repository import IdempotencyRepository
 
 __all__ = [
     'DatabaseConnection',
+    'DatabaseExecutor',
+    'UnitOfWork',
+    'run_after_commit',
+    'RetryPolicy',
+    'DatabaseBusyError',
+    'QueryDeadline',
+    'QueryTimeoutError',
+    'DataVersion',
+    'ChangeDetector',
+    'ChangeEvent',
     'User',
     'Expense',
     'Approval',
+    'ExpenseFilter',
     'UserRepository',
     'ExpenseRepository',
-    'ApprovalRepository'
+    'ApprovalRepository',
+    'IdempotencyRepository',
+    'EXPENSE_FIELDS',
+    'EXPENSE_SORTS'
 ]
\ No newline at end of file
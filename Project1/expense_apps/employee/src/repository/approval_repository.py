@@ -1,10 +1,105 @@
 """
 Repository for approval-related database operations.
 """
-from typing import List, Optional
+import json
+import math
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from .expense_model import Expense
 from .approval_model import Approval
+from .expense_filter import ExpenseFilter
 from .database import DatabaseConnection
+from .retry import retry_on_busy
+
+
+# Fields a client may project on the expense read endpoints, in response order.
+EXPENSE_FIELDS = {
+    'id': 'e.id',
+    'amount': 'e.amount',
+    'description': 'e.description',
+    'date': 'e.date',
+    'status': 'e.approval_status',
+    'comment': 'e.approval_comment',
+    'review_date': 'e.approval_review_date'
+}
+
+
+@lru_cache(maxsize=128)
+def _projection_sql(fields: Tuple[str, ...], where: str) -> str:
+    """Build the SELECT for a field set once so sqlite3 reuses its prepared statement."""
+    columns = ', '.join(f"{EXPENSE_FIELDS[field]} AS {field}" for field in fields)
+    return f'''
+                SELECT {columns}
+                FROM expenses e
+                WHERE {where}
+                ORDER BY e.date_day DESC, e.id DESC
+            '''
+
+
+# ORDER BY per sort key; the id tiebreak is the trailing rowid of the (user_id, date_day) and
+# (user_id, amount_cents) indexes, so either order is read straight off its index
+SORT_ORDER = {
+    'date': 'e.date_day, e.id',
+    '-date': 'e.date_day DESC, e.id DESC',
+    'amount': 'e.amount_cents, e.id',
+    '-amount': 'e.amount_cents DESC, e.id DESC'
+}
+
+EPOCH = date(1970, 1, 1)
+
+
+@lru_cache(maxsize=256)
+def _filter_sql(fields: Tuple[str, ...], shape: Tuple) -> str:
+    """Build the SELECT for a field set and ExpenseFilter.shape() once; values are bound as parameters."""
+    has_date_from, has_date_to, has_min_amount, has_max_amount, status_count, sort = shape
+    where = ["e.user_id = ?"]
+    if has_date_from:
+        where.append("e.date_day >= ?")
+    if has_date_to:
+        where.append("e.date_day <= ?")
+    if has_min_amount:
+        where.append("e.amount_cents >= ?")
+    if has_max_amount:
+        where.append("e.amount_cents <= ?")
+    if status_count:
+        where.append(f"e.approval_status IN ({', '.join('?' * status_count)})")
+    columns = ', '.join(f"{EXPENSE_FIELDS[field]} AS {field}" for field in fields)
+    return f'''
+                SELECT {columns}
+                FROM expenses e
+                WHERE {' AND '.join(where)}
+                ORDER BY {SORT_ORDER[sort]}
+            '''
+
+
+def _filter_params(user_id: int, expense_filter: ExpenseFilter) -> Tuple:
+    """Values of the set criteria in binding order, dates and amounts as the typed columns store them."""
+    params = [user_id]
+    for value in (expense_filter.date_from, expense_filter.date_to):
+        if value is not None:
+            params.append((date.fromisoformat(value) - EPOCH).days)
+    # Round bounds inward to whole cents, so a bound between two cents keeps its meaning
+    if expense_filter.min_amount is not None:
+        params.append(math.ceil(round(expense_filter.min_amount * 100, 6)))
+    if expense_filter.max_amount is not None:
+        params.append(math.floor(round(expense_filter.max_amount * 100, 6)))
+    params.extend(expense_filter.statuses)
+    return tuple(params)
+
+
+@lru_cache(maxsize=128)
+def _search_sql(fields: Tuple[str, ...]) -> str:
+    """Build the ranked full-text search over a user's expenses for a field set."""
+    columns = ', '.join(f"{EXPENSE_FIELDS[field]} AS {field}" for field in fields)
+    return f'''
+                SELECT {columns}
+                FROM expenses_fts
+                JOIN expenses e ON e.id = expenses_fts.rowid
+                WHERE expenses_fts MATCH ? AND e.user_id = ?
+                ORDER BY expenses_fts.rank, e.date DESC
+                LIMIT ? OFFSET ?
+            '''
 
 
 class ApprovalRepository:
@@ -32,11 +127,11 @@ class ApprovalRepository:
         results = []
         with self.db_connection.get_connection() as conn:
             cursor = conn.execute('''
-                SELECT e.id, e.amount, e.description, e.date, a.status, a.comment, a.review_date
+                SELECT e.id, e.amount, e.description, e.date, e.approval_status AS status,
+                       e.approval_comment AS comment, e.approval_review_date AS review_date
                 FROM expenses e
-                JOIN approvals a ON e.id = a.expense_id
                 WHERE e.user_id = ?
-                ORDER BY e.date DESC
+                ORDER BY e.date_day DESC, e.id DESC
             ''', (user_id,))
             
             for row in cursor.fetchall():
@@ -49,10 +144,86 @@ class ApprovalRepository:
                 results.append((expense, approval))
         return results
     
+    def find_expense_fields_for_user(self, user_id: int, fields: Tuple[str, ...],
+                                     status: Optional[str] = None) -> List[Dict]:
+        """Find the requested fields of a user's expenses, optionally filtered by status."""
+        where = "e.user_id = ?"
+        params = (user_id,)
+        if status:
+            where += " AND e.approval_status = ?"
+            params += (status,)
+        with self.db_connection.get_connection() as conn:
+            cursor = conn.execute(_projection_sql(fields, where), params)
+            return [{field: row[field] for field in fields} for row in cursor.fetchall()]
+    
+    def find_expense_fields_matching(self, user_id: int, expense_filter: ExpenseFilter,
+                                     fields: Tuple[str, ...]) -> List[Dict]:
+        """Find the requested fields of the user's expenses that meet the filter, in its sort order."""
+        with self.db_connection.get_connection() as conn:
+            cursor = conn.execute(_filter_sql(fields, expense_filter.shape()),
+                                  _filter_params(user_id, expense_filter))
+            return [{field: row[field] for field in fields} for row in cursor.fetchall()]
+    
+    def find_expense_fields_by_id(self, expense_id: int, user_id: int,
+                                  fields: Tuple[str, ...]) -> Optional[Dict]:
+        """Find the requested fields of a single expense owned by the user."""
+        with self.db_connection.get_connection() as conn:
+            cursor = conn.execute(_projection_sql(fields, "e.id = ? AND e.user_id = ?"),
+                                  (expense_id, user_id))
+            row = cursor.fetchone()
+            if row:
+                return {field: row[field] for field in fields}
+        return None
+    
+    def find_expense_fields_by_ids(self, expense_ids: List[int], user_id: int,
+                                   fields: Tuple[str, ...]) -> List[Dict]:
+        """Find the requested fields of several expenses owned by the user in one query."""
+        # json_each keeps a single statement shape no matter how many ids are passed
+        where = "e.id IN (SELECT value FROM json_each(?)) AND e.user_id = ?"
+        with self.db_connection.get_connection() as conn:
+            cursor = conn.execute(_projection_sql(fields, where),
+                                  (json.dumps(expense_ids), user_id))
+            return [{field: row[field] for field in fields} for row in cursor.fetchall()]
+    
+    def search_expense_fields(self, user_id: int, match: str, fields: Tuple[str, ...],
+                              limit: int, offset: int = 0) -> List[Dict]:
+        """Find the user's expenses whose description matches an FTS5 query, best matches first."""
+        with self.db_connection.get_connection() as conn:
+            cursor = conn.execute(_search_sql(fields), (match, user_id, limit, offset))
+            return [{field: row[field] for field in fields} for row in cursor.fetchall()]
+    
+    def current_change_version(self) -> int:
+        """The global change version stamped by the change triggers."""
+        with self.db_connection.get_connection() as conn:
+            return conn.execute(
+                "SELECT version FROM change_counters WHERE table_name = '*' AND user_id = 0"
+            ).fetchone()['version']
+    
+    def find_changes_for_user(self, user_id: int, since: int) -> Tuple[int, List[Dict], List[int]]:
+        """Find the user's expenses changed and deleted after version `since`, with the current version."""
+        fields = tuple(EXPENSE_FIELDS)
+        with self.db_connection.get_connection() as conn:
+            # Read the version first and bound the rows by it: a commit landing between
+            # the statements is left for the next sync instead of being skipped
+            version = conn.execute(
+                "SELECT version FROM change_counters WHERE table_name = '*' AND user_id = 0"
+            ).fetchone()['version']
+            cursor = conn.execute(
+                _projection_sql(fields, "e.user_id = ? AND e.change_version > ? AND e.change_version <= ?"),
+                (user_id, since, version))
+            changed = [{field: row[field] for field in fields} for row in cursor.fetchall()]
+            cursor = conn.execute(
+                "SELECT expense_id FROM expense_tombstones "
+                "WHERE user_id = ? AND change_version > ? AND change_version <= ? ORDER BY change_version",
+                (user_id, since, version))
+            deleted = [row['expense_id'] for row in cursor.fetchall()]
+        return version, changed, deleted
+    
+    @retry_on_busy('approval.update_status')
     def update_status(self, expense_id: int, status: str, reviewer_id: Optional[int] = None, 
                      comment: Optional[str] = None, review_date: Optional[str] = None) -> bool:
         """Update approval status."""
-        with self.db_connection.get_connection() as conn:
+        with self.db_connection.get_connection(write=True) as conn:
             cursor = conn.execute(
                 "UPDATE approvals SET status = ?, reviewer = ?, comment = ?, review_date = ? WHERE expense_id = ?",
                 (status, reviewer_id, comment, review_date, expense_id)
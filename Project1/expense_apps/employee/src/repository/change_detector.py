@@ -0,0 +1,105 @@
+"""
+Publishing of per-user change events for writes made by any process.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from src.monitoring.metrics import REGISTRY
+from src.repository.data_version import DataVersion
+from src.repository.database import DatabaseConnection
+
+
+CHANGE_POLLS = REGISTRY.counter(
+    'change_detector_polls_total', 'Change detector polls, by whether the database had changed.', ('changed',))
+CHANGE_EVENTS = REGISTRY.counter(
+    'change_detector_events_total', 'Change events published, by table.', ('table',))
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """Rows of `table_name` owned by `user_id` changed; `version` is the global stamp of the change."""
+    table_name: str
+    user_id: int
+    version: int
+
+
+class ChangeDetector(DataVersion):
+    """Turns commits to the shared database into per-user ChangeEvents for subscribers.
+
+    A poll reads PRAGMA data_version, which costs no table access, and only when
+    it has moved reads the change_counters rows stamped since the last poll
+    (through the index on version). Polls are throttled to `min_interval` and
+    never block: a caller arriving while another thread polls returns at once.
+    """
+
+    def __init__(self, db_connection: DatabaseConnection, min_interval: float = 0.0):
+        super().__init__(db_connection)
+        self.min_interval = min_interval
+        self._subscribers: List[Callable[[List[ChangeEvent]], None]] = []
+        self._subscribers_lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._polled_at = float('-inf')
+        self._seen_data_version: Optional[int] = None
+        self._seen_version: Optional[int] = None
+
+    def subscribe(self, callback: Callable[[List[ChangeEvent]], None]) -> Callable[[], None]:
+        """Call `callback` with each batch of events; returns a function that unsubscribes."""
+        # Fix the starting point now, so commits made before the first poll are still published
+        with self._poll_lock:
+            self._set_baseline()
+        with self._subscribers_lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._subscribers_lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def latest_version(self) -> int:
+        """The global change version, 0 if nothing has been stamped."""
+        rows = self.query("SELECT version FROM change_counters WHERE table_name = '*' AND user_id = 0")
+        return rows[0][0] if rows else 0
+
+    def _set_baseline(self):
+        if self._seen_version is None:
+            self._seen_data_version = self.current()
+            self._seen_version = self.latest_version()
+
+    def poll(self) -> List[ChangeEvent]:
+        """Publish and return the changes committed since the last poll."""
+        if time.monotonic() - self._polled_at < self.min_interval:
+            return []
+        if not self._poll_lock.acquire(blocking=False):
+            return []  # another thread is polling right now
+        try:
+            self._polled_at = time.monotonic()
+            data_version = self.current()
+            if data_version == self._seen_data_version:
+                CHANGE_POLLS.labels('false').inc()
+                return []
+            self._seen_data_version = data_version
+
+            if self._seen_version is None:
+                # Nobody has subscribed yet: only establish where to start from
+                self._set_baseline()
+                return []
+            events = [ChangeEvent(*row) for row in self.query(
+                "SELECT table_name, user_id, version FROM change_counters "
+                "WHERE version > ? AND table_name != '*' ORDER BY version",
+                (self._seen_version,))]
+            CHANGE_POLLS.labels('true').inc()
+            if not events:
+                return []
+            self._seen_version = events[-1].version
+        finally:
+            self._poll_lock.release()
+
+        for event in events:
+            CHANGE_EVENTS.labels(event.table_name).inc()
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            callback(events)
+        return events
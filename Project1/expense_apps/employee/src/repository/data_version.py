@@ -0,0 +1,46 @@
+"""
+Detection of commits made by other connections to the shared database.
+"""
+import os
+import sqlite3
+import threading
+from typing import Optional
+from src.repository.database import DatabaseConnection
+
+
+class DataVersion:
+    """Reads PRAGMA data_version on one long-lived connection.
+
+    The value changes whenever any other connection (this process's requests
+    or the Java manager app) commits to the database file, so comparing it
+    against a remembered value tells whether cached reads may be stale.
+    """
+
+    def __init__(self, db_connection: DatabaseConnection):
+        self.db_connection = db_connection
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # A connection must not be shared across fork; each worker opens its own
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.db_connection.db_path, check_same_thread=False)
+            self._pid = os.getpid()
+        return self._conn
+
+    def current(self) -> int:
+        """Return the current data version."""
+        with self._lock:
+            return self._connection().execute('PRAGMA data_version').fetchone()[0]
+    
+    def query(self, sql: str, params: tuple = ()) -> list:
+        """Run a read on the long-lived connection."""
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
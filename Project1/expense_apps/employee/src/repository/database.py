@@ -3,8 +3,410 @@ Database connection and initialization.
 """
 import sqlite3
 import os
-from typing import Optional
+import weakref
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
+from src.monitoring.server_timing import timed
+from src.monitoring.metrics import REGISTRY
+from src.repository.query_deadline import PROGRESS_INTERVAL, deadline_errors, progress_handler
+
+
+DB_CONNECTIONS_OPENED = REGISTRY.counter(
+    'db_connections_opened_total', 'SQLite connections opened.')
+DB_CONNECTIONS_OPEN = REGISTRY.gauge(
+    'db_connections_open', 'SQLite connections currently open.')
+
+# Tables whose writes are stamped in change_counters: the SQL giving the row's owning user,
+# and the columns whose updates count as changes (never change_version itself, so stamping
+# a row from its own trigger does not fire the trigger again)
+CHANGE_TRACKED_TABLES = {
+    'expenses': ('{row}.user_id', ('user_id', 'amount', 'description', 'date')),
+    'approvals': ('(SELECT user_id FROM expenses WHERE id = {row}.expense_id)',
+                  ('expense_id', 'status', 'reviewer', 'comment', 'review_date'))
+}
+
+# The unit of work bound to the current request, if any; see src/repository/unit_of_work.py
+CURRENT_UNIT_OF_WORK: ContextVar = ContextVar('unit_of_work', default=None)
+
+GLOBAL_VERSION = "(SELECT version FROM change_counters WHERE table_name = '*' AND user_id = 0)"
+
+# Statements stamping the changed rows with the global version and recording deletions.
+# An approval change also stamps its expense, which is the unit clients sync.
+ROW_STAMPS = {
+    ('expenses', 'INSERT'): ("UPDATE expenses SET change_version = {version} WHERE id = NEW.id;",
+                             "DELETE FROM expense_tombstones WHERE expense_id = NEW.id;"),
+    ('expenses', 'UPDATE'): ("UPDATE expenses SET change_version = {version} WHERE id = NEW.id;",),
+    ('expenses', 'DELETE'): ("INSERT OR REPLACE INTO expense_tombstones (expense_id, user_id, change_version) "
+                             "VALUES (OLD.id, OLD.user_id, {version});",),
+    ('approvals', 'INSERT'): ("UPDATE approvals SET change_version = {version} WHERE id = NEW.id;",
+                              "UPDATE expenses SET change_version = {version} WHERE id = NEW.expense_id;"),
+    ('approvals', 'UPDATE'): ("UPDATE approvals SET change_version = {version} WHERE id = NEW.id;",
+                              "UPDATE expenses SET change_version = {version} WHERE id = NEW.expense_id;"),
+    ('approvals', 'DELETE'): ("UPDATE expenses SET change_version = {version} WHERE id = OLD.expense_id;",)
+}
+
+
+def _change_trigger_sql(table: str, event: str) -> str:
+    """Trigger that draws the next global version and stamps the user's counter and the rows with it."""
+    user_sql, columns = CHANGE_TRACKED_TABLES[table]
+    rows = {'INSERT': ('NEW',), 'UPDATE': ('NEW', 'OLD'), 'DELETE': ('OLD',)}[event]
+    body = ["UPDATE change_counters SET version = version + 1 WHERE table_name = '*' AND user_id = 0;"]
+    for row in rows:
+        user = user_sql.format(row=row)
+        # Plain INSERT OR IGNORE + UPDATE rather than UPSERT, so any SQLite the manager app links can parse it
+        body.append(f"INSERT OR IGNORE INTO change_counters (table_name, user_id, version) "
+                    f"SELECT '{table}', owner, 0 FROM (SELECT {user} AS owner) WHERE owner IS NOT NULL;")
+        body.append(f"UPDATE change_counters SET version = {GLOBAL_VERSION} "
+                    f"WHERE table_name = '{table}' AND user_id = {user};")
+    body.extend(statement.format(version=GLOBAL_VERSION) for statement in ROW_STAMPS[(table, event)])
+    of_columns = f" OF {', '.join(columns)}" if event == 'UPDATE' else ''
+    return (f"CREATE TRIGGER {table}_changes_{event.lower()} AFTER {event}{of_columns} ON {table}\n"
+            f"BEGIN\n    " + "\n    ".join(body) + "\nEND")
+
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, definition: str):
+    """ALTER TABLE ADD COLUMN unless the column already exists."""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column not in existing:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _migrate_change_versions(conn: sqlite3.Connection):
+    """1: change_version on expenses and approvals, expense tombstones, row-stamping triggers."""
+    _add_column(conn, 'expenses', 'change_version', 'INTEGER NOT NULL DEFAULT 0')
+    _add_column(conn, 'approvals', 'change_version', 'INTEGER NOT NULL DEFAULT 0')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS expense_tombstones (
+            expense_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            change_version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_expenses_user_change ON expenses (user_id, change_version)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_expense_tombstones_user_change '
+                 'ON expense_tombstones (user_id, change_version)')
+    
+    for table in CHANGE_TRACKED_TABLES:
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f"DROP TRIGGER IF EXISTS {table}_changes_{event.lower()}")
+            conn.execute(_change_trigger_sql(table, event))
+    
+    # Existing rows all share one new version, so a client syncing from 0 receives them
+    conn.execute("UPDATE change_counters SET version = version + 1 WHERE table_name = '*' AND user_id = 0")
+    conn.execute(f"UPDATE expenses SET change_version = {GLOBAL_VERSION} WHERE change_version = 0")
+    conn.execute(f"UPDATE approvals SET change_version = {GLOBAL_VERSION} WHERE change_version = 0")
+
+
+def _migrate_idempotency_keys(conn: sqlite3.Connection):
+    """2: idempotency_keys for replaying retried submissions."""
+    # WITHOUT ROWID keeps each record in the primary key's b-tree, one lookup per claim
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            user_id INTEGER NOT NULL,
+            key TEXT NOT NULL,
+            request_hash TEXT NOT NULL,
+            response TEXT,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (user_id, key)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created ON idempotency_keys (created_at)')
+
+
+# The status an expense is summarized under: its approval's, or pending before it has one
+SUMMARY_STATUS = "COALESCE((SELECT status FROM approvals WHERE expense_id = {id}), 'pending')"
+# The month migration 3 summarized an expense under: the first seven characters of its date
+# text (migration 9 moved to SUMMARY_MONTH)
+TEXT_SUMMARY_MONTH = "COALESCE(substr({date}, 1, 7), '')"
+# Whole cents, so repeated trigger additions and subtractions never drift like REAL sums would
+SUMMARY_CENTS = "CAST(round({amount} * 100) AS INTEGER)"
+
+
+def _expense_summary_source(month: str) -> str:
+    """What expense_summary must hold, computed from scratch, with `month` bucketing dates."""
+    return (f"SELECT e.user_id, {SUMMARY_STATUS.format(id='e.id')} AS status, {month.format(date='e.date')} AS month, "
+            f"COUNT(*) AS expense_count, SUM({SUMMARY_CENTS.format(amount='e.amount')}) AS total_cents "
+            f"FROM expenses e GROUP BY 1, 2, 3")
+
+
+def _summary_delta_sql(user: str, status: str, month: str, cents: str, sign: int) -> List[str]:
+    """Statements adding (sign=1) or removing (sign=-1) one expense from its expense_summary row."""
+    key = f"user_id = {user} AND status = {status} AND month = {month}"
+    statements = []
+    if sign > 0:
+        statements.append(f"INSERT OR IGNORE INTO expense_summary (user_id, status, month, expense_count, total_cents) "
+                          f"SELECT {user}, {status}, {month}, 0, 0 WHERE {user} IS NOT NULL;")
+    op = '+' if sign > 0 else '-'
+    statements.append(f"UPDATE expense_summary SET expense_count = expense_count {op} 1, "
+                      f"total_cents = total_cents {op} {cents} WHERE {key};")
+    if sign < 0:
+        statements.append(f"DELETE FROM expense_summary WHERE {key} AND expense_count <= 0;")
+    return statements
+
+
+def _expense_summary_delta(row: str, sign: int, month: str) -> List[str]:
+    """Add or remove the expenses row NEW/OLD under its approval's status."""
+    return _summary_delta_sql(f"{row}.user_id", SUMMARY_STATUS.format(id=f"{row}.id"),
+                              month.format(date=f"{row}.date"), SUMMARY_CENTS.format(amount=f"{row}.amount"), sign)
+
+
+def _approval_summary_move(row: str, to_status: bool, month: str) -> List[str]:
+    """Move the approvals row NEW/OLD's expense between pending and the row's status."""
+    expense = f"(SELECT {{}} FROM expenses WHERE id = {row}.expense_id)"
+    user = expense.format('user_id')
+    expense_month = expense.format(month.format(date='date'))
+    cents = expense.format(SUMMARY_CENTS.format(amount='amount'))
+    before, after = ("'pending'", f"{row}.status") if to_status else (f"{row}.status", "'pending'")
+    return (_summary_delta_sql(user, before, expense_month, cents, -1)
+            + _summary_delta_sql(user, after, expense_month, cents, 1))
+
+
+def _summary_triggers(month: str) -> Dict[Tuple[str, str], Tuple[Optional[str], List[str]]]:
+    """Trigger bodies keeping expense_summary equal to its source, and the columns each UPDATE watches."""
+    return {
+        ('expenses', 'INSERT'): (None, _expense_summary_delta('NEW', 1, month)),
+        ('expenses', 'UPDATE'): ('user_id, amount, date',
+                                 _expense_summary_delta('OLD', -1, month) + _expense_summary_delta('NEW', 1, month)),
+        ('expenses', 'DELETE'): (None, _expense_summary_delta('OLD', -1, month)),
+        ('approvals', 'INSERT'): (None, _approval_summary_move('NEW', True, month)),
+        ('approvals', 'UPDATE'): ('expense_id, status',
+                                  _approval_summary_move('OLD', False, month)
+                                  + _approval_summary_move('NEW', True, month)),
+        ('approvals', 'DELETE'): (None, _approval_summary_move('OLD', False, month))
+    }
+
+
+def _build_expense_summary(conn: sqlite3.Connection, month: str):
+    """(Re)create the summary triggers for `month` and recompute expense_summary from scratch."""
+    for (table, event), (columns, body) in _summary_triggers(month).items():
+        name = f"{table}_summary_{event.lower()}"
+        of_columns = f" OF {columns}" if columns else ''
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} AFTER {event}{of_columns} ON {table}\n"
+                     f"BEGIN\n    " + "\n    ".join(body) + "\nEND")
+    conn.execute("DELETE FROM expense_summary")
+    conn.execute(f"INSERT INTO expense_summary (user_id, status, month, expense_count, total_cents) "
+                 f"{_expense_summary_source(month)}")
+
+
+def _migrate_expense_summary(conn: sqlite3.Connection):
+    """3: expense_summary, per-user counts and totals by status and month kept by triggers."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS expense_summary (
+            user_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            month TEXT NOT NULL,
+            expense_count INTEGER NOT NULL,
+            total_cents INTEGER NOT NULL,
+            PRIMARY KEY (user_id, status, month)
+        ) WITHOUT ROWID
+    ''')
+    _build_expense_summary(conn, TEXT_SUMMARY_MONTH)
+
+
+def _migrate_expense_search(conn: sqlite3.Connection):
+    """4: expenses_fts, an FTS5 index over expenses.description kept by triggers; approvals by expense."""
+    # External content: the index stores tokens only and reads descriptions back from expenses
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5("
+                 "description, content='expenses', content_rowid='id', tokenize='unicode61 remove_diacritics 2')")
+    triggers = {
+        'insert': "AFTER INSERT ON expenses BEGIN\n"
+                  "    INSERT INTO expenses_fts (rowid, description) VALUES (NEW.id, NEW.description);\nEND",
+        'delete': "AFTER DELETE ON expenses BEGIN\n"
+                  "    INSERT INTO expenses_fts (expenses_fts, rowid, description) "
+                  "VALUES ('delete', OLD.id, OLD.description);\nEND",
+        'update': "AFTER UPDATE OF description ON expenses BEGIN\n"
+                  "    INSERT INTO expenses_fts (expenses_fts, rowid, description) "
+                  "VALUES ('delete', OLD.id, OLD.description);\n"
+                  "    INSERT INTO expenses_fts (rowid, description) VALUES (NEW.id, NEW.description);\nEND"
+    }
+    for event, body in triggers.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS expenses_fts_{event}")
+        conn.execute(f"CREATE TRIGGER expenses_fts_{event} {body}")
+    conn.execute("INSERT INTO expenses_fts (expenses_fts) VALUES ('rebuild')")
+    # Search results join approvals by expense, and the summary triggers look up an expense's
+    # approval on every write; without this both scan the whole approvals table
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_approvals_expense ON approvals (expense_id)')
+
+
+def _migrate_expense_filter_indexes(conn: sqlite3.Connection):
+    """5: expenses by (user_id, date) and (user_id, amount) for the filtered, sorted expense list."""
+    # Each serves a range on its column and an ORDER BY on it, the rowid breaking ties;
+    # a status filter is checked per row through idx_approvals_expense
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses (user_id, date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_expenses_user_amount ON expenses (user_id, amount)')
+
+
+# Approval statuses and the small integers approvals.status_code stores for them
+STATUS_CODES = {'pending': 0, 'approved': 1, 'denied': 2}
+
+# Julian day number of 1970-01-01, the origin of expenses.date_day
+EPOCH_JULIAN_DAY = 2440587.5
+
+
+# Integer forms of the amount, date and status both apps write, kept beside them: cents, days
+# since 1970-01-01 (NULL for a date SQLite cannot parse; migration 8 widens that to DAY_NUMBER)
+# and the status code
+TYPED_AMOUNT = SUMMARY_CENTS.format(amount='NEW.amount')
+TYPED_DATE = f"CAST(julianday(NEW.date) - {EPOCH_JULIAN_DAY} AS INTEGER)"
+
+
+def _migrate_typed_columns(conn: sqlite3.Connection):
+    """6: integer amount_cents and date_day on expenses, status_code on approvals; indexes move to them."""
+    # Plain columns filled by triggers rather than generated ones: SQLite never reads a
+    # generated column from an index, so indexes over them could not cover a range scan
+    _add_column(conn, 'expenses', 'amount_cents', 'INTEGER CHECK (amount_cents >= 0)')
+    _add_column(conn, 'expenses', 'date_day', 'INTEGER')
+    fill = f"UPDATE expenses SET amount_cents = {TYPED_AMOUNT}, date_day = {TYPED_DATE} WHERE id = NEW.id;"
+    for event in ('insert', 'update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS expenses_typed_{event}")
+    conn.execute(f"CREATE TRIGGER expenses_typed_insert AFTER INSERT ON expenses BEGIN\n    {fill}\nEND")
+    conn.execute(f"CREATE TRIGGER expenses_typed_update AFTER UPDATE OF amount, date ON expenses BEGIN\n"
+                 f"    {fill}\nEND")
+    conn.execute(f"UPDATE expenses SET amount_cents = {SUMMARY_CENTS.format(amount='amount')}, "
+                 f"date_day = CAST(julianday(date) - {EPOCH_JULIAN_DAY} AS INTEGER)")
+    # Status is never range-scanned, so a VIRTUAL column is enough to enforce the status set
+    codes = ' '.join(f"WHEN '{status}' THEN {code}" for status, code in STATUS_CODES.items())
+    _add_column(conn, 'approvals', 'status_code',
+                f"INTEGER GENERATED ALWAYS AS (CASE status {codes} END) VIRTUAL CHECK (status_code IS NOT NULL)")
+    # Integer keys of 2-3 bytes in place of 10-byte date text and 8-byte reals
+    conn.execute('DROP INDEX IF EXISTS idx_expenses_user_date')
+    conn.execute('DROP INDEX IF EXISTS idx_expenses_user_amount')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_expenses_user_day ON expenses (user_id, date_day)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_expenses_user_cents ON expenses (user_id, amount_cents)')
+
+
+# Statements copying an approvals row NEW/OLD onto its expense, or clearing the copy back to
+# pending once the approval is gone or moved to another expense
+APPROVAL_COPY = ("UPDATE expenses SET approval_status = {row}.status, approval_comment = {row}.comment, "
+                 "approval_review_date = {row}.review_date WHERE id = {row}.expense_id;")
+APPROVAL_CLEAR = ("UPDATE expenses SET approval_status = 'pending', approval_comment = NULL, "
+                  "approval_review_date = NULL WHERE id = {row}.expense_id{condition};")
+
+APPROVAL_COPY_TRIGGERS = {
+    'insert': ('INSERT', (APPROVAL_COPY.format(row='NEW'),)),
+    'update': ('UPDATE OF expense_id, status, comment, review_date',
+               (APPROVAL_CLEAR.format(row='OLD', condition=' AND OLD.expense_id IS NOT NEW.expense_id'),
+                APPROVAL_COPY.format(row='NEW'))),
+    'delete': ('DELETE', (APPROVAL_CLEAR.format(row='OLD', condition=''),))
+}
+
+
+def _migrate_expense_approval_copy(conn: sqlite3.Connection):
+    """7: approval_status, approval_comment and approval_review_date copied onto expenses by triggers."""
+    # The list reads an expense's review alongside it with no JOIN; the triggers are on
+    # approvals, so reviews made in the manager app flow through too
+    statuses = ', '.join(f"'{status}'" for status in STATUS_CODES)
+    _add_column(conn, 'expenses', 'approval_status',
+                f"TEXT NOT NULL DEFAULT 'pending' CHECK (approval_status IN ({statuses}))")
+    _add_column(conn, 'expenses', 'approval_comment', 'TEXT')
+    _add_column(conn, 'expenses', 'approval_review_date', 'TEXT')
+    for event, (timing, body) in APPROVAL_COPY_TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS approvals_copy_{event}")
+        conn.execute(f"CREATE TRIGGER approvals_copy_{event} AFTER {timing} ON approvals BEGIN\n    "
+                     + "\n    ".join(body) + "\nEND")
+    conn.execute("UPDATE expenses SET (approval_status, approval_comment, approval_review_date) = "
+                 "(SELECT status, comment, review_date FROM approvals WHERE expense_id = expenses.id) "
+                 "WHERE id IN (SELECT expense_id FROM approvals)")
+    # Covers the default list, newest first with the id tiebreak, and its id, amount, date and
+    # status projection from the index alone; it starts with (user_id, date_day), so it
+    # takes that index's place
+    conn.execute('DROP INDEX IF EXISTS idx_expenses_user_day')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_expenses_user_list '
+                 'ON expenses (user_id, date_day, id, approval_status, amount, date)')
+
+
+# Days since 1970-01-01 of a date in ISO form (with or without a time), YYYY/MM/DD or
+# MM/DD/YYYY, the form older clients submitted; NULL for any other text
+DAY_NUMBER = ("CAST(julianday(CASE WHEN {date} GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]' "
+              "THEN substr({date}, 7, 4) || '-' || substr({date}, 1, 2) || '-' || substr({date}, 4, 2) "
+              f"ELSE replace({{date}}, '/', '-') END) - {EPOCH_JULIAN_DAY} AS INTEGER)")
+
+
+def _migrate_slash_dates(conn: sqlite3.Connection):
+    """8: date_day also for YYYY/MM/DD and MM/DD/YYYY dates, which migration 6 left NULL."""
+    # A NULL date_day matches no date bound and sorts as the oldest expense, so slash dates
+    # get a day number too; text in no known form stays NULL
+    fill = (f"UPDATE expenses SET amount_cents = {TYPED_AMOUNT}, date_day = {DAY_NUMBER.format(date='NEW.date')} "
+            f"WHERE id = NEW.id;")
+    for event in ('insert', 'update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS expenses_typed_{event}")
+    conn.execute(f"CREATE TRIGGER expenses_typed_insert AFTER INSERT ON expenses BEGIN\n    {fill}\nEND")
+    conn.execute(f"CREATE TRIGGER expenses_typed_update AFTER UPDATE OF amount, date ON expenses BEGIN\n"
+                 f"    {fill}\nEND")
+    conn.execute(f"UPDATE expenses SET date_day = {DAY_NUMBER.format(date='date')} WHERE date_day IS NULL")
+
+
+# The month an expense is summarized under: that of its day number, so slash dates land in
+# their real month; text in no known date form keeps its first seven characters
+SUMMARY_MONTH = (f"COALESCE(strftime('%Y-%m', ({DAY_NUMBER}) * 86400, 'unixepoch'), "
+                 "substr({date}, 1, 7), '')")
+EXPENSE_SUMMARY_SOURCE = _expense_summary_source(SUMMARY_MONTH)
+
+
+def _migrate_summary_months(conn: sqlite3.Connection):
+    """9: expense_summary months taken from the date's day number instead of its first seven characters."""
+    _build_expense_summary(conn, SUMMARY_MONTH)
+
+
+# Schema changes applied in order on top of the base tables; PRAGMA user_version records
+# how many have run. Append only: never edit or reorder a migration that has shipped.
+MIGRATIONS = [
+    _migrate_change_versions,
+    _migrate_idempotency_keys,
+    _migrate_expense_summary,
+    _migrate_expense_search,
+    _migrate_expense_filter_indexes,
+    _migrate_typed_columns,
+    _migrate_expense_approval_copy,
+    _migrate_slash_dates,
+    _migrate_summary_months
+]
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that attributes statement execution and row fetching to 'db' time.
+    
+    Statements aborted for overrunning the request's deadline raise QueryTimeoutError.
+    """
+    
+    def execute(self, *args):
+        with timed('db'), deadline_errors():
+            return super().execute(*args)
+    
+    def executemany(self, *args):
+        with timed('db'), deadline_errors():
+            return super().executemany(*args)
+    
+    def fetchone(self):
+        with timed('db'), deadline_errors():
+            return super().fetchone()
+    
+    def fetchmany(self, *args, **kwargs):
+        with timed('db'), deadline_errors():
+            return super().fetchmany(*args, **kwargs)
+    
+    def fetchall(self):
+        with timed('db'), deadline_errors():
+            return super().fetchall()
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors and commits are timed for the Server-Timing header."""
+    
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+    
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+    
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+    
+    def commit(self):
+        with timed('db'):
+            super().commit()
 
 
 class DatabaseConnection:
@@ -12,6 +414,7 @@ class DatabaseConnection:
     
     def __init__(self, db_path: Optional[str] = None):
         load_dotenv()
+        self._change_detector = None
         test_mode = os.getenv("TEST_MODE", "false").lower() == "true"
 
         if db_path:
@@ -23,13 +426,45 @@ class DatabaseConnection:
 
         if not self.db_path:
             raise ValueError("Database path is not configured")
+        
+        # SQLite's own wait for a lock, per attempt; src/repository/retry.py retries beyond it
+        self.busy_timeout = float(os.getenv('DB_BUSY_TIMEOUT_MS', '1000')) / 1000
+    
+    def get_connection(self, write: bool = False) -> sqlite3.Connection:
+        """Get a database connection: the current unit of work's, or a new one.
+        
+        With write=True the transaction begins with BEGIN IMMEDIATE, taking the
+        write lock before anything is read.
+        """
+        unit_of_work = CURRENT_UNIT_OF_WORK.get()
+        if unit_of_work is not None and unit_of_work.db_connection.db_path == self.db_path:
+            return unit_of_work.connection(write)
+        conn = self.connect()
+        if write:
+            conn.isolation_level = 'IMMEDIATE'
+        return conn
     
-    def get_connection(self) -> sqlite3.Connection:
-        """Get a database connection."""
-        conn = sqlite3.connect(self.db_path)
+    def connect(self, factory=TimedConnection) -> sqlite3.Connection:
+        """Open a new database connection."""
+        with timed('db'):
+            conn = sqlite3.connect(self.db_path, factory=factory, timeout=self.busy_timeout)
+        # Aborts statements running past the current request's QueryDeadline
+        conn.set_progress_handler(progress_handler, PROGRESS_INTERVAL)
+        DB_CONNECTIONS_OPENED.inc()
+        DB_CONNECTIONS_OPEN.inc()
+        weakref.finalize(conn, DB_CONNECTIONS_OPEN.dec)
         conn.row_factory = sqlite3.Row  # Enable dict-like access to rows
         return conn
     
+    def change_detector(self):
+        """The ChangeDetector shared by everything using this database."""
+        if self._change_detector is None:
+            from src.repository.change_detector import ChangeDetector
+            # CHANGE_POLL_INTERVAL_MS=0 checks PRAGMA data_version on every poll
+            self._change_detector = ChangeDetector(
+                self, min_interval=float(os.getenv('CHANGE_POLL_INTERVAL_MS', '0')) / 1000)
+        return self._change_detector
+    
     def initialize_database(self):
         """Create database tables if they don't exist."""
         with self.get_connection() as conn:
@@ -69,4 +504,33 @@ class DatabaseConnection:
                 )
             ''')
             
-            conn.commit()
\ No newline at end of file
+            # Per-user, per-table change stamps kept by triggers, so writes made by any
+            # process (including the Java manager app) can be detected without scanning
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS change_counters (
+                    table_name TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (table_name, user_id)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_change_counters_version ON change_counters (version)')
+            # The '*' row holds the global version every stamp is drawn from
+            conn.execute("INSERT OR IGNORE INTO change_counters (table_name, user_id, version) VALUES ('*', 0, 0)")
+            conn.commit()
+            
+            self.migrate(conn)
+    
+    def migrate(self, conn: sqlite3.Connection):
+        """Apply the MIGRATIONS this database has not run yet, each in its own transaction."""
+        for version, migration in enumerate(MIGRATIONS, start=1):
+            # IMMEDIATE takes the write lock first, so concurrent starters migrate once
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if conn.execute('PRAGMA user_version').fetchone()[0] < version:
+                    migration(conn)
+                    conn.execute(f'PRAGMA user_version = {version}')
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
\ No newline at end of file
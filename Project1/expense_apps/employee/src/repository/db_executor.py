@@ -0,0 +1,57 @@
+"""
+Bounded thread pool for running blocking repository calls from async code.
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from src.monitoring.metrics import REGISTRY
+
+
+DB_POOL_SIZE = REGISTRY.gauge('db_pool_size', 'Threads in the database pool.')
+DB_POOL_IN_USE = REGISTRY.gauge('db_pool_in_use', 'Database pool threads running a call.')
+DB_POOL_WAITING = REGISTRY.gauge('db_pool_waiting', 'Calls waiting for a database pool thread.')
+
+
+class DatabaseExecutor:
+    """Runs blocking database work on a dedicated, bounded pool of threads."""
+
+    def __init__(self, max_workers: int = 8):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db')
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.in_use = 0
+        self.waiting = 0
+        DB_POOL_SIZE.set(max_workers)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on a pool thread and await its result."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+        # Wait on the event loop rather than in the executor queue, so a
+        # cancelled request never leaves queued database work behind
+        self.waiting += 1
+        DB_POOL_WAITING.inc()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+            DB_POOL_WAITING.dec()
+
+        self.in_use += 1
+        DB_POOL_IN_USE.inc()
+        try:
+            call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        finally:
+            self.in_use -= 1
+            DB_POOL_IN_USE.dec()
+            self._slots.release()
+
+    def shutdown(self, wait: bool = True):
+        """Stop the pool threads."""
+        self._executor.shutdown(wait=wait)
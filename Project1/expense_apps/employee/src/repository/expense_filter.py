@@ -0,0 +1,26 @@
+"""
+Expense list filter model.
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+# Sort keys of the expense list; a leading '-' sorts descending
+EXPENSE_SORTS = ('date', '-date', 'amount', '-amount')
+
+
+@dataclass(frozen=True)
+class ExpenseFilter:
+    """Criteria for a user's expense list; every bound is inclusive and None means unbounded."""
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    statuses: Tuple[str, ...] = ()
+    sort: str = '-date'
+
+    def shape(self) -> Tuple:
+        """Which criteria are set, but not their values: filters of one shape share one statement."""
+        return (self.date_from is not None, self.date_to is not None,
+                self.min_amount is not None, self.max_amount is not None,
+                len(self.statuses), self.sort)
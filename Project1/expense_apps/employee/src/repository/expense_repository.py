@@ -1,9 +1,10 @@
 """
 Repository for expense-related database operations.
 """
-from typing import List, Optional
+from typing import Dict, List, Optional
 from .expense_model import Expense
-from .database import DatabaseConnection
+from .database import DatabaseConnection, EXPENSE_SUMMARY_SOURCE
+from .retry import retry_on_busy
 
 
 class ExpenseRepository:
@@ -12,9 +13,10 @@ class ExpenseRepository:
     def __init__(self, db_connection: DatabaseConnection):
         self.db_connection = db_connection
     
+    @retry_on_busy('expense.create')
     def create(self, expense: Expense) -> Expense:
         """Create a new expense and its initial approval record."""
-        with self.db_connection.get_connection() as conn:
+        with self.db_connection.get_connection(write=True) as conn:
             # Insert expense
             cursor = conn.execute(
                 "INSERT INTO expenses (user_id, amount, description, date) VALUES (?, ?, ?, ?)",
@@ -59,9 +61,10 @@ class ExpenseRepository:
                                       date=row['date']))
         return expenses
     
+    @retry_on_busy('expense.update')
     def update(self, expense: Expense) -> Expense:
         """Update an existing expense."""
-        with self.db_connection.get_connection() as conn:
+        with self.db_connection.get_connection(write=True) as conn:
             conn.execute(
                 "UPDATE expenses SET amount = ?, description = ?, date = ? WHERE id = ?",
                 (expense.amount, expense.description, expense.date, expense.id)
@@ -69,12 +72,40 @@ class ExpenseRepository:
             conn.commit()
         return expense
     
+    @retry_on_busy('expense.delete')
     def delete(self, expense_id: int) -> bool:
         """Delete an expense and its approval record."""
-        with self.db_connection.get_connection() as conn:
+        with self.db_connection.get_connection(write=True) as conn:
             # Delete approval record first (foreign key constraint)
             conn.execute("DELETE FROM approvals WHERE expense_id = ?", (expense_id,))
             # Delete expense
             cursor = conn.execute("DELETE FROM expenses WHERE id = ?", (expense_id,))
             conn.commit()
-            return cursor.rowcount > 0
\ No newline at end of file
+            return cursor.rowcount > 0
+    
+    def find_summary(self, user_id: int) -> List[Dict]:
+        """The user's expense_summary rows: status, month, expense_count and total_cents."""
+        with self.db_connection.get_connection() as conn:
+            cursor = conn.execute(
+                "SELECT status, month, expense_count, total_cents FROM expense_summary "
+                "WHERE user_id = ? ORDER BY month DESC, status",
+                (user_id,)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    @retry_on_busy('expense.verify_summary')
+    def verify_summary(self, repair: bool = False) -> int:
+        """Count expense_summary rows that differ from a recomputation, rewriting the table if `repair`."""
+        stored = "SELECT user_id, status, month, expense_count, total_cents FROM expense_summary"
+        with self.db_connection.get_connection(write=repair) as conn:
+            if repair and not conn.in_transaction:
+                # Check and rewrite under one write lock, so no trigger runs in between
+                conn.execute("BEGIN IMMEDIATE")
+            missing = conn.execute(f"SELECT COUNT(*) FROM ({EXPENSE_SUMMARY_SOURCE} EXCEPT {stored})").fetchone()[0]
+            extra = conn.execute(f"SELECT COUNT(*) FROM ({stored} EXCEPT {EXPENSE_SUMMARY_SOURCE})").fetchone()[0]
+            if repair and missing + extra:
+                conn.execute("DELETE FROM expense_summary")
+                conn.execute(f"INSERT INTO expense_summary (user_id, status, month, expense_count, total_cents) "
+                             f"{EXPENSE_SUMMARY_SOURCE}")
+            conn.commit()
+            return missing + extra
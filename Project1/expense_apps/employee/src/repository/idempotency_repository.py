@@ -0,0 +1,74 @@
+"""
+Repository for idempotency keys of client write requests.
+"""
+from typing import Dict, Optional
+from .database import DatabaseConnection
+from .retry import retry_on_busy
+
+
+class IdempotencyRepository:
+    """Stores one row per (user, key): the request's hash and, once done, its response."""
+    
+    def __init__(self, db_connection: DatabaseConnection):
+        self.db_connection = db_connection
+    
+    @retry_on_busy('idempotency.claim')
+    def claim(self, user_id: int, key: str, request_hash: str, now: float,
+              expired_before: float, stale_before: float) -> Optional[Dict]:
+        """Record the key as in progress, or return the live record already holding it.
+        
+        Records created before `expired_before`, and in-progress records created
+        before `stale_before` (their request died), are replaced.
+        """
+        with self.db_connection.get_connection(write=True) as conn:
+            conn.execute(
+                "DELETE FROM idempotency_keys WHERE user_id = ? AND key = ? "
+                "AND (created_at < ? OR (response IS NULL AND created_at < ?))",
+                (user_id, key, expired_before, stale_before)
+            )
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO idempotency_keys (user_id, key, request_hash, created_at) VALUES (?, ?, ?, ?)",
+                (user_id, key, request_hash, now)
+            )
+            conn.commit()
+            if cursor.rowcount == 1:
+                return None
+            
+            cursor = conn.execute(
+                "SELECT request_hash, response, created_at FROM idempotency_keys WHERE user_id = ? AND key = ?",
+                (user_id, key)
+            )
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    @retry_on_busy('idempotency.complete')
+    def complete(self, user_id: int, key: str, response: str):
+        """Store the response for a claimed key."""
+        with self.db_connection.get_connection(write=True) as conn:
+            conn.execute(
+                "UPDATE idempotency_keys SET response = ? WHERE user_id = ? AND key = ?",
+                (response, user_id, key)
+            )
+            conn.commit()
+    
+    @retry_on_busy('idempotency.release')
+    def release(self, user_id: int, key: str):
+        """Drop an in-progress claim whose request failed, so the client can retry."""
+        with self.db_connection.get_connection(write=True) as conn:
+            conn.execute(
+                "DELETE FROM idempotency_keys WHERE user_id = ? AND key = ? AND response IS NULL",
+                (user_id, key)
+            )
+            conn.commit()
+    
+    @retry_on_busy('idempotency.delete_expired')
+    def delete_expired(self, expired_before: float, limit: int) -> int:
+        """Delete up to `limit` records created before `expired_before`; return how many went."""
+        with self.db_connection.get_connection(write=True) as conn:
+            cursor = conn.execute(
+                "DELETE FROM idempotency_keys WHERE (user_id, key) IN "
+                "(SELECT user_id, key FROM idempotency_keys WHERE created_at < ? LIMIT ?)",
+                (expired_before, limit)
+            )
+            conn.commit()
+            return cursor.rowcount
@@ -0,0 +1,83 @@
+"""
+Per-request deadlines for SQL statements, enforced by SQLite's progress handler.
+"""
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Iterator, Optional
+from src.monitoring.metrics import REGISTRY
+
+
+QUERY_TIMEOUTS = REGISTRY.counter(
+    'db_query_timeouts_total', 'Statements aborted for running past their request\'s deadline.', ('route_class',))
+
+# SQLite VM instructions between progress handler calls: a few hundred microseconds of work
+PROGRESS_INTERVAL = 10000
+
+SQLITE_INTERRUPT = 9
+
+CURRENT_DEADLINE: ContextVar = ContextVar('query_deadline', default=None)
+
+
+class QueryTimeoutError(sqlite3.OperationalError):
+    """A statement was aborted because its request's database budget ran out."""
+
+
+class QueryDeadline:
+    """Database time budget of one request, bound to the context while it runs."""
+
+    __slots__ = ('route_class', 'budget', 'expires_at', 'timed_out', '_token')
+
+    def __init__(self, budget: float, route_class: str = 'default'):
+        self.route_class = route_class
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+        self.timed_out = False
+        self._token: Optional[Token] = None
+
+    @staticmethod
+    def current() -> Optional['QueryDeadline']:
+        """The deadline bound to this context, if any."""
+        return CURRENT_DEADLINE.get()
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def bind(self):
+        self._token = CURRENT_DEADLINE.set(self)
+
+    def unbind(self):
+        if self._token is not None:
+            CURRENT_DEADLINE.reset(self._token)
+            self._token = None
+
+    def __enter__(self) -> 'QueryDeadline':
+        self.bind()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.unbind()
+        return False
+
+
+def progress_handler() -> int:
+    """Installed on every connection: a non-zero return makes SQLite abort the running statement."""
+    deadline = CURRENT_DEADLINE.get()
+    return 1 if deadline is not None and deadline.expired() else 0
+
+
+@contextmanager
+def deadline_errors() -> Iterator[None]:
+    """Turn the SQLITE_INTERRUPT of a statement aborted by progress_handler into QueryTimeoutError."""
+    try:
+        yield
+    except sqlite3.OperationalError as e:
+        deadline = CURRENT_DEADLINE.get()
+        if (deadline is None or not deadline.expired() or isinstance(e, QueryTimeoutError)
+                or getattr(e, 'sqlite_errorcode', SQLITE_INTERRUPT) & 0xff != SQLITE_INTERRUPT):
+            raise
+        deadline.timed_out = True
+        QUERY_TIMEOUTS.labels(deadline.route_class).inc()
+        raise QueryTimeoutError(
+            f'query exceeded the {deadline.route_class} budget of {deadline.budget * 1000:.0f}ms') from e
@@ -0,0 +1,124 @@
+"""
+Retrying database work that failed because another connection held the lock.
+"""
+import functools
+import os
+import random
+import sqlite3
+import time
+from typing import Any, Callable, Optional
+from src.monitoring.metrics import REGISTRY
+from src.repository.database import CURRENT_UNIT_OF_WORK
+from src.repository.query_deadline import CURRENT_DEADLINE
+
+
+DB_BUSY_RETRIES = REGISTRY.counter(
+    'db_busy_retries_total', 'Database operations retried after SQLITE_BUSY/SQLITE_LOCKED.', ('operation',))
+DB_BUSY_FAILURES = REGISTRY.counter(
+    'db_busy_failures_total', 'Database operations that stayed busy until their retries ran out.', ('operation',))
+
+# Primary result codes; extended codes such as SQLITE_BUSY_SNAPSHOT keep them in the low byte
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+
+
+class DatabaseBusyError(sqlite3.OperationalError):
+    """The database stayed locked by other connections for longer than the retry policy allows."""
+
+
+def is_busy_error(error: BaseException) -> bool:
+    """True for errors raised because another connection holds a conflicting lock.
+
+    A DatabaseBusyError is not: it was already retried, and an outer policy
+    must not multiply the attempts of an inner one.
+    """
+    if not isinstance(error, sqlite3.OperationalError) or isinstance(error, DatabaseBusyError):
+        return False
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (SQLITE_BUSY, SQLITE_LOCKED)
+    message = str(error).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter, bounded by attempts and a deadline.
+
+    Each retry sleeps a random time between zero and min(max_delay,
+    base_delay * 2 ** attempt), so writers that collided spread out instead
+    of colliding again; no sleep runs past the deadline.
+    """
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 0.01, max_delay: float = 0.2,
+                 deadline: float = 2.0, sleep: Callable[[float], None] = time.sleep):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.sleep = sleep
+
+    @classmethod
+    def from_env(cls) -> 'RetryPolicy':
+        """Policy configured from DB_RETRY_* env vars."""
+        return cls(
+            max_attempts=int(os.getenv('DB_RETRY_MAX_ATTEMPTS', '5')),
+            base_delay=float(os.getenv('DB_RETRY_BASE_DELAY_MS', '10')) / 1000,
+            max_delay=float(os.getenv('DB_RETRY_MAX_DELAY_MS', '200')) / 1000,
+            deadline=float(os.getenv('DB_RETRY_DEADLINE_MS', '2000')) / 1000
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Sleep before retry number `attempt` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def run(self, fn: Callable[[], Any], operation: str = 'default') -> Any:
+        """Call fn, retrying busy/locked failures; raise DatabaseBusyError once out of attempts or time."""
+        deadline = time.monotonic() + self.deadline
+        request_deadline = CURRENT_DEADLINE.get()
+        if request_deadline is not None:
+            # Waiting for the lock is no use once the request's database budget is spent
+            deadline = min(deadline, request_deadline.expires_at)
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e):
+                    raise
+                delay = self.backoff(attempt)
+                attempt += 1
+                if attempt >= self.max_attempts or time.monotonic() + delay > deadline:
+                    DB_BUSY_FAILURES.labels(operation).inc()
+                    raise DatabaseBusyError(f'{operation}: database is busy, gave up after {attempt} attempts') from e
+                DB_BUSY_RETRIES.labels(operation).inc()
+                self.sleep(delay)
+
+
+_default_policy: Optional[RetryPolicy] = None
+
+
+def default_policy() -> RetryPolicy:
+    """The process-wide policy, read from the environment on first use."""
+    global _default_policy
+    if _default_policy is None:
+        _default_policy = RetryPolicy.from_env()
+    return _default_policy
+
+
+def retry_on_busy(operation: str):
+    """Decorate a repository method so busy/locked failures are retried under the default policy.
+
+    The whole method is re-run, which is safe because a write's BEGIN
+    IMMEDIATE fails before any statement runs. Inside a unit of work whose
+    transaction is already open, statements cannot be replayed on their own,
+    so the method runs once and the failure ends the unit of work.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            unit_of_work = CURRENT_UNIT_OF_WORK.get()
+            if unit_of_work is not None and unit_of_work.active:
+                return method(*args, **kwargs)
+            return default_policy().run(lambda: method(*args, **kwargs), operation)
+        return wrapper
+    return decorator
@@ -0,0 +1,151 @@
+"""
+One connection and one transaction shared by every repository call in a scope.
+"""
+import sqlite3
+from contextvars import Token
+from typing import Callable, List, Optional
+from src.monitoring.metrics import REGISTRY
+from src.repository.database import CURRENT_UNIT_OF_WORK, DatabaseConnection, TimedConnection
+from src.repository.retry import default_policy
+
+
+UNITS_OF_WORK = REGISTRY.counter(
+    'db_units_of_work_total', 'Units of work that opened a connection, by mode and outcome.', ('mode', 'outcome'))
+
+
+class UnitOfWorkConnection(TimedConnection):
+    """Connection lent to repositories by a unit of work.
+
+    Repositories commit and use the connection as a context manager as if it
+    were their own; both are no-ops here, so the unit of work alone decides
+    when the transaction ends.
+    """
+
+    def commit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class UnitOfWork:
+    """Lazily opened connection and transaction that repositories share while bound.
+
+    Nothing is opened until a repository asks for a connection. A write unit
+    starts with BEGIN IMMEDIATE, taking SQLite's write lock up front: a
+    deferred transaction that reads and then writes can fail with SQLITE_BUSY
+    on the upgrade without waiting out the busy timeout. Side effects that
+    must not be seen before the data they describe (cache invalidation, say)
+    are deferred with after_commit().
+    """
+
+    def __init__(self, db_connection: DatabaseConnection, write: bool = False):
+        self.db_connection = db_connection
+        self.write = write
+        self._conn: Optional[sqlite3.Connection] = None
+        self._token: Optional[Token] = None
+        self._after_commit: List[Callable[[], None]] = []
+
+    @staticmethod
+    def current() -> Optional['UnitOfWork']:
+        """The unit of work bound to this context, if any."""
+        return CURRENT_UNIT_OF_WORK.get()
+
+    @property
+    def active(self) -> bool:
+        """True while a transaction is open."""
+        return self._conn is not None
+
+    def connection(self, write: bool = False) -> sqlite3.Connection:
+        """The shared connection, opened and its transaction begun on first use.
+        
+        A write requested before the transaction begins makes it a write unit.
+        Raises DatabaseBusyError if the write lock stays taken past the retry policy.
+        """
+        if self._conn is None:
+            self.write = self.write or write
+            conn = self.db_connection.connect(factory=UnitOfWorkConnection)
+            # Autocommit mode: the only BEGIN and COMMIT are the ones issued here
+            conn.isolation_level = None
+            begin = 'BEGIN IMMEDIATE' if self.write else 'BEGIN'
+            try:
+                # The call that opens the unit (often the auth token lookup) is
+                # not a retry_on_busy method, so the wait for the lock is retried here
+                default_policy().run(lambda: conn.execute(begin), 'begin')
+            except sqlite3.Error:
+                conn.close()
+                raise
+            self._conn = conn
+        return self._conn
+
+    def after_commit(self, callback: Callable[[], None]):
+        """Run callback once the transaction has committed; a rollback discards it."""
+        self._after_commit.append(callback)
+
+    def bind(self):
+        """Make this the unit of work repositories use in the current context."""
+        self._token = CURRENT_UNIT_OF_WORK.set(self)
+
+    def unbind(self):
+        if self._token is not None:
+            CURRENT_UNIT_OF_WORK.reset(self._token)
+            self._token = None
+
+    def commit(self):
+        """Commit the transaction, if one was opened, and close the connection."""
+        if self._conn is None:
+            return
+        # A busy COMMIT leaves the transaction open and may be retried; if it
+        # never succeeds the transaction stays open for rollback()
+        conn = self._conn
+        default_policy().run(lambda: conn.execute('COMMIT'), 'commit')
+        self._finish('commit')
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self):
+        """Roll back the transaction, if one was opened, and close the connection."""
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute('ROLLBACK')
+        except sqlite3.Error:
+            # SQLite may already have rolled back (a failed COMMIT or a full disk); closing is enough
+            pass
+        self._after_commit = []
+        self._finish('rollback')
+
+    def _finish(self, outcome: str):
+        self._conn.close()
+        self._conn = None
+        UNITS_OF_WORK.labels('write' if self.write else 'read', outcome).inc()
+
+    def __enter__(self) -> 'UnitOfWork':
+        self.bind()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.commit()
+        finally:
+            self.rollback()
+            self.unbind()
+        return False
+
+
+def run_after_commit(callback: Callable[[], None]):
+    """Run callback after the current unit of work commits, or now if no transaction is open.
+
+    Outside a unit of work each repository call has already committed its own
+    transaction by the time this is called.
+    """
+    unit_of_work = CURRENT_UNIT_OF_WORK.get()
+    if unit_of_work is not None and unit_of_work.active:
+        unit_of_work.after_commit(callback)
+    else:
+        callback()
@@ -4,6 +4,7 @@ Repository for user-related database operations.
 from typing import Optional
 from .user_model import User
 from .database import DatabaseConnection
+from .retry import retry_on_busy
 
 
 class UserRepository:
@@ -38,9 +39,10 @@ class UserRepository:
                           password=row['password'], role=row['role'])
         return None
     
+    @retry_on_busy('user.create')
     def create(self, user: User) -> User:
         """Create a new user."""
-        with self.db_connection.get_connection() as conn:
+        with self.db_connection.get_connection(write=True) as conn:
             cursor = conn.execute(
                 "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
                 (user.username, user.password, user.role)
@@ -2,9 +2,20 @@
 Service package for business logic operations.
 """
 from .authentication_service import AuthenticationService
+from .expense_cache import ExpenseCache
 from .expense_service import ExpenseService
+from .change_notifier import ChangeNotifier
+from .idempotency import IdempotencyStore, IdempotencyKeyInUse, IdempotencyKeyMismatch
+from .readiness_service import ReadinessService, ReadinessThresholds
 
 __all__ = [
     'AuthenticationService',
-    'ExpenseService'
+    'ExpenseService',
+    'ExpenseCache',
+    'ChangeNotifier',
+    'IdempotencyStore',
+    'IdempotencyKeyInUse',
+    'IdempotencyKeyMismatch',
+    'ReadinessService',
+    'ReadinessThresholds'
 ]
\ No newline at end of file
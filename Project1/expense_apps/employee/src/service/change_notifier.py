@@ -0,0 +1,126 @@
+"""
+Per-worker fan-out of database change events to waiting request threads.
+"""
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from src.monitoring.metrics import REGISTRY
+from src.repository.change_detector import ChangeDetector, ChangeEvent
+
+
+logger = logging.getLogger(__name__)
+
+CHANGE_LISTENERS = REGISTRY.gauge(
+    'change_listeners', 'Requests waiting on change notifications, such as event streams.')
+CHANGE_LISTENERS_REJECTED = REGISTRY.counter(
+    'change_listeners_rejected', 'Listeners turned away because the worker already had max_listeners.')
+
+
+class ChangeNotifier:
+    """One poller thread per worker that wakes the listeners of users named in change events.
+
+    The thread polls the detector every `interval` seconds while anyone is
+    listening and exits once nobody is. Listeners keep a per-user count and
+    wait for it to move, so a notification arriving while a listener is busy
+    is not lost. `max_listeners` bounds try_listen(), so long-lived streams
+    cannot take every request thread of the worker.
+    """
+
+    def __init__(self, detector: ChangeDetector, interval: float = 0.5, tables: Iterable[str] = ('approvals',),
+                 max_listeners: Optional[int] = None):
+        self.detector = detector
+        self.interval = interval
+        self.tables = frozenset(tables)
+        self.max_listeners = max_listeners
+        self._counts: Dict[int, int] = {}
+        self._listeners = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+        detector.subscribe(self.notify)
+
+    def notify(self, events: List[ChangeEvent]):
+        """Wake listeners of the users whose tracked tables changed."""
+        users = {event.user_id for event in events if event.table_name in self.tables}
+        if not users:
+            return
+        with self._cond:
+            for user_id in users:
+                self._counts[user_id] = self._counts.get(user_id, 0) + 1
+            self._cond.notify_all()
+
+    def count(self, user_id: int) -> int:
+        """Notifications seen so far for the user; pass it to wait()."""
+        with self._cond:
+            return self._counts.get(user_id, 0)
+
+    def wait(self, user_id: int, seen: int, timeout: float) -> int:
+        """Block until the user's count differs from `seen` or `timeout` passes; return the count."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._counts.get(user_id, 0) != seen, timeout)
+            return self._counts.get(user_id, 0)
+
+    @contextmanager
+    def listening(self) -> Iterator['ChangeNotifier']:
+        """Keep the poller running for the duration of the block."""
+        with self._cond:
+            self._start()
+        try:
+            yield self
+        finally:
+            self._stop()
+
+    def try_listen(self) -> Optional[Callable[[], None]]:
+        """Start listening unless max_listeners already are; return a callable that stops, or None.
+
+        The returned callable may be called more than once; only the first call counts.
+        """
+        with self._cond:
+            self._reset_after_fork()
+            if self.max_listeners is not None and self._listeners >= self.max_listeners:
+                CHANGE_LISTENERS_REJECTED.inc()
+                return None
+            self._start()
+        stopped = threading.Lock()
+
+        def stop():
+            if stopped.acquire(blocking=False):
+                self._stop()
+        return stop
+
+    def _reset_after_fork(self):
+        if self._pid != os.getpid():
+            # Inherited across fork: the parent's thread does not exist here
+            self._pid = os.getpid()
+            self._thread = None
+            self._listeners = 0
+
+    def _start(self):
+        self._reset_after_fork()
+        self._listeners += 1
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='change-notifier', daemon=True)
+            self._thread.start()
+        CHANGE_LISTENERS.inc()
+
+    def _stop(self):
+        CHANGE_LISTENERS.dec()
+        with self._cond:
+            self._listeners -= 1
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # Sleeps between polls; a departing last listener wakes it to exit
+                self._cond.wait_for(lambda: self._listeners == 0, self.interval)
+                if self._listeners == 0:
+                    self._thread = None
+                    return
+            try:
+                self.detector.poll()
+            except Exception:
+                # A locked or briefly unavailable database must not end the poller
+                logger.exception('change detector poll failed')
@@ -0,0 +1,160 @@
+"""
+Bounded per-user cache of expense reads.
+"""
+import dataclasses
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+from src.monitoring.metrics import REGISTRY
+from src.repository.change_detector import ChangeDetector, ChangeEvent
+
+
+CACHE_REQUESTS = REGISTRY.counter(
+    'cache_requests_total', 'Cache lookups by result.', ('cache', 'result'))
+CACHE_EVICTIONS = REGISTRY.counter(
+    'cache_evictions_total', 'Cache entries evicted, by reason.', ('cache', 'reason'))
+CACHE_INVALIDATIONS = REGISTRY.counter(
+    'cache_invalidations_total', 'Cache invalidations, by scope.', ('cache', 'scope'))
+CACHE_ENTRIES = REGISTRY.gauge('cache_entries', 'Entries held in the cache.', ('cache',))
+CACHE_BYTES = REGISTRY.gauge('cache_bytes', 'Estimated memory held by cache entries.', ('cache',))
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Rough deep size in bytes of rows made of lists, tuples, dicts and dataclasses."""
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    elif dataclasses.is_dataclass(value):
+        size += sum(estimate_size(v, _depth + 1) for v in vars(value).values())
+    return size
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'expires_at', 'user_id')
+
+    def __init__(self, value: Any, size: int, expires_at: float, user_id: int):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.user_id = user_id
+
+
+class ExpenseCache:
+    """LRU cache with TTL, an entry cap and a memory cap, invalidated per user.
+
+    Writes made through the service invalidate the writing user's entries.
+    Commits by anyone else (the Java manager app approving an expense) arrive
+    as ChangeEvents from `changes`, which is polled before each lookup, and
+    invalidate the users they name.
+    """
+
+    def __init__(self, name: str = 'expenses', max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024,
+                 ttl: float = 30.0, changes: Optional[ChangeDetector] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.changes = changes
+        self.bytes = 0
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._user_keys: Dict[int, Set[Hashable]] = {}
+        self._user_generations: Dict[int, int] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        if changes is not None:
+            changes.subscribe(self.apply_changes)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _poll_changes(self):
+        if self.changes is not None:
+            self.changes.poll()
+
+    def apply_changes(self, events: Iterable[ChangeEvent]):
+        """Invalidate the users named by change events."""
+        for user_id in {event.user_id for event in events}:
+            self.invalidate_user(user_id)
+
+    def token(self, user_id: int) -> Tuple[int, int]:
+        """Snapshot to pass to put(), so a load that raced an invalidation is not stored."""
+        self._poll_changes()
+        with self._lock:
+            return self._generation, self._user_generations.get(user_id, 0)
+
+    def get(self, user_id: int, key: Hashable) -> Tuple[bool, Any]:
+        """Return (hit, value) for the user's key."""
+        self._poll_changes()
+        full_key = (user_id, key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(full_key, 'ttl')
+                self._update_gauges()
+                entry = None
+            if entry is None:
+                CACHE_REQUESTS.labels(self.name, 'miss').inc()
+                return False, None
+            self._entries.move_to_end(full_key)
+            CACHE_REQUESTS.labels(self.name, 'hit').inc()
+            return True, entry.value
+
+    def put(self, user_id: int, key: Hashable, value: Any, token: Tuple[int, int]):
+        """Store a value loaded after token() was taken, unless it has been invalidated since."""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        full_key = (user_id, key)
+        with self._lock:
+            if token != (self._generation, self._user_generations.get(user_id, 0)):
+                return
+            if full_key in self._entries:
+                self._remove(full_key, None)
+            self._entries[full_key] = _Entry(value, size, time.monotonic() + self.ttl, user_id)
+            self._user_keys.setdefault(user_id, set()).add(full_key)
+            self.bytes += size
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)), 'lru')
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)), 'memory')
+            self._update_gauges()
+
+    def invalidate_user(self, user_id: int):
+        """Drop every entry for the user."""
+        with self._lock:
+            self._user_generations[user_id] = self._user_generations.get(user_id, 0) + 1
+            for full_key in list(self._user_keys.get(user_id, ())):
+                self._remove(full_key, None)
+            self._update_gauges()
+        CACHE_INVALIDATIONS.labels(self.name, 'user').inc()
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._user_keys.clear()
+            self.bytes = 0
+            self._update_gauges()
+        CACHE_INVALIDATIONS.labels(self.name, 'all').inc()
+
+    def _remove(self, full_key: Hashable, reason: Optional[str]):
+        entry = self._entries.pop(full_key)
+        self.bytes -= entry.size
+        keys = self._user_keys.get(entry.user_id)
+        if keys is not None:
+            keys.discard(full_key)
+            if not keys:
+                del self._user_keys[entry.user_id]
+        if reason:
+            CACHE_EVICTIONS.labels(self.name, reason).inc()
+
+    def _update_gauges(self):
+        CACHE_ENTRIES.labels(self.name).set(len(self._entries))
+        CACHE_BYTES.labels(self.name).set(self.bytes)
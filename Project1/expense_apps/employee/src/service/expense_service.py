@@ -1,29 +1,112 @@
 """
 Service for expense-related business operations.
 """
-from typing import List, Optional, Tuple
+import calendar
+import dataclasses
+import itertools
+import math
+import re
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
 from datetime import datetime
 from src.repository.expense_model import Expense
 from src.repository.approval_model import Approval
 from src.repository.expense_repository import ExpenseRepository
-from src.repository.approval_repository import ApprovalRepository
+from src.repository.approval_repository import ApprovalRepository, EXPENSE_FIELDS
+from src.repository.expense_filter import ExpenseFilter, EXPENSE_SORTS
+from src.repository.unit_of_work import run_after_commit
+from src.service.expense_cache import ExpenseCache
+from src.service.idempotency import IdempotencyStore, request_fingerprint
+from src.service.single_flight import SingleFlight
+
+
+# Upper bound on ids accepted by a single batch read
+MAX_BATCH_IDS = 100
+
+# Page size bounds and the most words a search query may use
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+MAX_SEARCH_TERMS = 16
+
+# Query-string criteria of the filtered expense list, besides a status list
+EXPENSE_FILTER_PARAMS = ('date_from', 'date_to', 'month', 'min_amount', 'max_amount', 'sort')
+
+# Approval statuses in the order a status filter is normalised to
+STATUSES = ('pending', 'approved', 'denied')
+
+# Fields pushed to clients when a manager reviews an expense
+STATUS_FIELDS = ('id', 'status', 'comment', 'review_date')
 
 
 class ExpenseService:
     """Service for expense-related business operations."""
     
-    def __init__(self, expense_repository: ExpenseRepository, approval_repository: ApprovalRepository):
+    def __init__(self, expense_repository: ExpenseRepository, approval_repository: ApprovalRepository,
+                 cache: Optional[ExpenseCache] = None, idempotency: Optional[IdempotencyStore] = None):
         self.expense_repository = expense_repository
         self.approval_repository = approval_repository
+        self.cache = cache
+        self.idempotency = idempotency
+        # Identical concurrent list reads share one query; the version keeps a read
+        # that starts after a write from joining one that started before it
+        self.single_flight = SingleFlight()
+        self._versions = itertools.count(1)
+        self.data_version = 0
+    
+    def _record_write(self, user_id: int):
+        # Before the commit a concurrent read still sees the old rows and could
+        # cache them again after an early invalidation
+        run_after_commit(lambda: self._invalidate(user_id))
+    
+    def _invalidate(self, user_id: int):
+        self.data_version = next(self._versions)
+        if self.cache is not None:
+            self.cache.invalidate_user(user_id)
+    
+    def _read(self, operation: str, user_id: int, key: Hashable, load: Callable):
+        """Serve a list read from the cache, else from one coalesced query."""
+        if self.cache is not None:
+            hit, value = self.cache.get(user_id, (operation,) + key)
+            if hit:
+                return value
+            token = self.cache.token(user_id)
+        
+        result, _ = self.single_flight.do((operation, user_id) + key + (self.data_version,),
+                                          load, operation=operation)
+        
+        if self.cache is not None:
+            self.cache.put(user_id, (operation,) + key, result, token)
+        return result
     
-    def submit_expense(self, user_id: int, amount: float, description: str, date: str = None) -> Expense:
-        """Submit a new expense for the user."""
+    def submit_expense(self, user_id: int, amount: float, description: str, date: str = None,
+                       idempotency_key: Optional[str] = None) -> Expense:
+        """Submit a new expense for the user.
+        
+        A retry carrying the same idempotency key returns the expense created by
+        the first request instead of creating another.
+        """
         if amount <= 0:
             raise ValueError("Amount must be greater than 0")
         
         if not description.strip():
             raise ValueError("Description is required")
         
+        if idempotency_key is None or self.idempotency is None:
+            return self._create_expense(user_id, amount, description, date)
+        
+        request_hash = request_fingerprint(amount, description, date)
+        stored = self.idempotency.begin(user_id, idempotency_key, request_hash)
+        if stored is not None:
+            return Expense(**stored)
+        
+        try:
+            created = self._create_expense(user_id, amount, description, date)
+        except BaseException:
+            self.idempotency.abandon(user_id, idempotency_key)
+            raise
+        self.idempotency.complete(user_id, idempotency_key, request_hash, dataclasses.asdict(created))
+        return created
+    
+    def _create_expense(self, user_id: int, amount: float, description: str, date: Optional[str]) -> Expense:
         # Use current date if none provided
         if not date:
             date = datetime.now().strftime('%Y-%m-%d')
@@ -36,11 +119,14 @@ class ExpenseService:
             date=date
         )
         
-        return self.expense_repository.create(expense)
+        created = self.expense_repository.create(expense)
+        self._record_write(user_id)
+        return created
     
     def get_user_expenses_with_status(self, user_id: int) -> List[Tuple[Expense, Approval]]:
         """Get all expenses for a user with their approval status."""
-        return self.approval_repository.find_expenses_with_status_for_user(user_id)
+        return self._read('expenses', user_id, (),
+                          lambda: self.approval_repository.find_expenses_with_status_for_user(user_id))
     
     def get_expense_by_id(self, expense_id: int, user_id: int) -> Optional[Expense]:
         """Get an expense by ID, ensuring it belongs to the user."""
@@ -49,8 +135,23 @@ class ExpenseService:
             return expense
         return None
     
-    def get_expense_with_status(self, expense_id: int, user_id: int) -> Optional[Tuple[Expense, Approval]]:
+    def get_expense_with_status(self, expense_id: int, user_id: int,
+                                fresh: bool = False) -> Optional[Tuple[Expense, Approval]]:
         """Get expense with its approval status, ensuring it belongs to the user."""
+        if self.cache is None or fresh:
+            return self._find_expense_with_status(expense_id, user_id)
+        
+        # Callers may modify the returned objects, so the cache keeps its own copies
+        hit, value = self.cache.get(user_id, ('expense', expense_id))
+        if hit:
+            return _copy_pair(value)
+        
+        token = self.cache.token(user_id)
+        result = self._find_expense_with_status(expense_id, user_id)
+        self.cache.put(user_id, ('expense', expense_id), _copy_pair(result), token)
+        return result
+    
+    def _find_expense_with_status(self, expense_id: int, user_id: int) -> Optional[Tuple[Expense, Approval]]:
         expense = self.get_expense_by_id(expense_id, user_id)
         if expense:
             approval = self.approval_repository.find_by_expense_id(expense_id)
@@ -60,8 +161,8 @@ class ExpenseService:
     
     def update_expense(self, expense_id: int, user_id: int, amount: float, description: str, date: str) -> Optional[Expense]:
         """Update an existing expense if it's still pending."""
-        # Get expense and check ownership and status
-        result = self.get_expense_with_status(expense_id, user_id)
+        # Get expense and check ownership and status against the database, not the cache
+        result = self.get_expense_with_status(expense_id, user_id, fresh=True)
         if not result:
             return None
         
@@ -82,12 +183,14 @@ class ExpenseService:
         expense.description = description.strip()
         expense.date = date
         
-        return self.expense_repository.update(expense)
+        updated = self.expense_repository.update(expense)
+        self._record_write(user_id)
+        return updated
     
     def delete_expense(self, expense_id: int, user_id: int) -> bool:
         """Delete an expense if it's still pending."""
-        # Get expense and check ownership and status
-        result = self.get_expense_with_status(expense_id, user_id)
+        # Get expense and check ownership and status against the database, not the cache
+        result = self.get_expense_with_status(expense_id, user_id, fresh=True)
         if not result:
             return False
         
@@ -97,7 +200,9 @@ class ExpenseService:
         if approval.status != 'pending':
             raise ValueError("Cannot delete expense that has been reviewed")
         
-        return self.expense_repository.delete(expense_id)
+        deleted = self.expense_repository.delete(expense_id)
+        self._record_write(user_id)
+        return deleted
     
     def get_expense_history(self, user_id: int, status_filter: str = None) -> List[Tuple[Expense, Approval]]:
         """Get expense history with optional status filter."""
@@ -107,4 +212,185 @@ class ExpenseService:
             return [(expense, approval) for expense, approval in all_expenses 
                    if approval.status == status_filter]
         
-        return all_expenses
\ No newline at end of file
+        return all_expenses
+    
+    def select_fields(self, fields: str) -> Tuple[str, ...]:
+        """Parse a comma-separated field list against the whitelist; id is always included."""
+        requested = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = requested - EXPENSE_FIELDS.keys()
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+        
+        # Canonical order keeps one cached statement per field set
+        return tuple(field for field in EXPENSE_FIELDS if field == 'id' or field in requested)
+    
+    def get_expense_history_fields(self, user_id: int, fields: Tuple[str, ...],
+                                   status_filter: str = None) -> List[Dict]:
+        """Get the requested fields of the expense history with optional status filter."""
+        if status_filter not in ['pending', 'approved', 'denied']:
+            status_filter = None
+        return self._read('expense_fields', user_id, (fields, status_filter),
+                          lambda: self.approval_repository.find_expense_fields_for_user(
+                              user_id, fields, status_filter))
+    
+    def build_expense_filter(self, date_from: str = None, date_to: str = None, month: str = None,
+                             min_amount: str = None, max_amount: str = None, status: str = None,
+                             sort: str = None) -> ExpenseFilter:
+        """Validate list criteria given as query-string values into an ExpenseFilter.
+        
+        month (YYYY-MM) is shorthand for that month's date range; status is a
+        comma-separated set; sort is one of EXPENSE_SORTS, newest first by default.
+        """
+        if month is not None:
+            if date_from is not None or date_to is not None:
+                raise ValueError("month cannot be combined with date_from or date_to")
+            try:
+                first = datetime.strptime(month, '%Y-%m')
+            except ValueError:
+                raise ValueError("month must be a YYYY-MM month")
+            date_from = f"{month}-01"
+            date_to = f"{month}-{calendar.monthrange(first.year, first.month)[1]:02d}"
+        dates = []
+        for name, value in (('date_from', date_from), ('date_to', date_to)):
+            if value is not None:
+                try:
+                    value = datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+                except ValueError:
+                    raise ValueError(f"{name} must be a YYYY-MM-DD date")
+            dates.append(value)
+        date_from, date_to = dates
+        if date_from is not None and date_to is not None and date_from > date_to:
+            raise ValueError("date_from must not be after date_to")
+        
+        amounts = []
+        for name, value in (('min_amount', min_amount), ('max_amount', max_amount)):
+            if value is not None:
+                try:
+                    value = float(value)
+                except ValueError:
+                    value = math.nan
+                if not math.isfinite(value):
+                    raise ValueError(f"{name} must be a number")
+            amounts.append(value)
+        min_amount, max_amount = amounts
+        if min_amount is not None and max_amount is not None and min_amount > max_amount:
+            raise ValueError("min_amount must not be greater than max_amount")
+        
+        requested = {value.strip() for value in (status or '').split(',') if value.strip()}
+        unknown = requested - set(STATUSES)
+        if unknown:
+            raise ValueError(f"Unknown status(es): {', '.join(sorted(unknown))}")
+        
+        sort = sort or '-date'
+        if sort not in EXPENSE_SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(EXPENSE_SORTS)}")
+        
+        # Canonical status order keeps one statement and cache entry per set
+        return ExpenseFilter(date_from=date_from, date_to=date_to, min_amount=min_amount, max_amount=max_amount,
+                             statuses=tuple(value for value in STATUSES if value in requested), sort=sort)
+    
+    def filter_expenses(self, user_id: int, expense_filter: ExpenseFilter,
+                        fields: Tuple[str, ...] = None) -> List[Dict]:
+        """Get the requested fields of the user's expenses that meet the filter, in its sort order."""
+        fields = fields or tuple(EXPENSE_FIELDS)
+        return self._read('expense_filter', user_id, (expense_filter, fields),
+                          lambda: self.approval_repository.find_expense_fields_matching(
+                              user_id, expense_filter, fields))
+    
+    def get_expense_fields(self, expense_id: int, user_id: int, fields: Tuple[str, ...]) -> Optional[Dict]:
+        """Get the requested fields of an expense, ensuring it belongs to the user."""
+        return self.approval_repository.find_expense_fields_by_id(expense_id, user_id, fields)
+    
+    def get_changes(self, user_id: int, since: int) -> Dict:
+        """Get the user's expenses changed or deleted after version `since`, and the version to sync from next."""
+        if since < 0:
+            raise ValueError("since must be a non-negative version")
+        version, changed, deleted = self.approval_repository.find_changes_for_user(user_id, since)
+        return {'version': version, 'expenses': changed, 'deleted': deleted}
+    
+    def get_status_changes(self, user_id: int, since: Optional[int] = None) -> Tuple[int, List[Dict]]:
+        """Get the version to resume from and the review fields of expenses changed after `since`.
+        
+        With no `since`, returns the current version and nothing else.
+        """
+        if since is None:
+            return self.approval_repository.current_change_version(), []
+        changes = self.get_changes(user_id, since)
+        return changes['version'], [{field: row[field] for field in STATUS_FIELDS}
+                                    for row in changes['expenses']]
+    
+    def search_expenses(self, user_id: int, query: str, limit: int = DEFAULT_SEARCH_LIMIT, offset: int = 0,
+                        fields: Tuple[str, ...] = None) -> Dict:
+        """Get a page of the user's expenses whose description matches the query's words, best first.
+        
+        Every word must match, as a prefix of a word in the description.
+        """
+        if not 1 <= limit <= MAX_SEARCH_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_SEARCH_LIMIT}")
+        if offset < 0:
+            raise ValueError("offset must be non-negative")
+        terms = re.findall(r'\w+', query or '')
+        if not terms:
+            raise ValueError("Search query must contain at least one word")
+        if len(terms) > MAX_SEARCH_TERMS:
+            raise ValueError(f"Search query can have at most {MAX_SEARCH_TERMS} words")
+        
+        # Quoted words cannot be read as FTS5 operators or column filters
+        match = ' '.join(f'"{term}"*' for term in terms)
+        # One extra row tells whether another page follows
+        rows = self.approval_repository.search_expense_fields(
+            user_id, match, fields or tuple(EXPENSE_FIELDS), limit + 1, offset)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'expenses': rows,
+            'count': len(rows),
+            'limit': limit,
+            'offset': offset,
+            'next_offset': offset + limit if has_more else None
+        }
+    
+    def get_summary(self, user_id: int) -> Dict:
+        """Count and total amount of the user's expenses overall, per status and per month."""
+        overall = {'count': 0, 'cents': 0}
+        by_status: Dict[str, Dict] = {}
+        by_month: Dict[str, Dict] = {}
+        for row in self.expense_repository.find_summary(user_id):
+            for bucket in (overall, by_status.setdefault(row['status'], {'count': 0, 'cents': 0}),
+                           by_month.setdefault(row['month'], {'count': 0, 'cents': 0})):
+                bucket['count'] += row['expense_count']
+                bucket['cents'] += row['total_cents']
+        
+        def totals(bucket: Dict) -> Dict:
+            return {'count': bucket['count'], 'total': bucket['cents'] / 100}
+        
+        return {
+            'overall': totals(overall),
+            'by_status': {status: totals(bucket) for status, bucket in by_status.items()},
+            'by_month': {month: totals(bucket) for month, bucket in by_month.items()}
+        }
+    
+    def get_expenses_by_ids(self, expense_ids: List[int], user_id: int,
+                            fields: Tuple[str, ...] = None) -> Tuple[List[Dict], List[int]]:
+        """Get several expenses owned by the user, returning found rows and missing ids."""
+        expense_ids = list(dict.fromkeys(expense_ids))
+        if not expense_ids:
+            raise ValueError("At least one expense id is required")
+        if len(expense_ids) > MAX_BATCH_IDS:
+            raise ValueError(f"At most {MAX_BATCH_IDS} expense ids can be requested at once")
+        
+        rows = self.approval_repository.find_expense_fields_by_ids(
+            expense_ids, user_id, fields or tuple(EXPENSE_FIELDS))
+        by_id = {row['id']: row for row in rows}
+        
+        # Preserve the requested order; ids not owned by the user are reported as not found
+        found = [by_id[expense_id] for expense_id in expense_ids if expense_id in by_id]
+        not_found = [expense_id for expense_id in expense_ids if expense_id not in by_id]
+        return found, not_found
+
+
+def _copy_pair(pair: Optional[Tuple[Expense, Approval]]) -> Optional[Tuple[Expense, Approval]]:
+    if pair is None:
+        return None
+    expense, approval = pair
+    return dataclasses.replace(expense), dataclasses.replace(approval)
@@ -0,0 +1,133 @@
+"""
+Idempotency keys: replay the original result of a retried write instead of repeating it.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from src.monitoring.metrics import REGISTRY
+from src.repository.idempotency_repository import IdempotencyRepository
+from src.repository.unit_of_work import run_after_commit
+
+
+# Upper bound on the length of a client-chosen key
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENT_REQUESTS = REGISTRY.counter(
+    'idempotent_requests_total', 'Requests carrying an idempotency key, by outcome.', ('outcome',))
+IDEMPOTENCY_KEYS_PURGED = REGISTRY.counter(
+    'idempotency_keys_purged_total', 'Expired idempotency keys garbage-collected.')
+
+
+class IdempotencyKeyInUse(Exception):
+    """A request with the same key is still being processed."""
+
+
+class IdempotencyKeyMismatch(Exception):
+    """The key was already used for a request with a different body."""
+
+
+def request_fingerprint(*values: Any) -> str:
+    """Stable hash of a request's parameters."""
+    return hashlib.sha256(json.dumps(values, separators=(',', ':')).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Idempotency records in SQLite, with completed ones also held in a bounded in-memory LRU.
+
+    The table is shared by every worker and is the source of truth; the LRU
+    answers repeated retries to the same worker without a query. Expired
+    records are deleted `gc_batch` at a time, at most once per `gc_interval`
+    unless the previous batch was full.
+    """
+
+    def __init__(self, repository: IdempotencyRepository, ttl: float = 24 * 3600, cache_size: int = 10000,
+                 stale_after: float = 60.0, gc_interval: float = 60.0, gc_batch: int = 500):
+        self.repository = repository
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.stale_after = stale_after
+        self.gc_interval = gc_interval
+        self.gc_batch = gc_batch
+        self._cache: 'OrderedDict[Tuple[int, str], Tuple[str, Dict, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._gc_due = 0.0
+
+    @staticmethod
+    def validate_key(key: str):
+        if not key or len(key) > MAX_KEY_LENGTH or not key.isprintable():
+            raise ValueError(f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} printable characters")
+
+    def begin(self, user_id: int, key: str, request_hash: str) -> Optional[Dict]:
+        """Claim the key for a new request, or return the stored response of the original one.
+
+        Raises IdempotencyKeyMismatch if the key was used for a different request
+        and IdempotencyKeyInUse if the original request has not finished.
+        """
+        self.validate_key(key)
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get((user_id, key))
+            if cached is not None and cached[2] <= now - self.ttl:
+                del self._cache[(user_id, key)]
+                cached = None
+            if cached is not None:
+                self._cache.move_to_end((user_id, key))
+        if cached is not None:
+            return self._replay(cached[0], request_hash, cached[1])
+
+        self._collect_garbage(now)
+        record = self.repository.claim(user_id, key, request_hash, now,
+                                       expired_before=now - self.ttl, stale_before=now - self.stale_after)
+        if record is None:
+            IDEMPOTENT_REQUESTS.labels('new').inc()
+            return None
+        if record['response'] is None and record['request_hash'] == request_hash:
+            IDEMPOTENT_REQUESTS.labels('in_progress').inc()
+            raise IdempotencyKeyInUse("A request with this Idempotency-Key is still being processed")
+
+        response = json.loads(record['response']) if record['response'] is not None else None
+        if response is not None:
+            self._remember(user_id, key, record['request_hash'], response, record['created_at'])
+        return self._replay(record['request_hash'], request_hash, response)
+
+    def complete(self, user_id: int, key: str, request_hash: str, response: Dict):
+        """Store the response of a claimed key for later retries.
+
+        The LRU learns it only once the transaction commits: a retry must not
+        replay the response of a write that was rolled back.
+        """
+        self.repository.complete(user_id, key, json.dumps(response, separators=(',', ':')))
+        created_at = time.time()
+        run_after_commit(lambda: self._remember(user_id, key, request_hash, response, created_at))
+
+    def abandon(self, user_id: int, key: str):
+        """Release the claim of a request that failed, so a retry runs it again."""
+        self.repository.release(user_id, key)
+
+    def _replay(self, stored_hash: str, request_hash: str, response: Dict) -> Dict:
+        if stored_hash != request_hash:
+            IDEMPOTENT_REQUESTS.labels('mismatch').inc()
+            raise IdempotencyKeyMismatch("Idempotency-Key was already used with a different request")
+        IDEMPOTENT_REQUESTS.labels('replayed').inc()
+        return dict(response)
+
+    def _remember(self, user_id: int, key: str, request_hash: str, response: Dict, created_at: float):
+        with self._lock:
+            self._cache[(user_id, key)] = (request_hash, response, created_at)
+            self._cache.move_to_end((user_id, key))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _collect_garbage(self, now: float):
+        with self._lock:
+            if now < self._gc_due:
+                return
+            self._gc_due = now + self.gc_interval  # other threads skip while this one collects
+        deleted = self.repository.delete_expired(now - self.ttl, self.gc_batch)
+        IDEMPOTENCY_KEYS_PURGED.inc(deleted)
+        if deleted >= self.gc_batch:
+            with self._lock:
+                self._gc_due = 0.0  # more to delete: the next request takes another batch
@@ -0,0 +1,119 @@
+"""
+Service deciding whether this worker should receive traffic.
+"""
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from src.monitoring.metrics import REGISTRY, MetricsRegistry
+from src.repository.database import DatabaseConnection
+
+
+@dataclass
+class ReadinessThresholds:
+    """Limits above which the worker reports itself as not ready."""
+    max_db_latency_ms: float = 250.0
+    max_wal_bytes: int = 64 * 1024 * 1024
+    max_saturation: float = 0.9
+    max_queue_depth: int = 32
+
+    @classmethod
+    def from_env(cls) -> 'ReadinessThresholds':
+        return cls(
+            max_db_latency_ms=float(os.getenv('READY_MAX_DB_LATENCY_MS', cls.max_db_latency_ms)),
+            max_wal_bytes=int(os.getenv('READY_MAX_WAL_BYTES', cls.max_wal_bytes)),
+            max_saturation=float(os.getenv('READY_MAX_SATURATION', cls.max_saturation)),
+            max_queue_depth=int(os.getenv('READY_MAX_QUEUE_DEPTH', cls.max_queue_depth))
+        )
+
+
+class ReadinessService:
+    """Runs a cheap database probe at most once per interval and checks load thresholds."""
+
+    def __init__(self, db_connection: DatabaseConnection, thresholds: ReadinessThresholds = None,
+                 interval_ms: float = 1000, capacity: Optional[int] = None,
+                 registry: MetricsRegistry = REGISTRY):
+        self.db_connection = db_connection
+        self.thresholds = thresholds or ReadinessThresholds()
+        self.interval = interval_ms / 1000
+        self.capacity = capacity
+        self.registry = registry
+        self._probe: Optional[Dict] = None
+        self._probed_at = 0.0
+        self._lock = threading.Lock()
+
+    def probe_database(self) -> Dict:
+        """Time a read of the schema page, failing fast if the database is locked."""
+        started = time.perf_counter()
+        try:
+            # mode=rw: a missing database file is an error rather than silently created
+            conn = sqlite3.connect(f"file:{quote(self.db_connection.db_path)}?mode=rw", uri=True,
+                                   timeout=self.thresholds.max_db_latency_ms / 1000)
+            try:
+                conn.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchall()
+            finally:
+                conn.close()
+            error = None
+        except sqlite3.Error as e:
+            error = str(e)
+
+        wal_path = self.db_connection.db_path + '-wal'
+        return {
+            'db_latency_ms': round((time.perf_counter() - started) * 1000, 3),
+            'db_error': error,
+            'wal_bytes': os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        }
+
+    def cached_probe(self) -> Dict:
+        """Latest probe result, refreshed by one caller at a time once it is stale."""
+        if self._probe is None or time.monotonic() - self._probed_at >= self.interval:
+            # Other callers keep serving the previous result while one refreshes
+            if self._lock.acquire(blocking=self._probe is None):
+                try:
+                    if self._probe is None or time.monotonic() - self._probed_at >= self.interval:
+                        self._probe = self.probe_database()
+                        self._probed_at = time.monotonic()
+                finally:
+                    self._lock.release()
+        return self._probe
+
+    def load(self) -> Dict:
+        """In-flight requests (excluding the probe itself), DB connections and pool queue."""
+        def gauge(name: str) -> int:
+            metric = self.registry.get(name)
+            return int(metric.value()) if metric else 0
+
+        busy = max(0, gauge('http_requests_in_flight') - 1)
+        load = {
+            'in_flight_requests': busy,
+            'db_connections_open': gauge('db_connections_open'),
+            'queue_depth': gauge('db_pool_waiting')
+        }
+        if self.capacity:
+            load['saturation'] = round(busy / self.capacity, 3)
+        return load
+
+    def check(self) -> Tuple[bool, Dict]:
+        """Return whether the worker is ready along with the measurements behind it."""
+        report = {**self.cached_probe(), **self.load()}
+        failures: List[str] = []
+
+        if report['db_error']:
+            failures.append(f"database unavailable: {report['db_error']}")
+        elif report['db_latency_ms'] > self.thresholds.max_db_latency_ms:
+            failures.append('database latency above threshold')
+
+        if report['wal_bytes'] > self.thresholds.max_wal_bytes:
+            failures.append('WAL size above threshold')
+
+        if report.get('saturation', 0) >= self.thresholds.max_saturation:
+            failures.append('request threads saturated')
+
+        if report['queue_depth'] > self.thresholds.max_queue_depth:
+            failures.append('database pool queue above threshold')
+
+        report['failures'] = failures
+        return not failures, report
@@ -0,0 +1,62 @@
+"""
+Coalescing of identical concurrent calls into one execution.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+from src.monitoring.metrics import REGISTRY
+
+
+SINGLE_FLIGHT_CALLS = REGISTRY.counter(
+    'singleflight_calls_total', 'Calls made through single-flight groups.', ('operation',))
+SINGLE_FLIGHT_SHARED = REGISTRY.counter(
+    'singleflight_shared_total', 'Calls answered with another in-flight call\'s result.', ('operation',))
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its outcome.
+
+    Results are shared between callers, so they must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], operation: str = 'default') -> Tuple[Any, bool]:
+        """Return (result, shared), running fn unless an identical call is in flight."""
+        SINGLE_FLIGHT_CALLS.labels(operation).inc()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            with self._lock:
+                self.shared += 1
+            SINGLE_FLIGHT_SHARED.labels(operation).inc()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
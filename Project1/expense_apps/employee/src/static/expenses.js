@@ -3,6 +3,9 @@
 class ExpenseManager {
     constructor() {
         this.currentUser = null;
+        // Local copy of the user's expenses by id, kept current with /api/expenses/changes
+        this.expenses = new Map();
+        this.syncVersion = 0;
         this.init();
     }
 
@@ -55,6 +58,9 @@ class ExpenseManager {
         
         // Show expenses by default
         this.showExpensesSection();
+        
+        // Push manager approvals and denials instead of waiting for a reload
+        this.listenForStatusChanges();
     }
 
     setupEventListeners() {
@@ -127,12 +133,16 @@ class ExpenseManager {
         const description = document.getElementById('description').value;
         const date = document.getElementById('date').value;
 
+        // Reuse the key after a network error, so resubmitting cannot create a duplicate
+        this.submitKey = this.submitKey || crypto.randomUUID();
+
         try {
             const response = await fetch('/api/expenses', {
                 method: 'POST',
-                headers: this.getAuthHeaders(),
+                headers: { ...this.getAuthHeaders(), 'Idempotency-Key': this.submitKey },
                 body: JSON.stringify({ amount: parseFloat(amount), description, date }),
             });
+            this.submitKey = null;
 
             const data = await response.json();
 
@@ -157,17 +167,18 @@ class ExpenseManager {
     }
 
     async loadExpenses() {
-        const statusFilter = document.getElementById('status-filter').value;
-        const url = statusFilter ? `/api/expenses?status=${statusFilter}` : '/api/expenses';
-
         try {
-            const response = await fetch(url, {
+            // Fetch only what changed since the last sync and merge it into the local copy
+            const response = await fetch(`/api/expenses/changes?since=${this.syncVersion}`, {
                 headers: this.getAuthHeaders()
             });
             const data = await response.json();
 
             if (response.ok) {
-                this.displayExpenses(data.expenses);
+                data.expenses.forEach(expense => this.expenses.set(expense.id, expense));
+                data.deleted.forEach(expenseId => this.expenses.delete(expenseId));
+                this.syncVersion = data.version;
+                this.renderExpenses();
             } else {
                 this.showMessage('expenses-list', data.error || 'Failed to load expenses', 'error');
             }
@@ -176,6 +187,40 @@ class ExpenseManager {
         }
     }
 
+    renderExpenses() {
+        const statusFilter = document.getElementById('status-filter').value;
+        const expenses = [...this.expenses.values()]
+            .filter(expense => !statusFilter || expense.status === statusFilter)
+            .sort((a, b) => b.date.localeCompare(a.date));
+        this.displayExpenses(expenses);
+    }
+
+    listenForStatusChanges() {
+        // The browser reconnects on its own, resuming from the last event id it received
+        const events = new EventSource('/api/expenses/events');
+        events.addEventListener('error', () => {
+            // A refusal (503 when the server has too many open streams) closes the source for
+            // good: open a new one later and reload what changed while it was away
+            if (events.readyState === EventSource.CLOSED) {
+                setTimeout(() => {
+                    this.listenForStatusChanges();
+                    this.loadExpenses();
+                }, 3000 + Math.random() * 3000);
+            }
+        });
+        events.addEventListener('status', (event) => {
+            const change = JSON.parse(event.data);
+            const expense = this.expenses.get(change.id);
+            if (!expense) {
+                return;
+            }
+            Object.assign(expense, change);
+            if (document.getElementById('expenses-section').style.display === 'block') {
+                this.renderExpenses();
+            }
+        });
+    }
+
     displayExpenses(expenses) {
         const container = document.getElementById('expenses-list');
         
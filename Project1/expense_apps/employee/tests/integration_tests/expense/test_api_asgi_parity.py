@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from main import create_app, create_asgi_app
+from src.repository import DatabaseConnection
+
+TEST_DB_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../test_db/test_expense_manager.db"
+))
+SEED_SQL_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../sql/seed.sql"
+))
+
+@pytest.fixture()
+def test_client():
+    # Ensure test DB directory exists
+    os.makedirs(os.path.dirname(TEST_DB_PATH), exist_ok=True)
+
+    # Set DB path BEFORE app creation
+    os.environ["TEST_MODE"] = "true"
+    os.environ["TEST_DATABASE_PATH"] = TEST_DB_PATH
+
+    # Initialize schema once
+    db = DatabaseConnection()
+    db.initialize_database()
+
+    app = create_app()
+    app.config["TESTING"] = True
+
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def setup_database(test_client):
+    """
+    Reset database state before each test and reseed.
+    Depends on test_client to guarantee schema exists.
+    """
+    db = DatabaseConnection()
+
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM approvals")
+        conn.execute("DELETE FROM expenses")
+        conn.execute("DELETE FROM users")
+
+        with open(SEED_SQL_PATH, "r") as f:
+            conn.executescript(f.read())
+
+        conn.commit()
+
+    yield
+# (method, path, query, JSON body, headers) sent in order to both stacks
+READS = [
+    ("GET", "/health", "", None, {}),
+    ("GET", "/api", "", None, {}),
+    ("GET", "/api/auth/status", "", None, {}),
+    ("GET", "/api/expenses", "", None, {}),
+    ("GET", "/api/expenses", "status=pending", None, {}),
+    ("GET", "/api/expenses", "fields=id,amount,status", None, {}),
+    ("GET", "/api/expenses", "ids=1,2,4,99", None, {}),
+    ("GET", "/api/expenses", "month=2025-01&min_amount=40&sort=amount", None, {}),
+    ("GET", "/api/expenses", "date_from=2025-13-01", None, {}),
+    ("GET", "/api/expenses/changes", "since=0", None, {}),
+    ("GET", "/api/expenses/summary", "", None, {}),
+    ("GET", "/api/expenses/search", "q=hotel", None, {}),
+    ("GET", "/api/expenses/1", "", None, {}),
+    ("GET", "/api/expenses/1", "fields=id,status", None, {}),
+    ("GET", "/api/expenses/4", "", None, {}),
+    ("PATCH", "/api/expenses/1", "", None, {}),
+]
+
+WRITES = [
+    ("POST", "/api/expenses", "", {"amount": 12.5, "description": "Taxi", "date": "2025-02-01"}, {}),
+    ("POST", "/api/expenses", "", {"amount": 9, "description": "Coffee", "date": "2025-02-02"},
+     {"Idempotency-Key": "parity-1"}),
+    ("POST", "/api/expenses", "", {"amount": 9, "description": "Coffee", "date": "2025-02-02"},
+     {"Idempotency-Key": "parity-1"}),
+    ("POST", "/api/expenses", "", {"amount": "abc", "description": "Bad"}, {}),
+    ("PUT", "/api/expenses/1", "", {"amount": 55, "description": "Client dinner", "date": "2025-01-05"}, {}),
+    ("PUT", "/api/expenses/2", "", {"amount": 1, "description": "Reviewed", "date": "2025-01-06"}, {}),
+    ("DELETE", "/api/expenses/6", "", None, {}),
+    ("DELETE", "/api/expenses/999", "", None, {}),
+    ("GET", "/api/expenses", "", None, {}),
+    ("GET", "/api/expenses/summary", "", None, {}),
+]
+
+
+class TestAsgiParityAPI:
+    """The ASGI app answers every API route exactly as the Flask app does."""
+
+    @pytest.fixture
+    def credentials(self):
+        return {"username": "employee1", "password": "password123"}
+
+    def reseed(self):
+        """Seed again, leaving no idempotency keys, tombstones or expense ids used by the last run."""
+        with DatabaseConnection().get_connection() as conn:
+            conn.execute("DELETE FROM idempotency_keys")
+            conn.execute("DELETE FROM approvals")
+            conn.execute("DELETE FROM expenses")
+            conn.execute("DELETE FROM users")
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+                conn.execute("DELETE FROM sqlite_sequence WHERE name = 'expenses'")
+            with open(SEED_SQL_PATH, "r") as f:
+                conn.executescript(f.read())
+            conn.execute("DELETE FROM expense_tombstones")
+            conn.commit()
+
+    def flask_responses(self, client, credentials, requests):
+        results = [self.flask_result(client.post("/api/auth/login", json=credentials))]
+        for method, path, query, body, headers in requests:
+            response = client.open(path, method=method, query_string=query, json=body, headers=headers)
+            results.append(self.flask_result(response))
+        return results
+
+    @staticmethod
+    def flask_result(response):
+        return response.status_code, response.headers.get("Retry-After"), response.get_json(silent=True)
+
+    def asgi_responses(self, credentials, requests):
+        app = create_asgi_app()
+
+        async def flow():
+            status, headers, body = await self.asgi_call(app, "POST", "/api/auth/login", "", credentials, {})
+            cookie = headers[b"set-cookie"].split(b";")[0].decode()
+            results = [(status, None, json.loads(body))]
+            for method, path, query, payload, extra in requests:
+                status, headers, body = await self.asgi_call(
+                    app, method, path, query, payload, {**extra, "Cookie": cookie})
+                retry_after = headers.get(b"retry-after")
+                results.append((status, retry_after and retry_after.decode(), self.json_or_none(body)))
+            return results
+
+        try:
+            return asyncio.run(flow())
+        finally:
+            app.db_executor.shutdown()
+
+    @staticmethod
+    def json_or_none(body):
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+
+    @staticmethod
+    async def asgi_call(app, method, path, query, payload, headers):
+        headers = dict(headers)
+        body = b""
+        if payload is not None:
+            body = json.dumps(payload).encode()
+            headers["Content-Type"] = "application/json"
+        scope = {
+            "type": "http", "method": method, "path": path, "query_string": query.encode(),
+            "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        }
+        messages = [{"type": "http.request", "body": body}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+
+        await app(scope, receive, send)
+        headers = {}
+        for name, value in sent[0]["headers"]:
+            headers.setdefault(name, value)
+        return sent[0]["status"], headers, b"".join(message.get("body", b"") for message in sent[1:])
+
+    def test_reads_match(self, credentials, test_client, setup_database):
+        flask = self.flask_responses(test_client, credentials, READS)
+        asgi = self.asgi_responses(credentials, READS)
+
+        for request, flask_result, asgi_result in zip([("POST", "/api/auth/login")] + READS, flask, asgi):
+            assert asgi_result == flask_result, request[:3]
+
+    def test_writes_match(self, credentials, test_client, setup_database):
+        self.reseed()
+        flask = self.flask_responses(test_client, credentials, WRITES)
+        self.reseed()
+        asgi = self.asgi_responses(credentials, WRITES)
+
+        for request, flask_result, asgi_result in zip([("POST", "/api/auth/login")] + WRITES, flask, asgi):
+            assert asgi_result == flask_result, request[:3]
+        assert [status for status, _, _ in asgi] == [200, 201, 201, 201, 400, 200, 400, 200, 404, 200, 200]
+        self.reseed()
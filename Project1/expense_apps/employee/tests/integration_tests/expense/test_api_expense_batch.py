@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from main import create_app
+from src.repository import DatabaseConnection
+
+TEST_DB_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../test_db/test_expense_manager.db"
+))
+SEED_SQL_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../sql/seed.sql"
+))
+
+@pytest.fixture()
+def test_client():
+    # Ensure test DB directory exists
+    os.makedirs(os.path.dirname(TEST_DB_PATH), exist_ok=True)
+
+    # Set DB path BEFORE app creation
+    os.environ["TEST_MODE"] = "true"
+    os.environ["TEST_DATABASE_PATH"] = TEST_DB_PATH
+
+    # Initialize schema once
+    db = DatabaseConnection()
+    db.initialize_database()
+
+    app = create_app()
+    app.config["TESTING"] = True
+
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def setup_database(test_client):
+    """
+    Reset database state before each test and reseed.
+    Depends on test_client to guarantee schema exists.
+    """
+    db = DatabaseConnection()
+
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM approvals")
+        conn.execute("DELETE FROM expenses")
+        conn.execute("DELETE FROM users")
+
+        with open(SEED_SQL_PATH, "r") as f:
+            conn.executescript(f.read())
+
+        conn.commit()
+
+    yield
+
+class TestBatchExpenseAPI:
+
+    @pytest.fixture
+    def credentials(self):
+        return {"username": "employee1", "password": "password123"}
+
+    def test_get_expenses_by_ids_positive(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        # Expense 4 belongs to employee2 and 999 does not exist
+        response = test_client.get("/api/expenses?ids=3,1,4,999")
+        assert response.status_code == 200
+        data = response.get_json()
+
+        assert [expense["id"] for expense in data["expenses"]] == [3, 1]
+        assert data["expenses"][0]["status"] == "denied"
+        assert data["expenses"][1]["amount"] == 50.0
+        assert data["count"] == 2
+        assert data["not_found"] == [4, 999]
+
+    def test_get_expenses_by_ids_with_fields(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        response = test_client.get("/api/expenses?ids=1,2&fields=status")
+        assert response.status_code == 200
+        data = response.get_json()
+
+        assert data["expenses"] == [
+            {"id": 1, "status": "pending"},
+            {"id": 2, "status": "approved"}
+        ]
+
+    @pytest.mark.parametrize("ids", ["1,abc", ",".join(str(i) for i in range(1, 102))])
+    def test_get_expenses_by_ids_negative_400(self, ids, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        response = test_client.get(f"/api/expenses?ids={ids}")
+        assert response.status_code == 400
+
+    def test_get_expenses_by_ids_user_not_logged_in(self, test_client):
+        response = test_client.get("/api/expenses?ids=1,2")
+        assert response.status_code == 401
@@ -0,0 +1,122 @@
+import os
+
+import pytest
+
+from main import create_app
+from src.repository import DatabaseConnection
+
+TEST_DB_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../test_db/test_expense_manager.db"
+))
+SEED_SQL_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../sql/seed.sql"
+))
+
+@pytest.fixture()
+def test_client():
+    # Ensure test DB directory exists
+    os.makedirs(os.path.dirname(TEST_DB_PATH), exist_ok=True)
+
+    # Set DB path BEFORE app creation
+    os.environ["TEST_MODE"] = "true"
+    os.environ["TEST_DATABASE_PATH"] = TEST_DB_PATH
+
+    # Initialize schema once
+    db = DatabaseConnection()
+    db.initialize_database()
+
+    app = create_app()
+    app.config["TESTING"] = True
+
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def setup_database(test_client):
+    """
+    Reset database state before each test and reseed.
+    Depends on test_client to guarantee schema exists.
+    """
+    db = DatabaseConnection()
+
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM approvals")
+        conn.execute("DELETE FROM expenses")
+        conn.execute("DELETE FROM users")
+
+        with open(SEED_SQL_PATH, "r") as f:
+            conn.executescript(f.read())
+
+        conn.commit()
+
+    yield
+class TestExpenseChangesAPI:
+
+    @pytest.fixture
+    def credentials(self):
+        return {"username": "employee1", "password": "password123"}
+
+    def test_get_changes_from_zero_returns_all_user_expenses(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        response = test_client.get("/api/expenses/changes?since=0")
+        assert response.status_code == 200
+        data = response.get_json()
+
+        assert sorted(expense["id"] for expense in data["expenses"]) == [1, 2, 3, 6]
+        assert data["deleted"] == []
+        assert data["version"] > 0
+
+    def test_get_changes_returns_only_rows_changed_since_version(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+        version = test_client.get("/api/expenses/changes?since=0").get_json()["version"]
+
+        submitted = test_client.post("/api/expenses", json={"amount": 12.5, "description": "Taxi", "date": "2025-02-01"})
+        assert submitted.status_code == 201
+        deleted = test_client.delete("/api/expenses/1")
+        assert deleted.status_code == 200
+
+        response = test_client.get(f"/api/expenses/changes?since={version}")
+        assert response.status_code == 200
+        data = response.get_json()
+
+        assert [expense["id"] for expense in data["expenses"]] == [submitted.get_json()["expense"]["id"]]
+        assert data["expenses"][0]["status"] == "pending"
+        assert data["deleted"] == [1]
+        assert data["version"] > version
+
+        # Nothing has changed since the returned version
+        again = test_client.get(f"/api/expenses/changes?since={data['version']}").get_json()
+        assert again["expenses"] == [] and again["deleted"] == []
+
+    def test_get_changes_includes_approvals_made_outside_the_app(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+        version = test_client.get("/api/expenses/changes?since=0").get_json()["version"]
+
+        # The manager app writes approvals directly to the shared database
+        with DatabaseConnection().get_connection() as conn:
+            conn.execute("UPDATE approvals SET status = 'approved', reviewer = 3, comment = 'OK', "
+                         "review_date = '2025-02-02' WHERE expense_id = 6")
+            conn.commit()
+
+        data = test_client.get(f"/api/expenses/changes?since={version}").get_json()
+
+        assert [(expense["id"], expense["status"], expense["comment"]) for expense in data["expenses"]] == \
+            [(6, "approved", "OK")]
+
+    @pytest.mark.parametrize("since", ["abc", "-1"])
+    def test_get_changes_invalid_since_400(self, since, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        response = test_client.get(f"/api/expenses/changes?since={since}")
+        assert response.status_code == 400
+
+    def test_get_changes_user_not_logged_in(self, test_client):
+        response = test_client.get("/api/expenses/changes?since=0")
+        assert response.status_code == 401
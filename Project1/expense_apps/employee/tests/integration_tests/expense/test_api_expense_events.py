@@ -0,0 +1,135 @@
+import os
+
+import pytest
+
+from main import create_app
+from src.repository import DatabaseConnection
+
+TEST_DB_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../test_db/test_expense_manager.db"
+))
+SEED_SQL_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../sql/seed.sql"
+))
+
+@pytest.fixture()
+def test_client():
+    # Ensure test DB directory exists
+    os.makedirs(os.path.dirname(TEST_DB_PATH), exist_ok=True)
+
+    # Set DB path BEFORE app creation
+    os.environ["TEST_MODE"] = "true"
+    os.environ["TEST_DATABASE_PATH"] = TEST_DB_PATH
+
+    # Initialize schema once
+    db = DatabaseConnection()
+    db.initialize_database()
+
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["EVENTS_HEARTBEAT_SECONDS"] = 0.2
+    app.change_notifier.interval = 0.02
+
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def setup_database(test_client):
+    """
+    Reset database state before each test and reseed.
+    Depends on test_client to guarantee schema exists.
+    """
+    db = DatabaseConnection()
+
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM approvals")
+        conn.execute("DELETE FROM expenses")
+        conn.execute("DELETE FROM users")
+
+        with open(SEED_SQL_PATH, "r") as f:
+            conn.executescript(f.read())
+
+        conn.commit()
+
+    yield
+def approve_outside_app(expense_id):
+    """Review an expense the way the manager app does, straight in the shared database."""
+    with DatabaseConnection().get_connection() as conn:
+        conn.execute("UPDATE approvals SET status = 'approved', reviewer = 3, comment = 'OK', "
+                     "review_date = '2025-02-02' WHERE expense_id = ?", (expense_id,))
+        conn.commit()
+
+
+def read_events(chunks, count):
+    """Read SSE messages, skipping heartbeats, until `count` non-comment messages arrive."""
+    messages = []
+    while len(messages) < count:
+        text = next(chunks).decode()
+        if not text.startswith(":"):
+            messages.append(text)
+    return messages
+
+
+class TestExpenseEventsAPI:
+
+    @pytest.fixture
+    def credentials(self):
+        return {"username": "employee1", "password": "password123"}
+
+    def test_events_push_status_change_made_outside_app(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        response = test_client.get("/api/expenses/events")
+        assert response.status_code == 200
+        chunks = iter(response.response)
+        retry, ready = read_events(chunks, 2)
+        assert retry.startswith("retry:")
+        assert "event: ready" in ready
+
+        approve_outside_app(6)
+        (status,) = read_events(chunks, 1)
+        response.close()
+
+        assert "event: status" in status
+        assert '"id": 6, "status": "approved", "comment": "OK", "review_date": "2025-02-02"' in status
+
+    def test_events_resume_from_last_event_id(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+        version = test_client.get("/api/expenses/changes?since=0").get_json()["version"]
+
+        # Happens while the client is disconnected
+        approve_outside_app(1)
+
+        response = test_client.get("/api/expenses/events", headers={"Last-Event-ID": str(version)})
+        chunks = iter(response.response)
+        _, ready, status = read_events(chunks, 3)
+        response.close()
+
+        assert "event: ready" in ready
+        assert '"id": 1, "status": "approved"' in status
+
+    def test_events_beyond_the_stream_cap_answer_503(self, credentials, test_client, setup_database):
+        test_client.application.change_notifier.max_listeners = 1
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        first = test_client.get("/api/expenses/events")
+        assert first.status_code == 200
+        refused = test_client.get("/api/expenses/events")
+        assert refused.status_code == 503
+        assert refused.headers["Retry-After"] == "3"
+        assert "Too many open event streams" in refused.get_json()["error"]
+
+        # Closing a stream before it sent anything frees its slot
+        first.close()
+        second = test_client.get("/api/expenses/events")
+        assert second.status_code == 200
+        second.close()
+
+    def test_events_user_not_logged_in(self, test_client):
+        response = test_client.get("/api/expenses/events")
+        assert response.status_code == 401
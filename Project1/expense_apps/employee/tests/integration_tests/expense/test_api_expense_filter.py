@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from main import create_app
+from src.repository import DatabaseConnection
+
+TEST_DB_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../test_db/test_expense_manager.db"
+))
+SEED_SQL_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../sql/seed.sql"
+))
+
+@pytest.fixture()
+def test_client():
+    # Ensure test DB directory exists
+    os.makedirs(os.path.dirname(TEST_DB_PATH), exist_ok=True)
+
+    # Set DB path BEFORE app creation
+    os.environ["TEST_MODE"] = "true"
+    os.environ["TEST_DATABASE_PATH"] = TEST_DB_PATH
+
+    # Initialize schema once
+    db = DatabaseConnection()
+    db.initialize_database()
+
+    app = create_app()
+    app.config["TESTING"] = True
+
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def setup_database(test_client):
+    """
+    Reset database state before each test and reseed.
+    Depends on test_client to guarantee schema exists.
+    """
+    db = DatabaseConnection()
+
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM approvals")
+        conn.execute("DELETE FROM expenses")
+        conn.execute("DELETE FROM users")
+
+        with open(SEED_SQL_PATH, "r") as f:
+            conn.executescript(f.read())
+
+        conn.commit()
+
+    yield
+class TestExpenseFilterAPI:
+
+    @pytest.fixture
+    def credentials(self):
+        return {"username": "employee1", "password": "password123"}
+
+    @pytest.mark.parametrize("query, expected_ids", [
+        ("month=2025-01", [6, 3, 2, 1]),
+        ("date_from=2025-01-06&date_to=2025-01-07&sort=date", [2, 3, 6]),
+        ("min_amount=40&max_amount=200&sort=-amount", [6, 2, 1]),
+        ("status=pending,approved&sort=amount", [1, 2, 6]),
+        ("month=2025-01&status=denied", [3]),
+        ("month=2024-12", []),
+    ])
+    def test_filter_and_sort_own_expenses(self, credentials, test_client, setup_database, query, expected_ids):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        response = test_client.get(f"/api/expenses?{query}")
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [expense["id"] for expense in data["expenses"]] == expected_ids
+        assert data["count"] == len(expected_ids)
+
+    def test_filter_projects_fields_and_sees_new_expenses(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+        assert test_client.get("/api/expenses?month=2025-02").get_json()["expenses"] == []
+
+        submitted = test_client.post("/api/expenses", json={"amount": 12.5, "description": "Taxi", "date": "2025-02-03"})
+        assert submitted.status_code == 201
+
+        response = test_client.get("/api/expenses?month=2025-02&fields=amount,status")
+        assert response.get_json()["expenses"] == [
+            {"id": submitted.get_json()["expense"]["id"], "amount": 12.5, "status": "pending"}]
+
+    @pytest.mark.parametrize("query", ["sort=description", "month=January", "min_amount=abc", "status=pending,lost"])
+    def test_invalid_filter_400(self, credentials, test_client, setup_database, query):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        response = test_client.get(f"/api/expenses?{query}")
+        assert response.status_code == 400
+        assert "error" in response.get_json()
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+
+import pytest
+
+from main import create_app
+from src.repository import DatabaseConnection, RetryPolicy
+from src.repository import retry
+
+TEST_DB_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../test_db/test_expense_manager.db"
+))
+SEED_SQL_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../sql/seed.sql"
+))
+
+@pytest.fixture()
+def test_client(monkeypatch):
+    # Wait briefly for the lock, so a held lock fails fast
+    monkeypatch.setenv("DB_BUSY_TIMEOUT_MS", "50")
+    monkeypatch.setattr(retry, "_default_policy", RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.005))
+
+    # Ensure test DB directory exists
+    os.makedirs(os.path.dirname(TEST_DB_PATH), exist_ok=True)
+
+    # Set DB path BEFORE app creation
+    os.environ["TEST_MODE"] = "true"
+    os.environ["TEST_DATABASE_PATH"] = TEST_DB_PATH
+
+    # Initialize schema once
+    db = DatabaseConnection()
+    db.initialize_database()
+
+    app = create_app()
+    app.config["TESTING"] = True
+
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def setup_database(test_client):
+    """
+    Reset database state before each test and reseed.
+    Depends on test_client to guarantee schema exists.
+    """
+    db = DatabaseConnection()
+
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM approvals")
+        conn.execute("DELETE FROM expenses")
+        conn.execute("DELETE FROM users")
+
+        with open(SEED_SQL_PATH, "r") as f:
+            conn.executescript(f.read())
+
+        conn.commit()
+
+    yield
+class TestExpenseLockedDatabaseAPI:
+
+    @pytest.fixture
+    def credentials(self):
+        return {"username": "employee1", "password": "password123"}
+
+    @pytest.fixture
+    def write_lock(self):
+        """Hold SQLite's write lock from another connection, as a long manager-app write would."""
+        conn = sqlite3.connect(TEST_DB_PATH)
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.rollback()
+        conn.close()
+
+    def count_expenses(self, description):
+        with DatabaseConnection().get_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM expenses WHERE description = ?", (description,)).fetchone()[0]
+
+    def test_submit_while_locked_503(self, credentials, test_client, setup_database, write_lock):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        failures = retry.DB_BUSY_FAILURES.value("begin")
+
+        response = test_client.post("/api/expenses", json={"amount": 12.5, "description": "Locked out"})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert response.get_json() == {"error": "Database is busy, please retry"}
+        assert retry.DB_BUSY_FAILURES.value("begin") == failures + 1
+
+    def test_update_while_locked_503(self, credentials, test_client, setup_database, write_lock):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        response = test_client.put("/api/expenses/1", 
+                                   json={"amount": 75.0, "description": "Changed", "date": "2025-01-05"})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+    def test_submit_succeeds_once_lock_is_released(self, credentials, test_client, setup_database, write_lock):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+        assert test_client.post("/api/expenses", json={"amount": 12.5, "description": "Locked out"}).status_code == 503
+
+        write_lock.rollback()
+        response = test_client.post("/api/expenses", json={"amount": 12.5, "description": "Locked out"})
+
+        assert response.status_code == 201
+        assert self.count_expenses("Locked out") == 1
+
+    def test_reads_are_not_blocked(self, credentials, test_client, setup_database, write_lock):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        assert test_client.get("/api/expenses").status_code == 200
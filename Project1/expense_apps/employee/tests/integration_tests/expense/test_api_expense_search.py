@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from main import create_app
+from src.repository import DatabaseConnection
+
+TEST_DB_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../test_db/test_expense_manager.db"
+))
+SEED_SQL_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../sql/seed.sql"
+))
+
+@pytest.fixture()
+def test_client():
+    # Ensure test DB directory exists
+    os.makedirs(os.path.dirname(TEST_DB_PATH), exist_ok=True)
+
+    # Set DB path BEFORE app creation
+    os.environ["TEST_MODE"] = "true"
+    os.environ["TEST_DATABASE_PATH"] = TEST_DB_PATH
+
+    # Initialize schema once
+    db = DatabaseConnection()
+    db.initialize_database()
+
+    app = create_app()
+    app.config["TESTING"] = True
+
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def setup_database(test_client):
+    """
+    Reset database state before each test and reseed.
+    Depends on test_client to guarantee schema exists.
+    """
+    db = DatabaseConnection()
+
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM approvals")
+        conn.execute("DELETE FROM expenses")
+        conn.execute("DELETE FROM users")
+
+        with open(SEED_SQL_PATH, "r") as f:
+            conn.executescript(f.read())
+
+        conn.commit()
+
+    yield
+class TestExpenseSearchAPI:
+
+    @pytest.fixture
+    def credentials(self):
+        return {"username": "employee1", "password": "password123"}
+
+    def test_search_matches_words_and_prefixes_of_own_expenses(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        response = test_client.get("/api/expenses/search?q=trav")
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [expense["id"] for expense in data["expenses"]] == [6]
+        assert data["expenses"][0]["status"] == "pending"
+        assert data["next_offset"] is None
+
+        # "Flight ticket" belongs to another employee
+        assert test_client.get("/api/expenses/search?q=flight").get_json()["expenses"] == []
+
+    def test_search_sees_new_and_edited_expenses(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        submitted = test_client.post("/api/expenses", json={"amount": 12.5, "description": "Airport taxi", "date": "2025-02-01"})
+        assert submitted.status_code == 201
+        updated = test_client.put("/api/expenses/1", json={"amount": 50, "description": "Team dinner", "date": "2025-01-05"})
+        assert updated.status_code == 200
+
+        assert [e["id"] for e in test_client.get("/api/expenses/search?q=taxi").get_json()["expenses"]] == \
+            [submitted.get_json()["expense"]["id"]]
+        assert [e["id"] for e in test_client.get("/api/expenses/search?q=dinner").get_json()["expenses"]] == [1]
+        assert test_client.get("/api/expenses/search?q=lunch").get_json()["expenses"] == []
+
+    def test_search_pages_results(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+        for day in range(1, 4):
+            test_client.post("/api/expenses", json={"amount": 5, "description": "Coffee", "date": f"2025-03-0{day}"})
+
+        first = test_client.get("/api/expenses/search?q=coffee&limit=2").get_json()
+        second = test_client.get(f"/api/expenses/search?q=coffee&limit=2&offset={first['next_offset']}").get_json()
+
+        assert first["count"] == 2 and first["next_offset"] == 2
+        assert second["count"] == 1 and second["next_offset"] is None
+        assert {e["id"] for e in first["expenses"]}.isdisjoint(e["id"] for e in second["expenses"])
+
+    def test_search_without_words_400(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        response = test_client.get("/api/expenses/search?q=%22%22")
+        assert response.status_code == 400
@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+from main import create_app
+from src.repository import DatabaseConnection
+
+TEST_DB_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../test_db/test_expense_manager.db"
+))
+SEED_SQL_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../sql/seed.sql"
+))
+
+@pytest.fixture()
+def test_client():
+    # Ensure test DB directory exists
+    os.makedirs(os.path.dirname(TEST_DB_PATH), exist_ok=True)
+
+    # Set DB path BEFORE app creation
+    os.environ["TEST_MODE"] = "true"
+    os.environ["TEST_DATABASE_PATH"] = TEST_DB_PATH
+
+    # Initialize schema once
+    db = DatabaseConnection()
+    db.initialize_database()
+
+    app = create_app()
+    app.config["TESTING"] = True
+
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def setup_database(test_client):
+    """
+    Reset database state before each test and reseed.
+    Depends on test_client to guarantee schema exists.
+    """
+    db = DatabaseConnection()
+
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM approvals")
+        conn.execute("DELETE FROM expenses")
+        conn.execute("DELETE FROM users")
+
+        with open(SEED_SQL_PATH, "r") as f:
+            conn.executescript(f.read())
+
+        conn.commit()
+
+    yield
+class TestExpenseSummaryAPI:
+
+    @pytest.fixture
+    def credentials(self):
+        return {"username": "employee1", "password": "password123"}
+
+    def test_summary_totals_by_status_and_month(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        response = test_client.get("/api/expenses/summary")
+        assert response.status_code == 200
+
+        assert response.get_json() == {
+            "overall": {"count": 4, "total": 480.0},
+            "by_status": {
+                "approved": {"count": 1, "total": 200.0},
+                "denied": {"count": 1, "total": 30.0},
+                "pending": {"count": 2, "total": 250.0}
+            },
+            "by_month": {"2025-01": {"count": 4, "total": 480.0}}
+        }
+
+    def test_summary_follows_submissions_and_manager_reviews(self, credentials, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        submitted = test_client.post("/api/expenses", json={"amount": 12.5, "description": "Taxi", "date": "2025-02-01"})
+        assert submitted.status_code == 201
+
+        # The manager app approves an expense directly in the shared database
+        with DatabaseConnection().get_connection() as conn:
+            conn.execute("UPDATE approvals SET status = 'approved' WHERE expense_id = 1")
+            conn.commit()
+
+        data = test_client.get("/api/expenses/summary").get_json()
+        assert data["overall"] == {"count": 5, "total": 492.5}
+        assert data["by_status"]["approved"] == {"count": 2, "total": 250.0}
+        assert data["by_status"]["pending"] == {"count": 2, "total": 212.5}
+        assert data["by_month"]["2025-02"] == {"count": 1, "total": 12.5}
+
+    def test_summary_requires_auth(self, test_client, setup_database):
+        response = test_client.get("/api/expenses/summary")
+        assert response.status_code == 401
+
+    def test_rebuild_summary_command_repairs_drift(self, test_client, setup_database):
+        with DatabaseConnection().get_connection() as conn:
+            conn.execute("UPDATE expense_summary SET expense_count = expense_count + 1")
+            conn.commit()
+        runner = test_client.application.test_cli_runner()
+
+        check = runner.invoke(args=["rebuild-summary", "--check"])
+        assert check.exit_code == 1
+        assert "drifted rows" in check.output
+
+        rebuild = runner.invoke(args=["rebuild-summary"])
+        assert rebuild.exit_code == 0
+        assert "repaired" in rebuild.output
+
+        assert runner.invoke(args=["rebuild-summary", "--check"]).output.strip() == "expense_summary is consistent"
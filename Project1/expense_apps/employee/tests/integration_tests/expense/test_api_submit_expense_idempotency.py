@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from main import create_app
+from src.repository import DatabaseConnection
+
+TEST_DB_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../test_db/test_expense_manager.db"
+))
+SEED_SQL_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    "../../sql/seed.sql"
+))
+
+@pytest.fixture()
+def test_client():
+    # Ensure test DB directory exists
+    os.makedirs(os.path.dirname(TEST_DB_PATH), exist_ok=True)
+
+    # Set DB path BEFORE app creation
+    os.environ["TEST_MODE"] = "true"
+    os.environ["TEST_DATABASE_PATH"] = TEST_DB_PATH
+
+    # Initialize schema once
+    db = DatabaseConnection()
+    db.initialize_database()
+
+    app = create_app()
+    app.config["TESTING"] = True
+
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def setup_database(test_client):
+    """
+    Reset database state before each test and reseed.
+    Depends on test_client to guarantee schema exists.
+    """
+    db = DatabaseConnection()
+
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM approvals")
+        conn.execute("DELETE FROM expenses")
+        conn.execute("DELETE FROM users")
+
+        with open(SEED_SQL_PATH, "r") as f:
+            conn.executescript(f.read())
+
+        conn.commit()
+
+    yield
+class TestSubmitExpenseIdempotencyAPI:
+
+    @pytest.fixture
+    def credentials(self):
+        return {"username": "employee1", "password": "password123"}
+
+    @pytest.fixture
+    def expense(self):
+        return {"amount": 42.0, "description": "Conference badge", "date": "2025-03-01"}
+
+    def count_expenses(self, description):
+        with DatabaseConnection().get_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM expenses WHERE description = ?", (description,)).fetchone()[0]
+
+    def test_retry_with_same_key_returns_original_expense(self, credentials, expense, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        first = test_client.post("/api/expenses", json=expense, headers={"Idempotency-Key": "retry-1"})
+        retry = test_client.post("/api/expenses", json=expense, headers={"Idempotency-Key": "retry-1"})
+
+        assert first.status_code == 201
+        assert retry.status_code == 201
+        assert retry.get_json()["expense"] == first.get_json()["expense"]
+        assert self.count_expenses("Conference badge") == 1
+
+    def test_same_key_with_different_body_422(self, credentials, expense, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        first = test_client.post("/api/expenses", json=expense, headers={"Idempotency-Key": "retry-2"})
+        changed = test_client.post("/api/expenses", json={**expense, "amount": 43.0},
+                                   headers={"Idempotency-Key": "retry-2"})
+
+        assert first.status_code == 201
+        assert changed.status_code == 422
+        assert self.count_expenses("Conference badge") == 1
+
+    def test_requests_without_key_are_not_deduplicated(self, credentials, expense, test_client, setup_database):
+        login_response = test_client.post("/api/auth/login", json=credentials)
+        assert login_response.status_code == 200
+
+        test_client.post("/api/expenses", json=expense)
+        test_client.post("/api/expenses", json=expense)
+
+        assert self.count_expenses("Conference badge") == 2
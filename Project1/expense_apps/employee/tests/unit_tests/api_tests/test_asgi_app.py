@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from flask import Flask, Response, jsonify, request
+
+from src.api import AsgiApp
+from src.api.asgi_app import build_environ
+from src.repository import DatabaseExecutor
+
+
+@pytest.fixture
+def db_executor():
+  executor = DatabaseExecutor(max_workers=2)
+  yield executor
+  executor.shutdown()
+
+@pytest.fixture
+def flask_app():
+  app = Flask(__name__)
+  app.testing = True
+
+  @app.route("/echo", methods=["POST"])
+  def echo():
+    return jsonify({
+      "json": request.get_json(),
+      "args": request.args.to_dict(),
+      "cookie": request.cookies.get("jwt_token"),
+      "thread": threading.current_thread().name
+    }), 201
+
+  @app.route("/stream")
+  def stream():
+    def chunks():
+      for i in range(3):
+        yield f"data: {i}\n\n"
+    return Response(chunks(), mimetype="text/event-stream")
+
+  return app
+
+@pytest.fixture
+def app(flask_app, db_executor):
+  return AsgiApp(flask_app, db_executor)
+
+
+async def call(app, method, path, body=b"", query="", headers=(), disconnect_after=None, chunks=None):
+  scope = {
+    "type": "http",
+    "method": method,
+    "path": path,
+    "query_string": query.encode(),
+    "headers": [(name.encode(), value.encode()) for name, value in headers],
+  }
+  chunks = chunks if chunks is not None else [body]
+  messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+              for i, chunk in enumerate(chunks)]
+  sent = []
+  gone = asyncio.Event()
+
+  async def receive():
+    if messages:
+      return messages.pop(0)
+    await gone.wait()
+    return {"type": "http.disconnect"}
+
+  async def send(message):
+    sent.append(message)
+    chunks = [m for m in sent if m["type"] == "http.response.body" and m.get("more_body")]
+    if disconnect_after is not None and len(chunks) >= disconnect_after:
+      gone.set()
+      await asyncio.sleep(0)
+
+  await app(scope, receive, send)
+  start = sent[0]
+  return start["status"], dict(start["headers"]), b"".join(m.get("body", b"") for m in sent[1:]), sent
+
+
+def test_request_runs_through_flask_on_the_pool(app):
+  status, headers, body, _ = asyncio.run(call(
+    app, "POST", "/echo", body=json.dumps({"amount": 5}).encode(), query="status=pending",
+    headers=[("Content-Type", "application/json"), ("Cookie", "jwt_token=abc")]))
+
+  data = json.loads(body)
+  assert status == 201
+  assert headers[b"content-type"] == b"application/json"
+  assert data["json"] == {"amount": 5}
+  assert data["args"] == {"status": "pending"}
+  assert data["cookie"] == "abc"
+  assert data["thread"].startswith("db")
+
+def test_flask_errors_pass_through(app):
+  status, _, _, _ = asyncio.run(call(app, "GET", "/nope"))
+  assert status == 404
+  status, _, _, _ = asyncio.run(call(app, "GET", "/echo"))
+  assert status == 405
+
+def test_streamed_response_is_sent_chunk_by_chunk(app):
+  status, headers, body, sent = asyncio.run(call(app, "GET", "/stream"))
+
+  assert status == 200
+  assert headers[b"content-type"].startswith(b"text/event-stream")
+  assert body == b"data: 0\n\ndata: 1\n\ndata: 2\n\n"
+  assert [m.get("more_body", False) for m in sent[1:]] == [True, True, True, False]
+
+def test_client_disconnect_stops_the_stream(app):
+  _, _, body, _ = asyncio.run(call(app, "GET", "/stream", disconnect_after=1))
+
+  assert body == b"data: 0\n\n"
+
+def test_body_arriving_in_chunks_is_joined(app):
+  payload = json.dumps({"amount": 5, "description": "x" * 100}).encode()
+  status, _, body, _ = asyncio.run(call(
+    app, "POST", "/echo", chunks=[payload[:10], payload[10:60], payload[60:]],
+    headers=[("Content-Type", "application/json")]))
+
+  assert status == 201
+  assert json.loads(body)["json"] == {"amount": 5, "description": "x" * 100}
+
+def test_body_over_the_cap_is_refused_before_flask(flask_app, db_executor):
+  app = AsgiApp(flask_app, db_executor, max_body_size=16)
+
+  # Announced by Content-Length: refused without reading the body
+  status, headers, body, _ = asyncio.run(call(
+    app, "POST", "/echo", body=b"x" * 17, headers=[("Content-Length", "17")]))
+  assert status == 413
+  assert "exceeds 16 bytes" in json.loads(body)["error"]
+
+  # Streamed without a length: refused once the chunks pass the cap
+  status, _, _, _ = asyncio.run(call(app, "POST", "/echo", chunks=[b"x" * 10, b"x" * 10]))
+  assert status == 413
+
+  status, _, _, _ = asyncio.run(call(
+    app, "POST", "/echo", body=b"{}", headers=[("Content-Type", "application/json")]))
+  assert status == 201
+
+def test_environ_joins_repeated_headers_and_keeps_content_type():
+  environ = build_environ({
+    "method": "GET", "path": "/café", "query_string": b"a=1",
+    "headers": [(b"accept", b"a"), (b"accept", b"b"), (b"content-type", b"text/plain"),
+                (b"content-length", b"999")],
+  }, b"xy")
+
+  assert environ["HTTP_ACCEPT"] == "a,b"
+  assert environ["CONTENT_TYPE"] == "text/plain"
+  assert environ["CONTENT_LENGTH"] == "2"
+  assert environ["PATH_INFO"] == "/café".encode("utf-8").decode("latin-1")
+  assert environ["wsgi.input"].read() == b"xy"
+
+def test_lifespan_shutdown_stops_the_pool(app, db_executor):
+  messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+  sent = []
+
+  async def receive():
+    return messages.pop(0)
+
+  async def send(message):
+    sent.append(message["type"])
+
+  asyncio.run(app({"type": "lifespan"}, receive, send))
+
+  assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+  with pytest.raises(RuntimeError):
+    db_executor._executor.submit(print)
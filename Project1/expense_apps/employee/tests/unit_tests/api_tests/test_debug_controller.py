@@ -0,0 +1,114 @@
+import pytest
+from flask import Flask
+from src.api import debug_bp
+from src.monitoring import StackSampler, MemoryTracker, sign_profile_request
+
+SECRET = "profile-secret"
+APP_SECRET = "app-secret"
+BASE_ROUTE = "/debug"
+
+@pytest.fixture
+def app(monkeypatch):
+  monkeypatch.setenv("PROFILE_SECRET", SECRET)
+  app = Flask(__name__)
+  app.testing = True
+  app.config["SECRET_KEY"] = APP_SECRET
+  app.stack_sampler = StackSampler(hz=200)
+  app.memory_tracker = MemoryTracker()
+  app.register_blueprint(debug_bp)
+  yield app
+  app.stack_sampler.stop()
+  app.memory_tracker.stop()
+
+@pytest.fixture
+def client(app):
+  return app.test_client()
+
+def signed(path, method="GET"):
+  return {"X-Profile-Request": sign_profile_request(SECRET, method, path)}
+
+def test_profile_requires_signature(client):
+  assert client.get(f"{BASE_ROUTE}/profile").status_code == 401
+  bad = {"X-Profile-Request": sign_profile_request("other", "GET", f"{BASE_ROUTE}/profile")}
+  assert client.get(f"{BASE_ROUTE}/profile", headers=bad).status_code == 403
+
+def test_app_secret_is_not_accepted(client):
+  header = {"X-Profile-Request": sign_profile_request(APP_SECRET, "GET", f"{BASE_ROUTE}/profile")}
+  assert client.get(f"{BASE_ROUTE}/profile", headers=header).status_code == 403
+
+def test_missing_profile_secret_refuses_every_request(client, monkeypatch):
+  monkeypatch.delenv("PROFILE_SECRET")
+  for secret in (SECRET, APP_SECRET):
+    header = {"X-Profile-Request": sign_profile_request(secret, "GET", f"{BASE_ROUTE}/memory")}
+    response = client.get(f"{BASE_ROUTE}/memory", headers=header)
+    assert response.status_code == 403
+    assert "PROFILE_SECRET" in response.get_json()["error"]
+
+def test_profile_returns_collapsed_stacks(client):
+  response = client.get(f"{BASE_ROUTE}/profile?seconds=0.2", headers=signed(f"{BASE_ROUTE}/profile"))
+
+  assert response.status_code == 200
+  assert response.mimetype == "text/plain"
+  lines = response.get_data(as_text=True).splitlines()
+  assert lines
+  counts = [int(line.rsplit(" ", 1)[1]) for line in lines]
+  assert counts == sorted(counts, reverse=True)
+
+def test_profile_without_wait_returns_history(client, app):
+  app.stack_sampler.sample()
+
+  response = client.get(f"{BASE_ROUTE}/profile?seconds=5&wait=false", headers=signed(f"{BASE_ROUTE}/profile"))
+
+  assert response.status_code == 200
+  assert response.get_data(as_text=True)
+
+@pytest.mark.parametrize("seconds", ["abc", "0", "-1", "100000"])
+def test_profile_invalid_seconds_400(client, seconds):
+  response = client.get(f"{BASE_ROUTE}/profile?seconds={seconds}", headers=signed(f"{BASE_ROUTE}/profile"))
+
+  assert response.status_code == 400
+
+def test_memory_status_counts_live_objects(client):
+  response = client.get(f"{BASE_ROUTE}/memory", headers=signed(f"{BASE_ROUTE}/memory"))
+
+  assert response.status_code == 200
+  data = response.get_json()
+  assert data["tracing"] is False
+  assert set(data["live_objects"]) == {"Expense", "Approval", "sqlite3.Connection"}
+
+def test_memory_snapshot_before_start_409(client):
+  path = f"{BASE_ROUTE}/memory/snapshots/before"
+  response = client.post(path, headers=signed(path, "POST"))
+
+  assert response.status_code == 409
+
+def test_memory_start_snapshot_and_diff(client):
+  start = f"{BASE_ROUTE}/memory/start"
+  snapshot = f"{BASE_ROUTE}/memory/snapshots/before"
+  diff = f"{BASE_ROUTE}/memory/diff"
+
+  assert client.post(f"{start}?frames=2", headers=signed(start, "POST")).get_json()["frames"] == 2
+  assert client.post(snapshot, headers=signed(snapshot, "POST")).status_code == 201
+  response = client.get(f"{diff}?base=before&limit=3", headers=signed(diff))
+
+  assert response.status_code == 200
+  data = response.get_json()
+  assert data["target"] == "latest"
+  assert len(data["diffs"]) <= 3
+  assert {"file", "line", "size_diff", "count_diff"} <= set(data["diffs"][0])
+
+def test_memory_diff_unknown_snapshot_404(client):
+  start = f"{BASE_ROUTE}/memory/start"
+  diff = f"{BASE_ROUTE}/memory/diff"
+  client.post(start, headers=signed(start, "POST"))
+
+  response = client.get(f"{diff}?base=missing", headers=signed(diff))
+
+  assert response.status_code == 404
+
+@pytest.mark.parametrize("query", ["", "?base=a&limit=x", "?base=a&group_by=traceback"])
+def test_memory_diff_invalid_params_400(client, query):
+  diff = f"{BASE_ROUTE}/memory/diff"
+  response = client.get(f"{diff}{query}", headers=signed(diff))
+
+  assert response.status_code == 400
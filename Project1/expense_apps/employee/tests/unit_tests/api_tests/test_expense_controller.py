@@ -2,8 +2,9 @@ import importlib
 import pytest
 from flask import Flask
 from unittest.mock import MagicMock
-from src.repository import User, Expense, Approval
+from src.repository import User, Expense, Approval, DatabaseBusyError, QueryTimeoutError
 from src.api import auth
+from src.service import IdempotencyKeyInUse, IdempotencyKeyMismatch
 import src.api.expense_controller as expense_controller
 
 BASE_ROUTE = "/api/expenses"
@@ -88,7 +89,8 @@ def test_submit_expense_positive_inputs_201_expense(client, app, monkeypatch, js
     user_id=1,
     amount=expected_amount,
     description=expected_description,
-    date=expected_date
+    date=expected_date,
+    idempotency_key=None
   )
   assert response.json["message"] == "Expense submitted successfully"
   assert response.json["expense"]["amount"] == fake_expense.amount
@@ -120,6 +122,7 @@ def test_submit_expense_negative_inputs_errors(client, app, monkeypatch, json, s
   [
     (ValueError(), 400),
     (Exception(), 500),
+    (DatabaseBusyError("database is locked"), 503),
   ]
 )
 def test_submit_expense_exception_error(client, app, monkeypatch, exception, status_code):
@@ -142,7 +145,8 @@ def test_submit_expense_exception_error(client, app, monkeypatch, exception, sta
     user_id=FAKE_USER.id,
     amount=1,
     description="sample",
-    date="2025-12-19"
+    date="2025-12-19",
+    idempotency_key=None
   )
 
 
@@ -427,6 +431,7 @@ def test_update_expense_negative_inputs_error(client, app, monkeypatch, json, st
   [
     (ValueError(), 400),
     (Exception(), 500),
+    (DatabaseBusyError("database is locked"), 503),
   ]
 )
 def test_update_expense_exception_error(client, app, monkeypatch, exception, status_code):
@@ -501,6 +506,7 @@ def test_delete_expense_negative_404(client, app, monkeypatch):
   [
     (ValueError(), 400),
     (Exception(), 500),
+    (DatabaseBusyError("database is locked"), 503),
   ]
 )
 def test_delete_expense_exceptions_error(client, app, monkeypatch, exception, status_code):
@@ -520,4 +526,317 @@ def test_delete_expense_exceptions_error(client, app, monkeypatch, exception, st
   mock_service.delete_expense.assert_called_once_with(
     101,
     FAKE_USER.id
-  )
\ No newline at end of file
+  )
+
+def test_get_expense_list_fields_projection(client, app, monkeypatch):
+  monkeypatch.setattr(
+    expense_controller,
+    "get_current_user",
+    lambda: FAKE_USER
+  )
+
+  mock_service = MagicMock()
+  mock_service.select_fields.return_value = ("id", "amount", "status")
+  mock_service.get_expense_history_fields.return_value = [
+    {"id": 101, "amount": 100.1, "status": "pending"}
+  ]
+  app.expense_service = mock_service
+
+  response = client.get(f"{BASE_ROUTE}?fields=amount,status")
+
+  assert response.status_code == 200
+  data = response.get_json()
+  assert data["count"] == 1
+  assert data["expenses"][0] == {"id": 101, "amount": 100.1, "status": "pending"}
+  mock_service.select_fields.assert_called_once_with("amount,status")
+  mock_service.get_expense_history_fields.assert_called_once_with(
+    user_id=FAKE_USER.id,
+    fields=("id", "amount", "status"),
+    status_filter=None
+  )
+  mock_service.get_expense_history.assert_not_called()
+
+def test_get_expense_list_unknown_field_400(client, app, monkeypatch):
+  monkeypatch.setattr(
+    expense_controller,
+    "get_current_user",
+    lambda: FAKE_USER
+  )
+
+  mock_service = MagicMock()
+  mock_service.select_fields.side_effect = ValueError("Unknown field(s): password")
+  app.expense_service = mock_service
+
+  response = client.get(f"{BASE_ROUTE}?fields=password")
+
+  assert response.status_code == 400
+  assert response.get_json()["error"] == "Unknown field(s): password"
+  mock_service.get_expense_history_fields.assert_not_called()
+
+@pytest.mark.parametrize(
+  "expense_data, status_code",
+  [
+    ({"id": 101, "amount": 100.1}, 200),
+    (None, 404),
+  ]
+)
+def test_get_expense_fields_projection(client, app, monkeypatch, expense_data, status_code):
+  monkeypatch.setattr(
+    expense_controller,
+    "get_current_user",
+    lambda: FAKE_USER
+  )
+
+  mock_service = MagicMock()
+  mock_service.select_fields.return_value = ("id", "amount")
+  mock_service.get_expense_fields.return_value = expense_data
+  app.expense_service = mock_service
+
+  response = client.get(f"{BASE_ROUTE}/101?fields=amount")
+
+  assert response.status_code == status_code
+  if expense_data:
+    assert response.get_json()["expense"] == expense_data
+  mock_service.get_expense_fields.assert_called_once_with(101, FAKE_USER.id, ("id", "amount"))
+  mock_service.get_expense_with_status.assert_not_called()
+
+def test_get_expense_list_batch_ids(client, app, monkeypatch):
+  monkeypatch.setattr(
+    expense_controller,
+    "get_current_user",
+    lambda: FAKE_USER
+  )
+
+  mock_service = MagicMock()
+  mock_service.get_expenses_by_ids.return_value = ([{"id": 2, "amount": 5.0}], [7])
+  app.expense_service = mock_service
+
+  response = client.get(f"{BASE_ROUTE}?ids=2,7")
+
+  assert response.status_code == 200
+  data = response.get_json()
+  assert data["expenses"] == [{"id": 2, "amount": 5.0}]
+  assert data["count"] == 1
+  assert data["not_found"] == [7]
+  mock_service.get_expenses_by_ids.assert_called_once_with(
+    expense_ids=[2, 7],
+    user_id=FAKE_USER.id,
+    fields=None
+  )
+  mock_service.get_expense_history.assert_not_called()
+
+@pytest.mark.parametrize(
+  "ids, side_effect",
+  [
+    ("1,two", None),
+    ("1,2", ValueError("At most 100 expense ids can be requested at once")),
+  ]
+)
+def test_get_expense_list_batch_ids_400(client, app, monkeypatch, ids, side_effect):
+  monkeypatch.setattr(
+    expense_controller,
+    "get_current_user",
+    lambda: FAKE_USER
+  )
+
+  mock_service = MagicMock()
+  mock_service.get_expenses_by_ids.side_effect = side_effect
+  app.expense_service = mock_service
+
+  response = client.get(f"{BASE_ROUTE}?ids={ids}")
+
+  assert response.status_code == 400
+
+def test_get_expense_changes_200(client, app, monkeypatch):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+
+  mock_service = MagicMock()
+  mock_service.get_changes.return_value = {"version": 7, "expenses": [{"id": 1}], "deleted": [2]}
+  app.expense_service = mock_service
+
+  response = client.get(f"{BASE_ROUTE}/changes?since=3")
+
+  assert response.status_code == 200
+  assert response.get_json() == {"version": 7, "expenses": [{"id": 1}], "deleted": [2]}
+  mock_service.get_changes.assert_called_once_with(FAKE_USER.id, 3)
+
+def test_search_expenses_200(client, app, monkeypatch):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+
+  results = {"expenses": [{"id": 1}], "count": 1, "limit": 5, "offset": 10, "next_offset": None}
+  mock_service = MagicMock()
+  mock_service.select_fields.return_value = ("id",)
+  mock_service.search_expenses.return_value = results
+  app.expense_service = mock_service
+
+  response = client.get(f"{BASE_ROUTE}/search?q=lunch&limit=5&offset=10&fields=id")
+
+  assert response.status_code == 200
+  assert response.get_json() == results
+  mock_service.search_expenses.assert_called_once_with(FAKE_USER.id, "lunch", limit=5, offset=10, fields=("id",))
+
+@pytest.mark.parametrize("query", ["q=lunch&limit=x", "q=lunch&offset=1.5"])
+def test_search_expenses_non_integer_paging_400(client, app, monkeypatch, query):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+  app.expense_service = MagicMock()
+
+  response = client.get(f"{BASE_ROUTE}/search?{query}")
+
+  assert response.status_code == 400
+  app.expense_service.search_expenses.assert_not_called()
+
+def test_search_expenses_invalid_query_400(client, app, monkeypatch):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+  app.expense_service = MagicMock()
+  app.expense_service.search_expenses.side_effect = ValueError("Search query must contain at least one word")
+
+  response = client.get(f"{BASE_ROUTE}/search?q=")
+
+  assert response.status_code == 400
+  assert response.get_json()["error"] == "Search query must contain at least one word"
+
+@pytest.mark.parametrize("query, criteria", [
+  ("month=2025-01", {"status": None, "date_from": None, "date_to": None, "month": "2025-01",
+                     "min_amount": None, "max_amount": None, "sort": None}),
+  ("status=pending,denied&sort=-amount", {"status": "pending,denied", "date_from": None, "date_to": None,
+                                          "month": None, "min_amount": None, "max_amount": None,
+                                          "sort": "-amount"}),
+])
+def test_get_expenses_with_filter_200(client, app, monkeypatch, query, criteria):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+
+  mock_service = MagicMock()
+  mock_service.filter_expenses.return_value = [{"id": 1, "amount": 50.0}]
+  app.expense_service = mock_service
+
+  response = client.get(f"{BASE_ROUTE}?{query}")
+
+  assert response.status_code == 200
+  assert response.get_json() == {"expenses": [{"id": 1, "amount": 50.0}], "count": 1}
+  mock_service.build_expense_filter.assert_called_once_with(**criteria)
+  mock_service.filter_expenses.assert_called_once_with(
+    FAKE_USER.id, mock_service.build_expense_filter.return_value, None)
+  mock_service.get_expense_history.assert_not_called()
+
+def test_get_expenses_with_invalid_filter_400(client, app, monkeypatch):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+  app.expense_service = MagicMock()
+  app.expense_service.build_expense_filter.side_effect = ValueError("sort must be one of: date, -date, amount, -amount")
+
+  response = client.get(f"{BASE_ROUTE}?sort=description")
+
+  assert response.status_code == 400
+  assert response.get_json()["error"] == "sort must be one of: date, -date, amount, -amount"
+  app.expense_service.filter_expenses.assert_not_called()
+
+def test_get_expenses_single_status_keeps_history_path(client, app, monkeypatch):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+  app.expense_service = MagicMock()
+  app.expense_service.get_expense_history.return_value = []
+
+  response = client.get(f"{BASE_ROUTE}?status=pending")
+
+  assert response.status_code == 200
+  app.expense_service.get_expense_history.assert_called_once_with(user_id=FAKE_USER.id, status_filter="pending")
+  app.expense_service.filter_expenses.assert_not_called()
+
+def test_get_expenses_shared_query_timeout_504(client, app, monkeypatch):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+  app.expense_service = MagicMock()
+  # Raised to a request that waited on another request's coalesced query; its own deadline never fired
+  app.expense_service.filter_expenses.side_effect = QueryTimeoutError("read query exceeded its 2000ms budget")
+
+  response = client.get(f"{BASE_ROUTE}?sort=-amount")
+
+  assert response.status_code == 504
+  assert response.headers["Retry-After"] == "1"
+  assert response.get_json()["error"] == "Request took too long, please retry"
+
+def test_get_expense_summary_200(client, app, monkeypatch):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+
+  summary = {"overall": {"count": 1, "total": 5.0}, "by_status": {"pending": {"count": 1, "total": 5.0}},
+             "by_month": {"2025-01": {"count": 1, "total": 5.0}}}
+  mock_service = MagicMock()
+  mock_service.get_summary.return_value = summary
+  app.expense_service = mock_service
+
+  response = client.get(f"{BASE_ROUTE}/summary")
+
+  assert response.status_code == 200
+  assert response.get_json() == summary
+  mock_service.get_summary.assert_called_once_with(FAKE_USER.id)
+
+def test_get_expense_summary_exception_500(client, app, monkeypatch):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+  app.expense_service = MagicMock()
+  app.expense_service.get_summary.side_effect = Exception
+
+  response = client.get(f"{BASE_ROUTE}/summary")
+
+  assert response.status_code == 500
+
+@pytest.mark.parametrize("since", ["abc", "1.5"])
+def test_get_expense_changes_non_integer_since_400(client, app, monkeypatch, since):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+  app.expense_service = MagicMock()
+
+  response = client.get(f"{BASE_ROUTE}/changes?since={since}")
+
+  assert response.status_code == 400
+  app.expense_service.get_changes.assert_not_called()
+
+def test_stream_expense_events_sends_ready_backlog_and_heartbeat(client, app, monkeypatch):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+
+  mock_service = MagicMock()
+  mock_service.get_status_changes.return_value = (7, [{"id": 1, "status": "approved", "comment": None, "review_date": None}])
+  app.expense_service = mock_service
+  notifier = MagicMock()
+  notifier.count.return_value = 0
+  notifier.wait.return_value = 0
+  app.change_notifier = notifier
+  app.config["EVENTS_HEARTBEAT_SECONDS"] = 0.01
+
+  response = client.get(f"{BASE_ROUTE}/events", headers={"Last-Event-ID": "5"})
+  chunks = iter(response.response)
+  # retry, ready, one status change, then a heartbeat once nothing else arrives
+  body = "".join(next(chunks).decode() for _ in range(4))
+  response.close()
+
+  assert response.status_code == 200
+  assert response.mimetype == "text/event-stream"
+  assert 'id: 7\nevent: ready\ndata: {"version": 7}' in body
+  assert 'event: status\ndata: {"id": 1, "status": "approved"' in body
+  assert ": heartbeat" in body
+  mock_service.get_status_changes.assert_called_once_with(FAKE_USER.id, 5)
+
+@pytest.mark.parametrize("last_event_id", ["abc", "-3"])
+def test_stream_expense_events_bad_last_event_id_400(client, app, monkeypatch, last_event_id):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+  app.expense_service = MagicMock()
+  app.change_notifier = MagicMock()
+
+  response = client.get(f"{BASE_ROUTE}/events", headers={"Last-Event-ID": last_event_id})
+
+  assert response.status_code == 400
+
+@pytest.mark.parametrize(
+  "exception, status_code",
+  [
+    (IdempotencyKeyInUse("in progress"), 409),
+    (IdempotencyKeyMismatch("different request"), 422),
+  ]
+)
+def test_submit_expense_idempotency_errors(client, app, monkeypatch, exception, status_code):
+  monkeypatch.setattr(expense_controller, "get_current_user", lambda: FAKE_USER)
+
+  mock_service = MagicMock()
+  mock_service.submit_expense.side_effect = exception
+  app.expense_service = mock_service
+
+  response = client.post(BASE_ROUTE, json={"amount": 1, "description": "sample", "date": "2025-12-19"},
+                         headers={"Idempotency-Key": "abc"})
+
+  assert response.status_code == status_code
+  assert mock_service.submit_expense.call_args.kwargs["idempotency_key"] == "abc"
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+
+import pytest
+from flask import Blueprint, Flask, jsonify
+
+from src.api import init_load_shedding
+from src.api.load_shedding import AdaptiveLimiter
+from src.monitoring import REGISTRY, init_server_timing, timed
+
+
+@pytest.fixture
+def gate():
+  return threading.Event()
+
+@pytest.fixture
+def app(monkeypatch, gate):
+  monkeypatch.setenv("LIMIT_READ_INITIAL", "1")
+  monkeypatch.setenv("LIMIT_WRITE_INITIAL", "1")
+  monkeypatch.setenv("LIMIT_QUEUE_TIMEOUT_MS", "20")
+  monkeypatch.setenv("LIMIT_RETRY_AFTER", "2")
+
+  app = Flask(__name__)
+  app.testing = True
+  init_server_timing(app)
+  bp = Blueprint("expense", __name__, url_prefix="/api/expenses")
+
+  @bp.route("", methods=["GET", "POST"])
+  def expenses():
+    gate.wait(5)
+    return jsonify({"ok": True})
+
+  @bp.route("/slow-db")
+  def slow_db():
+    with timed("db"):
+      time.sleep(0.06)
+    return jsonify({"ok": True})
+
+  @app.route("/health")
+  def health():
+    return {"status": "healthy"}
+
+  app.register_blueprint(bp)
+  app.limiters = init_load_shedding(app, blueprints=("expense",))
+  return app
+
+def hold_slot(app, method="GET"):
+  thread = threading.Thread(target=lambda: app.test_client().open("/api/expenses", method=method))
+  thread.start()
+  deadline = time.monotonic() + 2
+  bucket = "read" if method == "GET" else "write"
+  while app.limiters[bucket].in_flight == 0 and time.monotonic() < deadline:
+    time.sleep(0.001)
+  return thread
+
+def test_over_limit_rejected_with_retry_after(app, gate):
+  holder = hold_slot(app)
+
+  response = app.test_client().get("/api/expenses")
+  gate.set()
+  holder.join()
+
+  assert response.status_code == 503
+  assert response.headers["Retry-After"] == "2"
+  assert response.get_json() == {"error": "Server is busy, please retry"}
+
+def test_reads_and_writes_use_separate_buckets(app, gate):
+  holder = hold_slot(app, "GET")
+
+  threading.Timer(0.05, gate.set).start()
+  response = app.test_client().post("/api/expenses")
+  holder.join()
+
+  assert response.status_code == 200
+
+def test_queued_request_admitted_when_slot_frees(app, gate):
+  app.limiters["read"].max_queue = 1
+  holder = hold_slot(app)
+  threading.Timer(0.005, gate.set).start()
+
+  # Queue timeout is 20 ms; the slot frees after ~5 ms
+  response = app.test_client().get("/api/expenses")
+  holder.join()
+
+  assert response.status_code == 200
+
+def test_routes_outside_blueprints_not_limited(app, gate):
+  holder = hold_slot(app)
+
+  response = app.test_client().get("/health")
+  gate.set()
+  holder.join()
+
+  assert response.status_code == 200
+
+def test_slow_db_time_lowers_limit(app):
+  limiter = app.limiters["read"]
+  limiter.limit = 10.0
+
+  app.test_client().get("/api/expenses/slow-db")
+
+  assert limiter.limit == pytest.approx(9.0)
+  assert limiter.in_flight == 0
+
+
+class TestAdaptiveLimiter:
+
+  def test_acquire_until_limit(self):
+    limiter = AdaptiveLimiter("test", 2)
+
+    assert limiter.acquire(0) is not None
+    assert limiter.acquire(0) is not None
+    assert limiter.acquire(0) is None
+
+  def test_fast_requests_grow_limit_additively(self):
+    limiter = AdaptiveLimiter("test", 4, target_latency=0.05)
+
+    for _ in range(4):
+      limiter.release(limiter.acquire(0), latency=0.001)
+
+    assert 4.9 < limiter.limit < 5.1
+
+  def test_cut_at_most_once_per_round(self):
+    limiter = AdaptiveLimiter("test", 10, backoff=0.5, target_latency=0.05)
+    admitted = [limiter.acquire(0) for _ in range(3)]
+    time.sleep(0.001)
+
+    for started in admitted:
+      limiter.release(started, latency=1.0)
+
+    assert limiter.limit == 5.0
+
+  def test_failures_cut_limit_down_to_minimum(self):
+    limiter = AdaptiveLimiter("test", 2, min_limit=1, backoff=0.5)
+
+    for _ in range(5):
+      time.sleep(0.001)
+      limiter.release(limiter.acquire(0), latency=0.0, failed=True)
+
+    assert limiter.limit == 1
+
+  def test_limit_capped_at_max(self):
+    limiter = AdaptiveLimiter("test", 3, max_limit=3)
+
+    limiter.release(limiter.acquire(0), latency=0.0)
+
+    assert limiter.limit == 3
+
+  def test_full_queue_rejects_without_waiting(self):
+    limiter = AdaptiveLimiter("test", 1, max_queue=0)
+    limiter.acquire(0)
+
+    started = time.monotonic()
+    assert limiter.acquire(1.0) is None
+    assert time.monotonic() - started < 0.5
+
+  @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+  def test_limiter_built_before_fork_exports_gauges_from_the_child(self, monkeypatch):
+    monkeypatch.delenv("METRICS_MULTIPROC_DIR", raising=False)
+    limiter = AdaptiveLimiter("forked", 7)
+    limiter.release(limiter.acquire(0), latency=0.0)
+    read_end, write_end = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+      try:
+        os.close(read_end)
+        REGISTRY.ensure_process()  # as the child's first request does
+        limiter.acquire(0)
+        os.write(write_end, REGISTRY.render().encode())
+      finally:
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end, "rb") as pipe:
+      text = pipe.read().decode()
+    os.waitpid(pid, 0)
+
+    assert 'concurrency_limit{bucket="forked"} 7' in text
+    assert 'concurrency_in_flight{bucket="forked"} 1' in text
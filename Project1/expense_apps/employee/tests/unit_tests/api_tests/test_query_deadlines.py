@@ -0,0 +1,73 @@
+import pytest
+from flask import Blueprint, Flask, jsonify
+
+from src.api import init_query_deadlines
+from src.api.query_deadlines import route_class
+from src.repository import DatabaseConnection, QueryDeadline, QueryTimeoutError
+
+RUNAWAY_QUERY = ("WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 100000000) "
+                 "SELECT COUNT(*) FROM n")
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+  monkeypatch.setenv("QUERY_DEADLINE_READ_MS", "50")
+  monkeypatch.setenv("QUERY_DEADLINE_WRITE_MS", "0")
+  db = DatabaseConnection(str(tmp_path / "deadline.db"))
+  db.initialize_database()
+
+  app = Flask(__name__)
+  app.testing = True
+  bp = Blueprint("expense", __name__, url_prefix="/api/expenses")
+
+  @bp.route("", methods=["GET", "POST"])
+  def expenses():
+    try:
+      count = db.get_connection().execute(RUNAWAY_QUERY).fetchone()[0]
+    except Exception as e:
+      return jsonify({"error": "Failed", "details": str(e)}), 500
+    return jsonify({"count": count})
+
+  @bp.route("/fast")
+  def fast():
+    return jsonify({"count": db.get_connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]})
+
+  @bp.route("/deadline", methods=["GET", "POST"])
+  def deadline():
+    current = QueryDeadline.current()
+    return jsonify({"route_class": current.route_class if current else None})
+
+  @bp.route("/shared")
+  def shared():
+    # As a single-flight follower re-raises its leader's timeout
+    raise QueryTimeoutError("read query exceeded its 50ms budget")
+
+  app.register_blueprint(bp)
+  init_query_deadlines(app)
+  return app.test_client()
+
+
+def test_route_class():
+  assert route_class("auth", "POST") == "auth"
+  assert route_class("expense", "GET") == "read"
+  assert route_class("expense", "DELETE") == "write"
+
+def test_runaway_read_gets_504(client):
+  response = client.get("/api/expenses")
+  assert response.status_code == 504
+  assert response.headers["Retry-After"] == "1"
+
+def test_fast_read_unaffected(client):
+  response = client.get("/api/expenses/fast")
+  assert response.status_code == 200
+  assert response.get_json() == {"count": 0}
+
+def test_zero_budget_disables_deadline(client):
+  assert client.get("/api/expenses/deadline").get_json() == {"route_class": "read"}
+  assert client.post("/api/expenses/deadline").get_json() == {"route_class": None}
+
+def test_query_timeout_raised_without_own_deadline_firing_gets_504(client):
+  response = client.get("/api/expenses/shared")
+
+  assert response.status_code == 504
+  assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,83 @@
+import sqlite3
+
+import pytest
+from flask import Flask, jsonify
+
+from src.api import init_unit_of_work
+from src.repository import DatabaseConnection, RetryPolicy, User, UserRepository
+from src.repository import retry
+
+
+@pytest.fixture
+def db(tmp_path):
+  db = DatabaseConnection(str(tmp_path / "uow.db"))
+  db.initialize_database()
+  return db
+
+@pytest.fixture
+def client(db):
+  app = Flask(__name__)
+  app.testing = True
+  repo = UserRepository(db)
+
+  @app.route("/users", methods=["POST"])
+  def create_users():
+    repo.create(User(None, "a", "p", "Employee"))
+    repo.create(User(None, "b", "p", "Employee"))
+    return jsonify({"ok": True}), 201
+
+  @app.route("/users/invalid", methods=["POST"])
+  def invalid():
+    repo.create(User(None, "a", "p", "Employee"))
+    return jsonify({"error": "bad"}), 400
+
+  @app.route("/users/crash", methods=["POST"])
+  def crash():
+    repo.create(User(None, "a", "p", "Employee"))
+    raise RuntimeError("boom")
+
+  @app.route("/users/connections")
+  def connections():
+    return jsonify({"shared": db.get_connection() is db.get_connection()})
+
+  init_unit_of_work(app, db)
+  return app.test_client()
+
+def count_users(db):
+  conn = sqlite3.connect(db.db_path)
+  try:
+    return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+  finally:
+    conn.close()
+
+
+def test_success_commits(client, db):
+  assert client.post("/users").status_code == 201
+  assert count_users(db) == 2
+
+def test_error_response_rolls_back(client, db):
+  assert client.post("/users/invalid").status_code == 400
+  assert count_users(db) == 0
+
+def test_exception_rolls_back(client, db):
+  with pytest.raises(RuntimeError):
+    client.post("/users/crash")
+  assert count_users(db) == 0
+
+def test_request_shares_one_connection(client, db):
+  assert client.get("/users/connections").get_json() == {"shared": True}
+  assert db.get_connection() is not db.get_connection()
+
+def test_locked_database_answers_503(client, db, monkeypatch):
+  monkeypatch.setattr(retry, "_default_policy", RetryPolicy(max_attempts=2, sleep=lambda delay: None))
+  db.busy_timeout = 0
+  other = sqlite3.connect(db.db_path)
+  other.execute("BEGIN IMMEDIATE")
+  try:
+    response = client.post("/users")
+  finally:
+    other.rollback()
+    other.close()
+  assert response.status_code == 503
+  assert response.headers["Retry-After"] == "1"
+  assert count_users(db) == 0
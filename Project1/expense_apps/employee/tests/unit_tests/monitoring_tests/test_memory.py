@@ -0,0 +1,69 @@
+import sqlite3
+import tracemalloc
+
+import pytest
+
+from src.monitoring import MemoryTracker, count_live_objects
+from src.repository import Expense
+
+
+@pytest.fixture
+def tracker():
+    tracker = MemoryTracker(max_snapshots=2)
+    yield tracker
+    tracker.stop()
+
+
+def allocate_rows():
+    return [Expense(i, 1, 1.0, "row " * 10, "2024-01-01") for i in range(2000)]
+
+
+def test_take_requires_tracing(tracker):
+    with pytest.raises(RuntimeError):
+        tracker.take("before")
+
+
+def test_diff_reports_growth_by_line(tracker):
+    tracker.start()
+    before = tracker.take("before")
+    rows = allocate_rows()
+    after = tracker.take("after")
+
+    diffs = tracker.diff(before, after, limit=5)
+
+    assert diffs[0]["file"].endswith("test_memory.py")
+    assert diffs[0]["size_diff"] > 0
+    assert len(diffs) <= 5
+    assert rows
+
+
+def test_snapshots_are_bounded(tracker):
+    tracker.start()
+    for name in ("a", "b", "c"):
+        tracker.take(name)
+
+    assert tracker.status()["snapshots"] == ["b", "c"]
+    with pytest.raises(KeyError):
+        tracker.get("a")
+
+
+def test_stop_clears_snapshots(tracker):
+    tracker.start()
+    tracker.take("a")
+
+    tracker.stop()
+
+    assert not tracemalloc.is_tracing()
+    assert tracker.status()["snapshots"] == []
+
+
+def test_count_live_objects():
+    rows = allocate_rows()[:3]
+    conn = sqlite3.connect(":memory:")
+
+    counts = count_live_objects({"Expense": Expense, "sqlite3.Connection": sqlite3.Connection})
+
+    assert counts["Expense"] >= 3
+    assert counts["sqlite3.Connection"] >= 1
+    conn.close()
+    assert rows
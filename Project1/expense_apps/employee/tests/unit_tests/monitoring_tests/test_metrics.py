@@ -0,0 +1,197 @@
+import json
+import os
+
+import pytest
+from flask import Blueprint, Flask, jsonify
+
+from src.monitoring import MetricsRegistry, init_metrics
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.delenv("METRICS_MULTIPROC_DIR", raising=False)
+    return MetricsRegistry()
+
+
+@pytest.fixture
+def app(registry):
+    app = Flask(__name__)
+    init_metrics(app, registry)
+    bp = Blueprint("expense", __name__, url_prefix="/api/expenses")
+
+    @bp.route("/<int:expense_id>")
+    def get_expense(expense_id):
+        return jsonify({"id": expense_id})
+
+    @bp.route("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    app.register_blueprint(bp)
+    return app
+
+
+def test_counter_and_gauge_render_with_labels(registry):
+    counter = registry.counter("jobs_total", "Jobs run.", ("kind",))
+    gauge = registry.gauge("queue_depth", "Queued jobs.")
+    counter.labels("import").inc()
+    counter.labels("import").inc(2)
+    gauge.set(4)
+    gauge.dec()
+
+    text = registry.render()
+
+    assert "# TYPE jobs_total counter" in text
+    assert 'jobs_total{kind="import"} 3' in text
+    assert "queue_depth 3" in text
+
+
+def test_histogram_renders_cumulative_buckets(registry):
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    text = registry.render()
+
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_sum 5.55" in text
+    assert "latency_seconds_count 3" in text
+
+
+def test_labels_must_match_label_names(registry):
+    counter = registry.counter("jobs_total", "Jobs run.", ("kind",))
+
+    with pytest.raises(ValueError):
+        counter.labels("import", "extra")
+
+
+def test_registering_same_name_returns_existing_metric(registry):
+    first = registry.counter("jobs_total", "Jobs run.")
+
+    assert registry.counter("jobs_total", "Jobs run.") is first
+
+
+def test_collectors_run_before_render(registry):
+    gauge = registry.gauge("cache_entries", "Entries.")
+    registry.register_collector(lambda: gauge.set(7))
+
+    assert "cache_entries 7" in registry.render()
+
+
+def test_multiprocess_render_merges_worker_files(registry, monkeypatch, tmp_path):
+    monkeypatch.setenv("METRICS_MULTIPROC_DIR", str(tmp_path))
+    counter = registry.counter("jobs_total", "Jobs run.")
+    gauge = registry.gauge("busy", "Busy workers.")
+    counter.inc(2)
+    gauge.set(1)
+
+    other = {
+        "jobs_total": {"type": "counter", "help": "Jobs run.", "labelnames": [], "buckets": [],
+                       "samples": [[[], 5]]},
+        "busy": {"type": "gauge", "help": "Busy workers.", "labelnames": [], "buckets": [],
+                 "samples": [[[], 1]]}
+    }
+    dead_pid = 2 ** 22 + 1
+    (tmp_path / f"metrics_{os.getppid()}.json").write_text(json.dumps(other))
+    (tmp_path / f"metrics_{dead_pid}.json").write_text(json.dumps(other))
+
+    text = registry.render()
+
+    # Counters keep the totals of exited workers; gauges only count live ones
+    assert "jobs_total 12" in text
+    assert "busy 2" in text
+
+
+def test_flush_writes_process_file(registry, monkeypatch, tmp_path):
+    monkeypatch.setenv("METRICS_MULTIPROC_DIR", str(tmp_path))
+    registry.counter("jobs_total", "Jobs run.").inc()
+
+    registry.flush()
+
+    snapshot = json.loads((tmp_path / f"metrics_{os.getpid()}.json").read_text())
+    assert snapshot["jobs_total"]["samples"] == [[[], 1.0]]
+
+
+def test_ensure_process_resets_values_inherited_from_parent(registry):
+    counter = registry.counter("jobs_total", "Jobs run.")
+    counter.inc(3)
+    registry._pid = -1  # as if this process were forked from another
+
+    registry.ensure_process()
+
+    assert "jobs_total 3" not in registry.render()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_handles_taken_before_fork_still_report_from_the_child(app, registry):
+    hits = registry.counter("cache_requests_total", "Cache lookups.", ("result",)).labels("hit")
+    limit = registry.gauge("concurrency_limit", "Current limit.").labels()
+    hits.inc(5)
+    limit.set(8)
+    read_end, write_end = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_end)
+            client = app.test_client()
+            client.get("/api/expenses/1")  # the child's first request resets what it inherited
+            hits.inc()
+            limit.set(6)
+            text = client.get("/metrics").get_data()
+            os.write(write_end, text)
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end, "rb") as pipe:
+        text = pipe.read().decode()
+    os.waitpid(pid, 0)
+
+    # The child reports its own values only, through the handles it inherited
+    assert 'cache_requests_total{result="hit"} 1' in text
+    assert "concurrency_limit 6" in text
+
+
+def test_requests_are_recorded_per_blueprint_route(app):
+    client = app.test_client()
+    client.get("/api/expenses/1")
+    client.get("/api/expenses/2")
+
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert ('http_requests_total{blueprint="expense",route="/api/expenses/<int:expense_id>",'
+            'method="GET",status="200"} 2') in text
+    assert ('http_request_duration_seconds_count{blueprint="expense",'
+            'route="/api/expenses/<int:expense_id>",method="GET"} 2') in text
+    assert "http_requests_in_flight 1" in text  # the /metrics request itself
+
+
+def test_unhandled_errors_count_as_500(app):
+    client = app.test_client()
+    client.get("/api/expenses/boom")
+
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert ('http_request_errors_total{blueprint="expense",route="/api/expenses/boom",'
+            'method="GET"} 1') in text
+    assert 'status="500"} 1' in text
+
+
+def test_unmatched_routes_share_one_label(app):
+    client = app.test_client()
+    client.get("/nope")
+    client.get("/also-nope")
+
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert 'http_requests_total{blueprint="app",route="unmatched",method="GET",status="404"} 2' in text
+
+
+def test_metrics_endpoint_uses_prometheus_content_type(app):
+    response = app.test_client().get("/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
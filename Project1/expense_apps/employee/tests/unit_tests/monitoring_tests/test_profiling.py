@@ -0,0 +1,122 @@
+import cProfile
+import os
+import pstats
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from src.monitoring import init_request_profiling, sign_profile_request
+from src.monitoring.profiling import ProfileWriter, collapsed_stacks, verify_profile_request
+
+SECRET = "profile-secret"
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["SECRET_KEY"] = "app-secret"
+    init_request_profiling(app)
+
+    @app.route("/api/expenses/<int:expense_id>")
+    def get_expense(expense_id):
+        return jsonify({"id": expense_id, "total": slow_sum()})
+
+    return app
+
+
+def slow_sum():
+    return sum(range(20000))
+
+
+@pytest.fixture
+def profile_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("PROFILE_REQUESTS_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_SECRET", SECRET)
+    return tmp_path
+
+
+def test_disabled_registers_no_hooks(monkeypatch):
+    monkeypatch.delenv("PROFILE_REQUESTS_DIR", raising=False)
+    app = make_app()
+
+    assert not app.before_request_funcs
+    assert not app.after_request_funcs
+
+
+def test_missing_secret_registers_no_hooks(profile_dir, monkeypatch):
+    monkeypatch.delenv("PROFILE_SECRET")
+    app = make_app()
+    header = sign_profile_request("app-secret", "GET", "/api/expenses/7")
+
+    response = app.test_client().get("/api/expenses/7", headers={"X-Profile-Request": header})
+
+    assert not app.before_request_funcs
+    assert "X-Profile-Id" not in response.headers
+    assert not os.listdir(profile_dir)
+
+
+def test_signed_request_writes_pstats_and_collapsed_files(profile_dir):
+    client = make_app().test_client()
+    header = sign_profile_request(SECRET, "GET", "/api/expenses/7")
+
+    response = client.get("/api/expenses/7", headers={"X-Profile-Request": header})
+
+    profile_id = response.headers["X-Profile-Id"]
+    assert "_GET_api_expenses_int_expense_id_" in profile_id
+    assert profile_id.endswith("ms")
+    pstats.Stats(str(profile_dir / f"{profile_id}.pstats"))
+    collapsed = (profile_dir / f"{profile_id}.collapsed").read_text()
+    assert "slow_sum (test_profiling.py" in collapsed
+
+
+@pytest.mark.parametrize("header", [
+    "not-a-signature",
+    sign_profile_request("wrong-secret", "GET", "/api/expenses/7"),
+    sign_profile_request(SECRET, "GET", "/api/expenses/8"),
+    sign_profile_request(SECRET, "DELETE", "/api/expenses/7"),
+])
+def test_invalid_signature_is_not_profiled(profile_dir, header):
+    response = make_app().test_client().get("/api/expenses/7", headers={"X-Profile-Request": header})
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert list(profile_dir.iterdir()) == []
+
+
+def test_unsigned_request_is_not_profiled(profile_dir):
+    response = make_app().test_client().get("/api/expenses/7")
+
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_expired_signature_rejected():
+    header = sign_profile_request(SECRET, "GET", "/x", timestamp=1000)
+
+    assert verify_profile_request(SECRET, header, "GET", "/x", now=1000 + 60)
+    assert not verify_profile_request(SECRET, header, "GET", "/x", now=1000 + 3600)
+
+
+def test_writer_keeps_newest_profiles(tmp_path):
+    writer = ProfileWriter(str(tmp_path), keep=2)
+    names = []
+    for _ in range(3):
+        profiler = cProfile.Profile()
+        profiler.runcall(slow_sum)
+        names.append(writer.write(profiler, "GET", "/api/expenses", 1.0))
+        time.sleep(0.001)
+
+    remaining = sorted(os.listdir(tmp_path))
+    assert remaining == sorted(f"{name}{suffix}" for name in names[1:] for suffix in (".collapsed", ".pstats"))
+
+
+def test_collapsed_stacks_nest_callees_under_callers():
+    def outer():
+        return slow_sum()
+
+    profiler = cProfile.Profile()
+    profiler.runcall(outer)
+
+    stacks = collapsed_stacks(pstats.Stats(profiler))
+
+    assert any(stack.startswith("outer (") and ";slow_sum (" in stack for stack in stacks)
+    assert all(weight > 0 for weight in stacks.values())
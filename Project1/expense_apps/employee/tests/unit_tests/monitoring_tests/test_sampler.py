@@ -0,0 +1,86 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from src.monitoring import StackSampler
+from src.monitoring.sampler import collapse_frame
+
+
+def busy_until(event):
+    while not event.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def busy_thread():
+    done = threading.Event()
+    thread = threading.Thread(target=busy_until, args=(done,))
+    thread.start()
+    yield thread
+    done.set()
+    thread.join()
+
+
+def test_collapse_frame_is_root_to_leaf():
+    def inner():
+        return collapse_frame(sys._getframe())
+
+    stack = inner()
+
+    assert stack.endswith("inner (test_sampler.py:" + str(inner.__code__.co_firstlineno) + ")")
+    assert ";test_collapse_frame_is_root_to_leaf (test_sampler.py:" in stack
+
+
+def test_sample_counts_other_threads(busy_thread):
+    sampler = StackSampler(hz=100)
+    for _ in range(5):
+        sampler.sample(exclude=threading.get_ident())
+
+    stacks = sampler.collapsed(60)
+
+    busy = [count for stack, count in stacks.items() if "busy_until (test_sampler.py" in stack]
+    assert sum(busy) == 5
+    assert not any("test_sample_counts_other_threads" in stack for stack in stacks)
+
+
+def test_background_thread_samples_until_stopped(busy_thread):
+    sampler = StackSampler(hz=200)
+    sampler.ensure_started()
+    time.sleep(0.1)
+    sampler.stop()
+
+    stacks = sampler.collapsed(60)
+
+    assert any("busy_until" in stack for stack in stacks)
+    assert not any("_run (sampler.py" in stack for stack in stacks)
+
+
+def test_ensure_started_is_idempotent():
+    sampler = StackSampler(hz=10)
+    sampler.ensure_started()
+    thread = sampler._thread
+    sampler.ensure_started()
+
+    assert sampler._thread is thread
+    sampler.stop()
+
+
+def test_history_drops_old_buckets(monkeypatch):
+    sampler = StackSampler(hz=10, history_seconds=2)
+    now = [1000.0]
+    monkeypatch.setattr("src.monitoring.sampler.time.monotonic", lambda: now[0])
+
+    sampler.sample()
+    now[0] = 1005.0
+    sampler.sample()
+
+    assert len(sampler._buckets) == 1
+    now[0] = 1005.5
+    assert sum(sampler.collapsed(1).values()) == sum(sampler.collapsed(2).values())
+
+
+def test_invalid_rate_rejected():
+    with pytest.raises(ValueError):
+        StackSampler(hz=0)
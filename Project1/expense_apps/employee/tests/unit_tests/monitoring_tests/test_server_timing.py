@@ -0,0 +1,75 @@
+import logging
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from src.monitoring import init_server_timing, timed, current_timer
+from src.repository import DatabaseConnection
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.testing = True
+    init_server_timing(app)
+    db = DatabaseConnection(str(tmp_path / "timing.db"))
+
+    @app.route("/work")
+    def work():
+        with timed("auth"):
+            time.sleep(0.002)
+        with timed("service"):
+            with db.get_connection() as conn:
+                conn.execute("SELECT 1").fetchall()
+        return jsonify({"ok": True})
+
+    return app
+
+
+def parse_header(value):
+    timings = {}
+    for entry in value.split(", "):
+        name, dur = entry.split(";dur=")
+        timings[name] = float(dur)
+    return timings
+
+
+def test_server_timing_header_has_each_phase(app):
+    response = app.test_client().get("/work")
+
+    timings = parse_header(response.headers["Server-Timing"])
+    assert set(timings) == {"auth", "service", "db", "json", "total"}
+    assert timings["auth"] >= 2.0
+    assert timings["total"] >= timings["auth"] + timings["service"]
+
+
+def test_server_timing_logged_as_structured_fields(app, caplog):
+    with caplog.at_level(logging.INFO, logger="src.monitoring.server_timing"):
+        app.test_client().get("/work")
+
+    record = caplog.records[-1]
+    assert record.endpoint == "work"
+    assert record.status == 200
+    assert "db" in record.timings_ms
+
+
+def test_timed_is_noop_outside_request():
+    with timed("db"):
+        pass
+
+    assert current_timer() is None
+
+
+def test_timed_counts_nested_same_name_once(app):
+    @app.route("/nested")
+    def nested():
+        with timed("service"):
+            with timed("service"):
+                time.sleep(0.01)
+        assert current_timer().durations["service"] < 0.02
+        return "ok"
+
+    response = app.test_client().get("/nested")
+
+    assert response.status_code == 200
@@ -1,3 +1,4 @@
+import sqlite3
 import pytest
 from unittest.mock import Mock, MagicMock
 from contextlib import contextmanager
@@ -6,8 +7,9 @@ from contextlib import contextmanager
 import os
 from src.repository import approval_model, approval_repository, database, DatabaseConnection
 #sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from src.repository.approval_repository import ApprovalRepository
+from src.repository.approval_repository import ApprovalRepository, _filter_sql, _filter_params, _projection_sql
 from src.repository.approval_model import Approval
+from src.repository.expense_filter import ExpenseFilter, EXPENSE_SORTS
 from src.repository.database import DatabaseConnection
 
 @pytest.fixture
@@ -251,10 +253,194 @@ class TestUpdateApproval:
         assert result is True
 
 
+# Field projection tests
+class TestFindExpenseFields:
+    """Test cases for the projected expense queries."""
 
+    def test_find_expense_fields_for_user_selects_only_requested_columns(self, approval_repository, mock_db_connection):
+        """Test that only the projected columns are selected and returned."""
+        #Arrange
+        row = {"id": 1, "amount": 100.0}
+        cursor_mock = MagicMock()
+        cursor_mock.fetchall.return_value = [row]
+        conn_mock = MagicMock()
+        conn_mock.execute.return_value = cursor_mock
+        mock_db_connection.get_connection.return_value.__enter__.return_value = conn_mock
+        #Act
+        result = approval_repository.find_expense_fields_for_user(1, ("id", "amount"))
+        #Assert
+        sql, params = conn_mock.execute.call_args[0]
+        assert "SELECT e.id AS id, e.amount AS amount" in sql
+        assert "description" not in sql
+        assert params == (1,)
+        assert result == [{"id": 1, "amount": 100.0}]
 
+    def test_find_expense_fields_for_user_status_filter(self, approval_repository, mock_db_connection):
+        """Test that the status filter is pushed into the query."""
+        #Arrange
+        cursor_mock = MagicMock()
+        cursor_mock.fetchall.return_value = []
+        conn_mock = MagicMock()
+        conn_mock.execute.return_value = cursor_mock
+        mock_db_connection.get_connection.return_value.__enter__.return_value = conn_mock
+        #Act
+        approval_repository.find_expense_fields_for_user(1, ("id", "status"), "approved")
+        #Assert
+        sql, params = conn_mock.execute.call_args[0]
+        assert "AND e.approval_status = ?" in sql
+        assert params == (1, "approved")
 
+    @pytest.mark.parametrize(
+        "row, expected",
+        [
+            ({"id": 3, "status": "denied"}, {"id": 3, "status": "denied"}),
+            (None, None)
+        ]
+    )
+    def test_find_expense_fields_by_id(self, row, expected, approval_repository, mock_db_connection):
+        """Test finding a single projected expense scoped to the user."""
+        #Arrange
+        cursor_mock = MagicMock()
+        cursor_mock.fetchone.return_value = row
+        conn_mock = MagicMock()
+        conn_mock.execute.return_value = cursor_mock
+        mock_db_connection.get_connection.return_value.__enter__.return_value = conn_mock
+        #Act
+        result = approval_repository.find_expense_fields_by_id(3, 1, ("id", "status"))
+        #Assert
+        sql, params = conn_mock.execute.call_args[0]
+        assert "WHERE e.id = ? AND e.user_id = ?" in sql
+        assert params == (3, 1)
+        assert result == expected
 
+    def test_find_expense_fields_by_ids_single_statement(self, approval_repository, mock_db_connection):
+        """Test that all ids are passed as one JSON parameter."""
+        #Arrange
+        cursor_mock = MagicMock()
+        cursor_mock.fetchall.return_value = [{"id": 2, "amount": 5.0}]
+        conn_mock = MagicMock()
+        conn_mock.execute.return_value = cursor_mock
+        mock_db_connection.get_connection.return_value.__enter__.return_value = conn_mock
+        #Act
+        result = approval_repository.find_expense_fields_by_ids([2, 7], 1, ("id", "amount"))
+        #Assert
+        conn_mock.execute.assert_called_once()
+        sql, params = conn_mock.execute.call_args[0]
+        assert "e.id IN (SELECT value FROM json_each(?))" in sql
+        assert params == ("[2, 7]", 1)
+        assert result == [{"id": 2, "amount": 5.0}]
 
-
-
+    def test_find_expense_fields_matching_binds_filter_values(self, approval_repository, mock_db_connection):
+        """Test that filter values are bound as parameters in the statement's order."""
+        #Arrange
+        cursor_mock = MagicMock()
+        cursor_mock.fetchall.return_value = [{"id": 2, "amount": 5.0}]
+        conn_mock = MagicMock()
+        conn_mock.execute.return_value = cursor_mock
+        mock_db_connection.get_connection.return_value.__enter__.return_value = conn_mock
+        expense_filter = ExpenseFilter(date_from="2025-01-01", max_amount=100.0,
+                                       statuses=("pending", "denied"), sort="amount")
+        #Act
+        result = approval_repository.find_expense_fields_matching(1, expense_filter, ("id", "amount"))
+        #Assert
+        sql, params = conn_mock.execute.call_args[0]
+        assert "e.user_id = ? AND e.date_day >= ? AND e.amount_cents <= ? AND e.approval_status IN (?, ?)" in sql
+        assert "ORDER BY e.amount_cents, e.id" in sql
+        assert params == (1, 20089, 10000, "pending", "denied")
+        assert result == [{"id": 2, "amount": 5.0}]
+
+
+FILTER_COMBINATIONS = [
+    ExpenseFilter(date_from=date_from, date_to=date_to, min_amount=min_amount, max_amount=max_amount,
+                  statuses=statuses, sort=sort)
+    for date_from, date_to in [(None, None), ("2025-01-01", None), (None, "2025-01-31"), ("2025-01-01", "2025-01-31")]
+    for min_amount, max_amount in [(None, None), (10.0, None), (None, 100.0), (10.0, 100.0)]
+    for statuses in [(), ("pending",), ("pending", "approved", "denied")]
+    for sort in EXPENSE_SORTS
+]
+
+
+@pytest.fixture(scope="module")
+def filter_db(tmp_path_factory):
+    db = DatabaseConnection(str(tmp_path_factory.mktemp("filter") / "filter.db"))
+    db.initialize_database()
+    conn = sqlite3.connect(db.db_path)
+    conn.executemany("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (?, ?, ?, 'x', ?)",
+                     [(1, 1, 50.0, "2025-01-10"), (2, 1, 200.0, "2025-01-20"), (3, 1, 30.0, "2025-02-01"),
+                      (4, 1, 50.0, "2024-12-31"), (5, 2, 75.0, "2025-01-15")])
+    conn.executemany("INSERT INTO approvals (expense_id, status) VALUES (?, ?)",
+                     [(1, "pending"), (2, "approved"), (3, "denied"), (4, "pending"), (5, "pending")])
+    conn.commit()
+    conn.close()
+    return db
+
+
+@pytest.mark.parametrize("expense_filter", FILTER_COMBINATIONS, ids=lambda f: repr(f.shape()))
+def test_every_filter_shape_searches_expenses_by_index(filter_db, expense_filter):
+    """Every supported combination reads expenses alone through a user index, never a full scan."""
+    sql = _filter_sql(("id", "amount", "date", "status"), expense_filter.shape())
+    conn = sqlite3.connect(filter_db.db_path)
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", _filter_params(1, expense_filter))]
+    conn.close()
+
+    assert not [step for step in plan if step.startswith("SCAN")]
+    assert "approvals" not in sql
+    assert plan[0].startswith(("SEARCH e USING INDEX idx_expenses_user_list",
+                               "SEARCH e USING COVERING INDEX idx_expenses_user_list",
+                               "SEARCH e USING INDEX idx_expenses_user_cents"))
+    bounded_column = "amount" if expense_filter.min_amount or expense_filter.max_amount else "date"
+    if expense_filter.sort.lstrip("-") == bounded_column or len(_filter_params(1, expense_filter)) == 1:
+        # The sort is read off the index that serves the range, with no sorting pass
+        assert not [step for step in plan if "TEMP B-TREE" in step]
+
+def test_default_list_projection_is_answered_from_one_covering_index(filter_db):
+    sql = _projection_sql(("id", "amount", "date", "status"), "e.user_id = ?")
+    conn = sqlite3.connect(filter_db.db_path)
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", (1,))]
+    conn.close()
+
+    assert plan == ["SEARCH e USING COVERING INDEX idx_expenses_user_list (user_id=?)"]
+
+@pytest.mark.parametrize("expense_filter, expected_ids", [
+    (ExpenseFilter(), [3, 2, 1, 4]),
+    (ExpenseFilter(sort="date"), [4, 1, 2, 3]),
+    (ExpenseFilter(sort="-amount"), [2, 4, 1, 3]),
+    (ExpenseFilter(sort="amount"), [3, 1, 4, 2]),
+    (ExpenseFilter(date_from="2025-01-01", date_to="2025-01-31"), [2, 1]),
+    (ExpenseFilter(min_amount=50.0, max_amount=50.0), [1, 4]),
+    (ExpenseFilter(statuses=("approved", "denied")), [3, 2]),
+    (ExpenseFilter(date_to="2025-01-31", statuses=("pending",), sort="amount"), [1, 4]),
+])
+def test_find_expense_fields_matching_filters_and_sorts(filter_db, expense_filter, expected_ids):
+    repo = ApprovalRepository(filter_db)
+
+    rows = repo.find_expense_fields_matching(1, expense_filter, ("id",))
+
+    assert [row["id"] for row in rows] == expected_ids
+
+@pytest.mark.parametrize("expense_filter, expected_ids", [
+    (ExpenseFilter(), [3, 2, 1, 4]),
+    (ExpenseFilter(sort="date"), [4, 1, 2, 3]),
+    (ExpenseFilter(date_from="2025-01-15", date_to="2025-01-31"), [2]),
+    (ExpenseFilter(date_from="2025-01-01"), [3, 2, 1]),
+])
+def test_legacy_slash_dates_filter_and_sort_by_their_date(tmp_path, expense_filter, expected_ids):
+    """Dates stored as MM/DD/YYYY or YYYY/MM/DD by older clients are ranged like ISO ones."""
+    db = DatabaseConnection(str(tmp_path / "legacy.db"))
+    db.initialize_database()
+    conn = sqlite3.connect(db.db_path)
+    conn.executemany("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (?, 1, 10.0, 'x', ?)",
+                     [(1, "2025-01-10"), (2, "01/20/2025"), (3, "2025/02/01"), (4, "someday")])
+    conn.commit()
+    conn.close()
+
+    rows = ApprovalRepository(db).find_expense_fields_matching(1, expense_filter, ("id", "date"))
+
+    assert [row["id"] for row in rows] == expected_ids
+
+def test_filter_params_convert_to_typed_columns():
+    """Dates bind as days since 1970 and amounts as cents rounded inward."""
+    expense_filter = ExpenseFilter(date_from="1970-01-02", date_to="2025-01-31", min_amount=10.005,
+                                   max_amount=10.005, statuses=("approved",))
+
+    assert _filter_params(7, expense_filter) == (7, 1, 20119, 1001, 1000, "approved")
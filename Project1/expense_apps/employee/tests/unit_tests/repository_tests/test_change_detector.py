@@ -0,0 +1,86 @@
+import sqlite3
+
+import pytest
+
+from src.repository import DatabaseConnection, ChangeDetector, ChangeEvent
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseConnection(str(tmp_path / "changes.db"))
+    db.initialize_database()
+    return db
+
+
+def external_write(db, *statements):
+    """Commit from a separate connection, as the manager app would."""
+    conn = sqlite3.connect(db.db_path)
+    for statement in statements:
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+
+
+def test_first_poll_only_sets_baseline(db):
+    external_write(db, "INSERT INTO expenses (user_id, amount, description, date) VALUES (1, 1.0, 'a', '2025-01-01')")
+    detector = ChangeDetector(db)
+
+    assert detector.poll() == []
+    detector.close()
+
+
+def test_poll_publishes_per_user_events_for_external_commits(db):
+    external_write(db, "INSERT INTO expenses (id, user_id, amount, description, date) VALUES (1, 1, 1.0, 'a', '2025-01-01')",
+                   "INSERT INTO expenses (id, user_id, amount, description, date) VALUES (2, 2, 1.0, 'b', '2025-01-01')",
+                   "INSERT INTO approvals (expense_id, status) VALUES (1, 'pending')")
+    detector = ChangeDetector(db)
+    received = []
+    detector.subscribe(received.append)
+    detector.poll()
+
+    external_write(db, "UPDATE approvals SET status = 'approved', reviewer = 9 WHERE expense_id = 1")
+    events = detector.poll()
+
+    assert [(e.table_name, e.user_id) for e in events] == [("approvals", 1)]
+    assert received == [events]
+    detector.close()
+
+
+def test_poll_without_commits_publishes_nothing(db):
+    detector = ChangeDetector(db)
+    received = []
+    detector.subscribe(received.append)
+    detector.poll()
+
+    assert detector.poll() == []
+    assert received == []
+    detector.close()
+
+
+def test_unsubscribe_stops_delivery(db):
+    detector = ChangeDetector(db)
+    received = []
+    unsubscribe = detector.subscribe(received.append)
+    detector.poll()
+    unsubscribe()
+
+    external_write(db, "INSERT INTO expenses (user_id, amount, description, date) VALUES (3, 1.0, 'c', '2025-01-01')")
+    events = detector.poll()
+
+    assert events == [ChangeEvent("expenses", 3, events[0].version)]
+    assert received == []
+    detector.close()
+
+
+def test_database_connection_shares_one_detector(db):
+    assert db.change_detector() is db.change_detector()
+
+
+def test_commits_between_subscribe_and_first_poll_are_published(db):
+    detector = ChangeDetector(db)
+    detector.subscribe(lambda events: None)
+
+    external_write(db, "INSERT INTO expenses (user_id, amount, description, date) VALUES (4, 1.0, 'd', '2025-01-01')")
+
+    assert [(e.table_name, e.user_id) for e in detector.poll()] == [("expenses", 4)]
+    detector.close()
@@ -0,0 +1,27 @@
+import sqlite3
+
+from src.repository import DatabaseConnection, DataVersion
+
+
+def test_data_version_changes_on_commit_by_other_connection(tmp_path):
+    db = DatabaseConnection(str(tmp_path / "version.db"))
+    db.initialize_database()
+    version = DataVersion(db)
+    before = version.current()
+
+    other = sqlite3.connect(db.db_path)
+    other.execute("INSERT INTO users (username, password, role) VALUES ('u', 'p', 'Employee')")
+    other.commit()
+    other.close()
+
+    assert version.current() != before
+    version.close()
+
+
+def test_data_version_stable_without_commits(tmp_path):
+    db = DatabaseConnection(str(tmp_path / "version.db"))
+    db.initialize_database()
+    version = DataVersion(db)
+
+    assert version.current() == version.current()
+    version.close()
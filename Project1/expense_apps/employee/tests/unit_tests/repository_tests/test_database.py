@@ -1,7 +1,10 @@
 import sqlite3
+import pytest
 from unittest.mock import patch, MagicMock
 
-from src.repository import DatabaseConnection
+from src.repository import DatabaseConnection, ExpenseRepository
+from src.repository.database import TimedConnection, MIGRATIONS, _migrate_expense_approval_copy, _migrate_slash_dates, \
+  _migrate_expense_summary, _migrate_summary_months
 
 @patch("src.repository.database.sqlite3.connect")
 def test_get_connection_returns_connection(mock_sqlite_connect):
@@ -10,7 +13,7 @@ def test_get_connection_returns_connection(mock_sqlite_connect):
 
   conn = DatabaseConnection("test.db").get_connection()
 
-  mock_sqlite_connect.assert_called_once_with("test.db")
+  mock_sqlite_connect.assert_called_once_with("test.db", factory=TimedConnection, timeout=1.0)
   assert conn == connection_mock
 
 @patch("src.repository.database.DatabaseConnection.get_connection")
@@ -19,9 +22,225 @@ def test_initialize_database_commit_called(mock_get_connection):
   mock_connection.execute = MagicMock()
   mock_connection.commit = MagicMock()
 
+  mock_connection.execute.return_value.fetchone.return_value = (len(MIGRATIONS),)
   mock_get_connection.return_value.__enter__.return_value = mock_connection
 
   DatabaseConnection("test.db").initialize_database()
 
-  assert mock_connection.execute.call_count == 3
-  assert mock_connection.commit.called
\ No newline at end of file
+  # 3 tables, change_counters with its index and seed row, then BEGIN and a
+  # user_version check per migration, all of which have already run
+  assert mock_connection.execute.call_count == 6 + 2 * len(MIGRATIONS)
+  assert mock_connection.commit.called
+
+def test_migrate_upgrades_existing_database_once(tmp_path):
+  path = str(tmp_path / "old.db")
+  conn = sqlite3.connect(path)
+  conn.execute("CREATE TABLE expenses (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, amount REAL NOT NULL, "
+               "description TEXT NOT NULL, date TEXT NOT NULL)")
+  conn.execute("INSERT INTO expenses VALUES (1, 1, 5.0, 'x', '2025-01-01')")
+  conn.commit()
+
+  db = DatabaseConnection(path)
+  db.initialize_database()
+  db.initialize_database()
+
+  assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+  assert conn.execute("SELECT change_version FROM expenses WHERE id = 1").fetchone()[0] == 1
+  conn.close()
+
+def test_change_triggers_stamp_owning_user(tmp_path):
+  db = DatabaseConnection(str(tmp_path / "changes.db"))
+  db.initialize_database()
+
+  conn = sqlite3.connect(db.db_path)
+  base = conn.execute("SELECT version FROM change_counters WHERE table_name = '*'").fetchone()[0]
+  conn.execute("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (1, 7, 5.0, 'x', '2025-01-01')")
+  conn.execute("INSERT INTO approvals (expense_id, status) VALUES (1, 'pending')")
+  conn.execute("UPDATE approvals SET status = 'approved' WHERE expense_id = 1")
+  conn.commit()
+
+  rows = dict(((table, user), version) for table, user, version in
+              conn.execute("SELECT table_name, user_id, version FROM change_counters"))
+  expense_version = conn.execute("SELECT change_version FROM expenses WHERE id = 1").fetchone()[0]
+  conn.execute("DELETE FROM approvals WHERE expense_id = 1")
+  conn.execute("DELETE FROM expenses WHERE id = 1")
+  conn.commit()
+  tombstone = conn.execute("SELECT expense_id, user_id, change_version FROM expense_tombstones").fetchall()
+  conn.close()
+
+  assert rows[("*", 0)] == base + 3
+  assert rows[("expenses", 7)] == base + 1
+  assert rows[("approvals", 7)] == base + 3
+  # The approval update also stamps its expense
+  assert expense_version == base + 3
+  assert tombstone == [(1, 7, base + 5)]
+def test_summary_triggers_follow_expenses_and_approvals(tmp_path):
+  db = DatabaseConnection(str(tmp_path / "summary.db"))
+  db.initialize_database()
+  repo = ExpenseRepository(db)
+
+  conn = sqlite3.connect(db.db_path)
+  conn.execute("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (1, 7, 10.10, 'x', '2025-01-02')")
+  conn.execute("INSERT INTO approvals (expense_id, status) VALUES (1, 'pending')")
+  conn.execute("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (2, 7, 0.2, 'y', '2025-02-02')")
+  conn.execute("INSERT INTO approvals (expense_id, status) VALUES (2, 'pending')")
+  # A manager approval moves the expense between statuses; an edit moves it between months
+  conn.execute("UPDATE approvals SET status = 'approved' WHERE expense_id = 1")
+  conn.execute("UPDATE expenses SET amount = 20, date = '2025-03-01' WHERE id = 1")
+  conn.commit()
+  after_updates = repo.find_summary(7)
+  conn.execute("DELETE FROM approvals WHERE expense_id = 2")
+  conn.execute("DELETE FROM expenses WHERE id = 2")
+  conn.commit()
+  conn.close()
+
+  assert after_updates == [
+    {"status": "approved", "month": "2025-03", "expense_count": 1, "total_cents": 2000},
+    {"status": "pending", "month": "2025-02", "expense_count": 1, "total_cents": 20},
+  ]
+  assert repo.find_summary(7) == [
+    {"status": "approved", "month": "2025-03", "expense_count": 1, "total_cents": 2000},
+  ]
+  assert repo.verify_summary() == 0
+
+def test_verify_summary_reports_and_repairs_drift(tmp_path):
+  db = DatabaseConnection(str(tmp_path / "summary.db"))
+  db.initialize_database()
+  repo = ExpenseRepository(db)
+
+  conn = sqlite3.connect(db.db_path)
+  conn.execute("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (1, 7, 5.0, 'x', '2025-01-02')")
+  conn.execute("UPDATE expense_summary SET total_cents = 1")
+  conn.execute("INSERT INTO expense_summary VALUES (8, 'pending', '2024-12', 3, 300)")
+  conn.commit()
+  conn.close()
+
+  assert repo.verify_summary() == 3
+  assert repo.verify_summary(repair=True) == 3
+  assert repo.verify_summary() == 0
+  assert repo.find_summary(7) == [{"status": "pending", "month": "2025-01", "expense_count": 1, "total_cents": 500}]
+  assert repo.find_summary(8) == []
+
+def test_search_index_follows_expense_writes(tmp_path):
+  db = DatabaseConnection(str(tmp_path / "search.db"))
+  db.initialize_database()
+
+  conn = sqlite3.connect(db.db_path)
+  conn.execute("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (1, 7, 5.0, 'Client lunch', '2025-01-02')")
+  conn.execute("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (2, 7, 5.0, 'Taxi', '2025-01-02')")
+  conn.execute("UPDATE expenses SET description = 'Team dinner' WHERE id = 1")
+  conn.execute("DELETE FROM expenses WHERE id = 2")
+  conn.commit()
+
+  def matches(query):
+    return [row[0] for row in conn.execute("SELECT rowid FROM expenses_fts WHERE expenses_fts MATCH ?", (query,))]
+
+  assert matches("lunch") == []
+  assert matches("dinner") == [1]
+  assert matches("taxi") == []
+  conn.execute("INSERT INTO expenses_fts (expenses_fts) VALUES ('integrity-check')")
+  conn.close()
+
+def test_typed_columns_follow_writes_and_reject_invalid_values(tmp_path):
+  db = DatabaseConnection(str(tmp_path / "typed.db"))
+  db.initialize_database()
+
+  conn = sqlite3.connect(db.db_path)
+  conn.execute("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (1, 7, 12.345, 'x', '2025-01-02')")
+  conn.execute("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (2, 7, 5.0, 'x', 'next week')")
+  conn.execute("INSERT INTO approvals (expense_id, status) VALUES (1, 'pending')")
+  conn.execute("UPDATE approvals SET status = 'denied' WHERE expense_id = 1")
+  conn.execute("UPDATE expenses SET amount = 20.1, date = '1970-01-01' WHERE id = 1")
+
+  assert conn.execute("SELECT id, amount_cents, date_day FROM expenses ORDER BY id").fetchall() == \
+    [(1, 2010, 0), (2, 500, None)]
+  assert conn.execute("SELECT status_code FROM approvals").fetchall() == [(2,)]
+  with pytest.raises(sqlite3.IntegrityError):
+    conn.execute("UPDATE approvals SET status = 'lost' WHERE expense_id = 1")
+  with pytest.raises(sqlite3.IntegrityError):
+    conn.execute("INSERT INTO expenses (user_id, amount, description, date) VALUES (7, -1, 'x', '2025-01-02')")
+  conn.close()
+
+def test_approval_copy_on_expenses_follows_approval_writes(tmp_path):
+  db = DatabaseConnection(str(tmp_path / "copy.db"))
+  db.initialize_database()
+
+  conn = sqlite3.connect(db.db_path)
+  conn.execute("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (1, 7, 5.0, 'x', '2025-01-02')")
+  conn.execute("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (2, 7, 5.0, 'x', '2025-01-02')")
+
+  def copies():
+    return conn.execute(
+      "SELECT id, approval_status, approval_comment, approval_review_date FROM expenses ORDER BY id").fetchall()
+
+  assert copies() == [(1, "pending", None, None), (2, "pending", None, None)]
+  conn.execute("INSERT INTO approvals (expense_id, status) VALUES (1, 'pending')")
+  # As the manager app reviews it
+  conn.execute("UPDATE approvals SET status = 'denied', comment = 'No receipt', review_date = '2025-01-03' WHERE expense_id = 1")
+  assert copies() == [(1, "denied", "No receipt", "2025-01-03"), (2, "pending", None, None)]
+  conn.execute("UPDATE approvals SET expense_id = 2 WHERE expense_id = 1")
+  assert copies() == [(1, "pending", None, None), (2, "denied", "No receipt", "2025-01-03")]
+  conn.execute("DELETE FROM approvals")
+  assert copies() == [(1, "pending", None, None), (2, "pending", None, None)]
+  conn.close()
+
+def test_approval_copy_migration_backfills_existing_reviews(tmp_path):
+  db = DatabaseConnection(str(tmp_path / "backfill.db"))
+  db.initialize_database()
+  conn = sqlite3.connect(db.db_path, isolation_level=None)
+  conn.execute("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (1, 7, 5.0, 'x', '2025-01-02')")
+  conn.execute("INSERT INTO approvals (expense_id, status, comment) VALUES (1, 'approved', 'ok')")
+  # As if the review predates the copy columns
+  conn.execute("UPDATE expenses SET approval_status = 'pending', approval_comment = NULL")
+  conn.execute(f"PRAGMA user_version = {MIGRATIONS.index(_migrate_expense_approval_copy)}")
+
+  db.migrate(conn)
+
+  assert conn.execute("SELECT approval_status, approval_comment FROM expenses").fetchone() == ("approved", "ok")
+  assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+  conn.close()
+
+def test_slash_dates_get_a_day_number_and_are_backfilled(tmp_path):
+  db = DatabaseConnection(str(tmp_path / "dates.db"))
+  db.initialize_database()
+  conn = sqlite3.connect(db.db_path, isolation_level=None)
+  rows = [(1, "2025-02-01"), (2, "02/01/2025"), (3, "2025/02/01"), (4, "2025-02-01 09:30:00"), (5, "next week")]
+  conn.executemany("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (?, 7, 5.0, 'x', ?)", rows)
+  assert conn.execute("SELECT date_day FROM expenses ORDER BY id").fetchall() == \
+    [(20120,), (20120,), (20120,), (20120,), (None,)]
+
+  # As migration 6 left legacy rows: only ISO dates had a day number
+  conn.execute("UPDATE expenses SET date_day = NULL WHERE date GLOB '*/*'")
+  conn.execute(f"PRAGMA user_version = {MIGRATIONS.index(_migrate_slash_dates)}")
+
+  db.migrate(conn)
+
+  assert conn.execute("SELECT date_day FROM expenses ORDER BY id").fetchall() == \
+    [(20120,), (20120,), (20120,), (20120,), (None,)]
+  conn.execute("UPDATE expenses SET date = '12/31/2024' WHERE id = 5")
+  assert conn.execute("SELECT date, date_day FROM expenses WHERE id = 5").fetchone() == ("12/31/2024", 20088)
+  conn.close()
+
+def test_slash_dates_are_summarized_under_their_month(tmp_path):
+  db = DatabaseConnection(str(tmp_path / "months.db"))
+  db.initialize_database()
+  conn = sqlite3.connect(db.db_path, isolation_level=None)
+  rows = [(1, "2025-01-05"), (2, "01/05/2025"), (3, "2025/01/05"), (4, "next week")]
+  conn.executemany("INSERT INTO expenses (id, user_id, amount, description, date) VALUES (?, 7, 5.0, 'x', ?)", rows)
+  conn.execute("INSERT INTO approvals (expense_id, status) VALUES (2, 'approved')")
+  summary = "SELECT status, month, expense_count, total_cents FROM expense_summary ORDER BY month, status"
+  assert conn.execute(summary).fetchall() == \
+    [("approved", "2025-01", 1, 500), ("pending", "2025-01", 2, 1000), ("pending", "next we", 1, 500)]
+
+  # As migration 3 left the summary: slash dates bucketed by their first seven characters
+  _migrate_expense_summary(conn)
+  assert ("approved", "01/05/2", 1, 500) in conn.execute(summary).fetchall()
+  conn.execute(f"PRAGMA user_version = {MIGRATIONS.index(_migrate_summary_months)}")
+
+  db.migrate(conn)
+
+  assert conn.execute(summary).fetchall() == \
+    [("approved", "2025-01", 1, 500), ("pending", "2025-01", 2, 1000), ("pending", "next we", 1, 500)]
+  conn.execute("UPDATE expenses SET date = '12/31/2024' WHERE id = 2")
+  assert conn.execute(summary).fetchall()[0] == ("approved", "2024-12", 1, 500)
+  conn.close()
@@ -0,0 +1,70 @@
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+from src.repository import DatabaseExecutor
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def test_run_executes_on_pool_thread():
+    executor = DatabaseExecutor(max_workers=2)
+
+    result = asyncio.run(executor.run(lambda: threading.current_thread().name))
+
+    assert result.startswith("db")
+    executor.shutdown()
+
+
+def test_run_propagates_context_variables():
+    executor = DatabaseExecutor(max_workers=1)
+
+    async def main():
+        request_id.set("abc")
+        return await executor.run(request_id.get)
+
+    assert asyncio.run(main()) == "abc"
+    executor.shutdown()
+
+
+def test_run_bounds_concurrent_calls():
+    executor = DatabaseExecutor(max_workers=2)
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def work():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        threading.Event().wait(0.02)
+        with lock:
+            active.pop()
+
+    async def main():
+        await asyncio.gather(*(executor.run(work) for _ in range(8)))
+
+    asyncio.run(main())
+
+    assert max(peak) <= 2
+    assert executor.in_use == 0
+    assert executor.waiting == 0
+    executor.shutdown()
+
+
+def test_run_reraises_exceptions():
+    executor = DatabaseExecutor(max_workers=1)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        asyncio.run(executor.run(fail))
+    executor.shutdown()
+
+
+def test_max_workers_must_be_positive():
+    with pytest.raises(ValueError):
+        DatabaseExecutor(max_workers=0)
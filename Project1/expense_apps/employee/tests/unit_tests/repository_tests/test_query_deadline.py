@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+from src.repository import DatabaseConnection, QueryDeadline, QueryTimeoutError
+
+# Counts far enough to run for many seconds unless interrupted
+RUNAWAY_QUERY = ("WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 100000000) "
+                 "SELECT COUNT(*) FROM n")
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseConnection(str(tmp_path / "deadline.db"))
+    db.initialize_database()
+    return db
+
+
+def test_runaway_query_is_aborted_at_deadline(db):
+    conn = db.get_connection()
+    with QueryDeadline(0.05, "read") as deadline:
+        with pytest.raises(QueryTimeoutError, match="read budget of 50ms"):
+            conn.execute(RUNAWAY_QUERY).fetchone()
+    assert deadline.timed_out
+    assert isinstance(QueryTimeoutError(), sqlite3.OperationalError)
+
+
+def test_query_within_budget_runs(db):
+    conn = db.get_connection()
+    with QueryDeadline(5, "read") as deadline:
+        assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+    assert not deadline.timed_out
+
+
+def test_no_deadline_outside_a_request(db):
+    conn = db.get_connection()
+    assert QueryDeadline.current() is None
+    assert conn.execute("WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 100000) "
+                        "SELECT COUNT(*) FROM n").fetchone()[0] == 100000
+
+
+def test_other_errors_pass_through_after_deadline(db):
+    conn = db.get_connection()
+    with QueryDeadline(0, "read"):
+        with pytest.raises(sqlite3.OperationalError) as error:
+            conn.execute("SELECT * FROM missing_table")
+    assert not isinstance(error.value, QueryTimeoutError)
@@ -0,0 +1,121 @@
+import sqlite3
+
+import pytest
+
+from src.repository import DatabaseBusyError, DatabaseConnection, RetryPolicy, UnitOfWork
+from src.repository.retry import is_busy_error, retry_on_busy
+
+
+def locked():
+    return sqlite3.OperationalError("database is locked")
+
+
+def test_is_busy_error_classifies_lock_errors():
+    assert is_busy_error(locked())
+    assert is_busy_error(sqlite3.OperationalError("database table is locked"))
+    assert not is_busy_error(sqlite3.OperationalError("no such table: expenses"))
+    assert not is_busy_error(ValueError("database is locked"))
+
+
+def test_is_busy_error_uses_error_code(tmp_path):
+    path = str(tmp_path / "busy.db")
+    holder = sqlite3.connect(path)
+    holder.execute("CREATE TABLE t (x)")
+    holder.execute("BEGIN IMMEDIATE")
+    other = sqlite3.connect(path, timeout=0)
+    with pytest.raises(sqlite3.OperationalError) as error:
+        other.execute("BEGIN IMMEDIATE")
+    assert is_busy_error(error.value)
+    holder.rollback()
+
+
+def test_retries_busy_until_success():
+    sleeps = []
+    calls = []
+    def fn():
+        calls.append(1)
+        if len(calls) < 3:
+            raise locked()
+        return "done"
+    policy = RetryPolicy(max_attempts=5, base_delay=0.01, max_delay=0.2, deadline=10, sleep=sleeps.append)
+
+    assert policy.run(fn, "test") == "done"
+    assert len(calls) == 3
+    assert len(sleeps) == 2
+    # Full jitter: each sleep is within its capped exponential bound
+    assert 0 <= sleeps[0] <= 0.01 and 0 <= sleeps[1] <= 0.02
+
+
+def test_backoff_is_capped():
+    policy = RetryPolicy(base_delay=0.01, max_delay=0.05)
+    assert all(policy.backoff(10) <= 0.05 for _ in range(100))
+
+
+def test_gives_up_after_max_attempts():
+    calls = []
+    def fn():
+        calls.append(1)
+        raise locked()
+    policy = RetryPolicy(max_attempts=3, deadline=10, sleep=lambda s: None)
+
+    with pytest.raises(DatabaseBusyError) as error:
+        policy.run(fn, "test")
+    assert len(calls) == 3
+    assert isinstance(error.value, sqlite3.OperationalError)
+
+
+def test_gives_up_at_deadline():
+    calls = []
+    def fn():
+        calls.append(1)
+        raise locked()
+    policy = RetryPolicy(max_attempts=100, base_delay=1, max_delay=1, deadline=0, sleep=lambda s: None)
+
+    with pytest.raises(DatabaseBusyError):
+        policy.run(fn, "test")
+    assert len(calls) == 1
+
+
+def test_other_errors_are_not_retried():
+    calls = []
+    def fn():
+        calls.append(1)
+        raise sqlite3.OperationalError("no such table: expenses")
+    policy = RetryPolicy(sleep=lambda s: None)
+
+    with pytest.raises(sqlite3.OperationalError, match="no such table"):
+        policy.run(fn, "test")
+    assert len(calls) == 1
+
+
+def test_retry_on_busy_runs_once_inside_open_unit_of_work(tmp_path):
+    db = DatabaseConnection(str(tmp_path / "busy.db"))
+    db.initialize_database()
+    calls = []
+
+    @retry_on_busy("test")
+    def write():
+        calls.append(1)
+        raise locked()
+
+    with pytest.raises(sqlite3.OperationalError):
+        with UnitOfWork(db, write=True) as unit_of_work:
+            unit_of_work.connection()
+            write()
+    assert len(calls) == 1
+
+
+def test_write_connection_begins_immediate(tmp_path):
+    db = DatabaseConnection(str(tmp_path / "busy.db"))
+    db.initialize_database()
+    db.busy_timeout = 0
+    holder = sqlite3.connect(db.db_path)
+    holder.execute("BEGIN IMMEDIATE")
+
+    conn = db.get_connection(write=True)
+    assert conn.isolation_level == "IMMEDIATE"
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("INSERT INTO users (username, password, role) VALUES ('u', 'p', 'Employee')")
+    # The failure came from BEGIN IMMEDIATE, before the insert ran
+    assert not conn.in_transaction
+    holder.rollback()
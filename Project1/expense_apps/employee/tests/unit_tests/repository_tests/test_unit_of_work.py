@@ -0,0 +1,115 @@
+import sqlite3
+
+import pytest
+
+from src.repository import (DatabaseBusyError, DatabaseConnection, RetryPolicy, UnitOfWork, User, UserRepository,
+                            run_after_commit)
+from src.repository import retry
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseConnection(str(tmp_path / "uow.db"))
+    db.initialize_database()
+    return db
+
+
+def count_users(db):
+    conn = sqlite3.connect(db.db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_repositories_share_one_connection(db):
+    with UnitOfWork(db) as unit_of_work:
+        assert db.get_connection() is db.get_connection()
+        assert unit_of_work.active
+    assert not unit_of_work.active
+    assert db.get_connection() is not db.get_connection()
+
+
+def test_commits_once_at_the_end(db):
+    repo = UserRepository(db)
+    with UnitOfWork(db, write=True):
+        repo.create(User(None, "a", "p", "Employee"))
+        repo.create(User(None, "b", "p", "Employee"))
+        # Repository commits are deferred: nothing is visible to other connections yet
+        assert count_users(db) == 0
+    assert count_users(db) == 2
+
+
+def test_rolls_back_everything_on_exception(db):
+    repo = UserRepository(db)
+    with pytest.raises(RuntimeError):
+        with UnitOfWork(db, write=True):
+            repo.create(User(None, "a", "p", "Employee"))
+            raise RuntimeError("boom")
+    assert count_users(db) == 0
+    assert UnitOfWork.current() is None
+
+
+def test_write_unit_takes_the_write_lock_up_front(db):
+    with UnitOfWork(db, write=True) as unit_of_work:
+        unit_of_work.connection()
+        other = sqlite3.connect(db.db_path, timeout=0)
+        with pytest.raises(sqlite3.OperationalError):
+            other.execute("BEGIN IMMEDIATE")
+        other.close()
+
+
+def test_no_connection_opened_when_unused(db):
+    with UnitOfWork(db, write=True) as unit_of_work:
+        pass
+    assert not unit_of_work.active
+
+
+def test_other_database_is_not_captured(db, tmp_path):
+    other = DatabaseConnection(str(tmp_path / "other.db"))
+    with UnitOfWork(db) as unit_of_work:
+        assert other.get_connection() is not unit_of_work.connection()
+
+
+def test_begin_is_retried_then_raises_busy(db, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(retry, "_default_policy", RetryPolicy(max_attempts=3, sleep=sleeps.append))
+    db.busy_timeout = 0
+    other = sqlite3.connect(db.db_path)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        with pytest.raises(DatabaseBusyError):
+            with UnitOfWork(db, write=True) as unit_of_work:
+                UserRepository(db).find_by_id(1)
+    finally:
+        other.rollback()
+        other.close()
+    assert len(sleeps) == 2
+    assert not unit_of_work.active
+
+
+def test_after_commit_callbacks_run_only_once_committed(db):
+    committed = []
+    with UnitOfWork(db, write=True) as unit_of_work:
+        UserRepository(db).create(User(None, "a", "p", "Employee"))
+        run_after_commit(lambda: committed.append(count_users(db)))
+        assert committed == []
+    assert committed == [1]
+
+
+def test_after_commit_callbacks_are_discarded_on_rollback(db):
+    committed = []
+    with pytest.raises(RuntimeError):
+        with UnitOfWork(db, write=True):
+            UserRepository(db).create(User(None, "a", "p", "Employee"))
+            run_after_commit(lambda: committed.append(True))
+            raise RuntimeError("boom")
+    assert committed == []
+
+
+def test_after_commit_runs_now_without_open_transaction(db):
+    committed = []
+    run_after_commit(lambda: committed.append(True))
+    with UnitOfWork(db, write=True):
+        run_after_commit(lambda: committed.append(True))
+        assert committed == [True, True]
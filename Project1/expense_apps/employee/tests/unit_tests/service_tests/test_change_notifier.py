@@ -0,0 +1,89 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.repository import ChangeEvent
+from src.service import ChangeNotifier
+
+
+@pytest.fixture
+def detector():
+    detector = MagicMock()
+    detector.poll.return_value = []
+    return detector
+
+
+def test_notify_counts_only_tracked_tables_and_named_users(detector):
+    notifier = ChangeNotifier(detector)
+
+    notifier.notify([ChangeEvent("approvals", 1, 5), ChangeEvent("expenses", 2, 6)])
+
+    assert notifier.count(1) == 1
+    assert notifier.count(2) == 0
+    detector.subscribe.assert_called_once_with(notifier.notify)
+
+
+def test_wait_returns_when_user_is_notified(detector):
+    notifier = ChangeNotifier(detector)
+    seen = notifier.count(1)
+    threading.Timer(0.05, notifier.notify, args=([ChangeEvent("approvals", 1, 5)],)).start()
+
+    started = time.monotonic()
+    count = notifier.wait(1, seen, timeout=5)
+
+    assert count == seen + 1
+    assert time.monotonic() - started < 1
+
+
+def test_wait_times_out_for_other_users(detector):
+    notifier = ChangeNotifier(detector)
+    notifier.notify([ChangeEvent("approvals", 2, 5)])
+
+    assert notifier.wait(1, 0, timeout=0.05) == 0
+
+
+def test_poller_runs_while_listening_and_stops_after(detector):
+    notifier = ChangeNotifier(detector, interval=0.01)
+
+    with notifier.listening():
+        time.sleep(0.1)
+        thread = notifier._thread
+        assert thread is not None and thread.is_alive()
+    thread.join(timeout=1)
+
+    assert detector.poll.call_count > 1
+    assert not thread.is_alive()
+    assert notifier._thread is None
+
+
+def test_poller_survives_poll_errors(detector):
+    detector.poll.side_effect = [Exception("database is locked")] + [[]] * 1000
+    notifier = ChangeNotifier(detector, interval=0.01)
+
+    with notifier.listening():
+        time.sleep(0.1)
+        assert notifier._thread.is_alive()
+
+    assert detector.poll.call_count > 1
+
+
+def test_try_listen_refuses_beyond_max_listeners(detector):
+    notifier = ChangeNotifier(detector, interval=0.01, max_listeners=2)
+
+    first = notifier.try_listen()
+    second = notifier.try_listen()
+    assert first is not None and second is not None
+    assert notifier.try_listen() is None
+
+    # Stopping twice frees one slot, not two
+    first()
+    first()
+    third = notifier.try_listen()
+    assert third is not None
+    assert notifier.try_listen() is None
+
+    second()
+    third()
+    assert notifier._listeners == 0
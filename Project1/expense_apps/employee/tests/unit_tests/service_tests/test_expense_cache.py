@@ -0,0 +1,166 @@
+import os
+
+import pytest
+
+from src.monitoring import REGISTRY
+from src.repository import Expense, ChangeEvent
+from src.service import ExpenseCache
+
+
+@pytest.fixture
+def cache():
+    return ExpenseCache(max_entries=3, max_bytes=1024 * 1024, ttl=60)
+
+
+def put(cache, user_id, key, value):
+    cache.put(user_id, key, value, cache.token(user_id))
+
+
+#EU-076
+def test_get_after_put_hits(cache):
+    #Arrange
+    put(cache, 1, "expenses", ["row"])
+
+    #Act
+    hit, value = cache.get(1, "expenses")
+
+    #Assert
+    assert hit is True
+    assert value == ["row"]
+
+#EU-077
+def test_get_missing_misses(cache):
+    #Act
+    hit, value = cache.get(1, "expenses")
+
+    #Assert
+    assert (hit, value) == (False, None)
+
+#EU-078
+def test_expired_entries_miss(cache, monkeypatch):
+    #Arrange
+    now = [100.0]
+    monkeypatch.setattr("src.service.expense_cache.time.monotonic", lambda: now[0])
+    put(cache, 1, "expenses", ["row"])
+
+    #Act
+    now[0] += 61
+    hit, _ = cache.get(1, "expenses")
+
+    #Assert
+    assert hit is False
+    assert len(cache) == 0
+
+#EU-079
+def test_least_recently_used_evicted_over_entry_cap(cache):
+    #Arrange
+    for user_id in (1, 2, 3):
+        put(cache, user_id, "expenses", [user_id])
+    cache.get(1, "expenses")
+
+    #Act
+    put(cache, 4, "expenses", [4])
+
+    #Assert
+    assert cache.get(2, "expenses")[0] is False
+    assert cache.get(1, "expenses")[0] is True
+    assert len(cache) == 3
+
+#EU-080
+def test_memory_cap_evicts_and_skips_oversized_values():
+    #Arrange
+    rows = [Expense(i, 1, 1.0, "description", "2025-01-01") for i in range(20)]
+    cache = ExpenseCache(max_entries=100, max_bytes=8000, ttl=60)
+
+    #Act
+    put(cache, 1, "small", rows[:5])
+    put(cache, 2, "small", rows[:5])
+    put(cache, 3, "huge", rows * 10)
+
+    #Assert
+    assert cache.bytes <= 8000
+    assert cache.get(3, "huge")[0] is False
+    assert cache.get(2, "small")[0] is True
+
+#EU-081
+def test_invalidate_user_only_drops_that_user(cache):
+    #Arrange
+    put(cache, 1, "expenses", [1])
+    put(cache, 1, ("expense", 5), "one")
+    put(cache, 2, "expenses", [2])
+
+    #Act
+    cache.invalidate_user(1)
+
+    #Assert
+    assert cache.get(1, "expenses")[0] is False
+    assert cache.get(1, ("expense", 5))[0] is False
+    assert cache.get(2, "expenses")[0] is True
+
+#EU-082
+def test_put_after_invalidation_is_discarded(cache):
+    #Arrange
+    token = cache.token(1)
+    cache.invalidate_user(1)
+
+    #Act
+    cache.put(1, "expenses", ["stale"], token)
+
+    #Assert
+    assert cache.get(1, "expenses")[0] is False
+
+#EU-083
+def test_change_events_invalidate_only_named_users():
+    #Arrange
+    class FakeChanges:
+        def subscribe(self, callback):
+            self.callback = callback
+
+        def poll(self):
+            events, self.pending = getattr(self, "pending", []), []
+            if events:
+                self.callback(events)
+
+    changes = FakeChanges()
+    cache = ExpenseCache(changes=changes)
+    put(cache, 1, "expenses", [1])
+    put(cache, 2, "expenses", [2])
+
+    #Act
+    changes.pending = [ChangeEvent("approvals", 1, 7)]
+    first = cache.get(1, "expenses")[0]
+    second = cache.get(2, "expenses")[0]
+
+    #Assert
+    assert first is False
+    assert second is True
+
+
+#EU-104
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_cache_built_before_fork_exports_hits_from_the_child(monkeypatch):
+    #Arrange
+    monkeypatch.delenv("METRICS_MULTIPROC_DIR", raising=False)
+    cache = ExpenseCache(name="forked", ttl=60)
+    put(cache, 1, "expenses", [1])
+    cache.get(1, "expenses")
+    read_end, write_end = os.pipe()
+
+    #Act
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_end)
+            REGISTRY.ensure_process()  # as the child's first request does
+            cache.get(1, "expenses")
+            cache.get(1, "expenses")
+            os.write(write_end, REGISTRY.render().encode())
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end, "rb") as pipe:
+        text = pipe.read().decode()
+    os.waitpid(pid, 0)
+
+    #Assert
+    assert 'cache_requests_total{cache="forked",result="hit"} 2' in text
@@ -1,9 +1,14 @@
+import dataclasses
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from src.repository import ExpenseRepository, Expense, ApprovalRepository, Approval
-from src.service import ExpenseService
+from src.repository import (ExpenseRepository, Expense, ApprovalRepository, Approval,
+                            DatabaseConnection, IdempotencyRepository, ExpenseFilter, EXPENSE_FIELDS,
+                            UnitOfWork)
+from src.service import ExpenseService, ExpenseCache, IdempotencyStore
 
 #Expense Repository mock
 @pytest.fixture(scope="module")
@@ -318,4 +323,469 @@ def test_get_expense_history_returns_empty_list(expense_service_test):
         result = expense_service_test.get_expense_history(1, "pending")
 
         #Assert
-        assert len(result) == 0
\ No newline at end of file
+        assert len(result) == 0
+
+#========================================================================================================
+# FIELD PROJECTION TESTS
+#========================================================================================================
+@pytest.mark.parametrize("fields, expected", [
+    ("amount,status", ("id", "amount", "status")),
+    ("status, amount ,id", ("id", "amount", "status")),
+    ("", ("id",)),
+    ("review_date,description", ("id", "description", "review_date")),
+])
+#EU-041
+def test_select_fields_returns_canonical_tuple(expense_service_test, fields, expected):
+    #Act
+    result = expense_service_test.select_fields(fields)
+
+    #Assert
+    assert result == expected
+
+#EU-042
+def test_select_fields_unknown_field_returns_exception(expense_service_test):
+    #Arrange
+    with pytest.raises(ValueError, match="Unknown field\\(s\\): password, user_id"):
+        #Act
+        expense_service_test.select_fields("amount,password,user_id")
+
+@pytest.mark.parametrize("status, expected_status", [
+    ("approved", "approved"),
+    ("bogus", None),
+    (None, None),
+])
+#EU-043
+def test_get_expense_history_fields_passes_valid_status(expense_service_test, mock_approval_repo, status, expected_status):
+    #Arrange
+    mock_approval_repo.find_expense_fields_for_user.return_value = [{"id": 1}]
+
+    #Act
+    result = expense_service_test.get_expense_history_fields(1, ("id",), status)
+
+    #Assert
+    assert result == [{"id": 1}]
+    mock_approval_repo.find_expense_fields_for_user.assert_called_with(1, ("id",), expected_status)
+
+#========================================================================================================
+# BATCH READ TESTS
+#========================================================================================================
+#EU-044
+def test_get_expenses_by_ids_returns_found_and_not_found(expense_service_test, mock_approval_repo):
+    #Arrange
+    mock_approval_repo.find_expense_fields_by_ids.return_value = [{"id": 1}, {"id": 3}]
+
+    #Act
+    found, not_found = expense_service_test.get_expenses_by_ids([3, 2, 1, 3], 1, ("id",))
+
+    #Assert
+    assert found == [{"id": 3}, {"id": 1}]
+    assert not_found == [2]
+    mock_approval_repo.find_expense_fields_by_ids.assert_called_with([3, 2, 1], 1, ("id",))
+
+@pytest.mark.parametrize("expense_ids", [
+    [],
+    list(range(101)),
+])
+#EU-045
+def test_get_expenses_by_ids_size_returns_exception(expense_service_test, expense_ids):
+    #Arrange
+    with pytest.raises(ValueError):
+        #Act
+        expense_service_test.get_expenses_by_ids(expense_ids, 1)
+
+#========================================================================================================
+# READ COALESCING TESTS
+#========================================================================================================
+#EU-070
+def test_writes_advance_data_version(mock_expense_repo, mock_approval_repo):
+    #Arrange
+    service = ExpenseService(mock_expense_repo, mock_approval_repo)
+    mock_expense_repo.create.return_value = Expense(1, 1, 10.0, "test", "2025-01-01")
+
+    #Act
+    before = service.data_version
+    service.submit_expense(1, 10.0, "test", "2025-01-01")
+
+    #Assert
+    assert service.data_version > before
+
+#EU-071
+def test_concurrent_history_reads_share_one_query(mock_expense_repo):
+    #Arrange
+    approval_repo = MagicMock(spec=ApprovalRepository)
+    service = ExpenseService(mock_expense_repo, approval_repo)
+    release = threading.Event()
+    rows = [(Expense(1, 1, 10.0, "test", "2025-01-01"), Approval(1, 1, "pending", None, None, None))]
+
+    def slow_query(user_id):
+        release.wait(5)
+        return rows
+
+    approval_repo.find_expenses_with_status_for_user.side_effect = slow_query
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(service.get_expense_history(1)))
+               for _ in range(5)]
+
+    #Act
+    for reader in readers:
+        reader.start()
+    time.sleep(0.05)
+    release.set()
+    for reader in readers:
+        reader.join()
+
+    #Assert
+    assert approval_repo.find_expenses_with_status_for_user.call_count == 1
+    assert results == [rows] * 5
+    assert service.single_flight.shared == 4
+
+#========================================================================================================
+# READ CACHE TESTS
+#========================================================================================================
+@pytest.fixture
+def cached_service():
+    expense_repo = MagicMock(spec=ExpenseRepository)
+    approval_repo = MagicMock(spec=ApprovalRepository)
+    return ExpenseService(expense_repo, approval_repo, ExpenseCache()), expense_repo, approval_repo
+
+#EU-084
+def test_cached_history_read_skips_repository(cached_service):
+    #Arrange
+    service, _, approval_repo = cached_service
+    approval_repo.find_expenses_with_status_for_user.return_value = []
+
+    #Act
+    service.get_expense_history(1)
+    service.get_expense_history(1, "pending")
+
+    #Assert
+    approval_repo.find_expenses_with_status_for_user.assert_called_once_with(1)
+
+#EU-085
+def test_submit_invalidates_users_cached_reads(cached_service):
+    #Arrange
+    service, expense_repo, approval_repo = cached_service
+    approval_repo.find_expenses_with_status_for_user.return_value = []
+    expense_repo.create.return_value = Expense(1, 1, 10.0, "test", "2025-01-01")
+    service.get_user_expenses_with_status(1)
+
+    #Act
+    service.submit_expense(1, 10.0, "test", "2025-01-01")
+    service.get_user_expenses_with_status(1)
+
+    #Assert
+    assert approval_repo.find_expenses_with_status_for_user.call_count == 2
+
+#EU-086
+def test_cached_expense_with_status_returns_copies(cached_service):
+    #Arrange
+    service, expense_repo, approval_repo = cached_service
+    expense_repo.find_by_id.return_value = Expense(1, 1, 10.0, "test", "2025-01-01")
+    approval_repo.find_by_expense_id.return_value = Approval(1, 1, "pending", None, None, None)
+    first, _ = service.get_expense_with_status(1, 1)
+
+    #Act
+    first.amount = 999.0
+    second, _ = service.get_expense_with_status(1, 1)
+
+    #Assert
+    assert second.amount == 10.0
+    expense_repo.find_by_id.assert_called_once_with(1)
+
+#EU-087
+def test_update_checks_status_against_database(cached_service):
+    #Arrange
+    service, expense_repo, approval_repo = cached_service
+    expense_repo.find_by_id.return_value = Expense(1, 1, 10.0, "test", "2025-01-01")
+    approval_repo.find_by_expense_id.return_value = Approval(1, 1, "pending", None, None, None)
+    service.get_expense_with_status(1, 1)
+    approval_repo.find_by_expense_id.return_value = Approval(1, 1, "approved", 2, None, "2025-01-02")
+
+    #Act / Assert
+    with pytest.raises(ValueError, match="Cannot edit expense that has been reviewed"):
+        service.update_expense(1, 1, 20.0, "test", "2025-01-01")
+
+#========================================================================================================
+# DELTA SYNC TESTS
+#========================================================================================================
+#EU-088
+def test_get_changes_returns_version_changed_and_deleted():
+    #Arrange
+    approval_repo = MagicMock(spec=ApprovalRepository)
+    approval_repo.find_changes_for_user.return_value = (9, [{"id": 1, "status": "approved"}], [4])
+    service = ExpenseService(MagicMock(spec=ExpenseRepository), approval_repo)
+
+    #Act
+    changes = service.get_changes(1, 5)
+
+    #Assert
+    assert changes == {"version": 9, "expenses": [{"id": 1, "status": "approved"}], "deleted": [4]}
+    approval_repo.find_changes_for_user.assert_called_once_with(1, 5)
+
+#EU-089
+def test_get_changes_negative_since_raises(expense_service_test):
+    #Act / Assert
+    with pytest.raises(ValueError, match="since must be a non-negative version"):
+        expense_service_test.get_changes(1, -1)
+
+#========================================================================================================
+# STATUS EVENT TESTS
+#========================================================================================================
+#EU-090
+def test_get_status_changes_without_since_returns_current_version_only():
+    #Arrange
+    approval_repo = MagicMock(spec=ApprovalRepository)
+    approval_repo.current_change_version.return_value = 12
+    service = ExpenseService(MagicMock(spec=ExpenseRepository), approval_repo)
+
+    #Act
+    version, changes = service.get_status_changes(1)
+
+    #Assert
+    assert (version, changes) == (12, [])
+    approval_repo.find_changes_for_user.assert_not_called()
+
+#EU-091
+def test_get_status_changes_projects_review_fields():
+    #Arrange
+    approval_repo = MagicMock(spec=ApprovalRepository)
+    approval_repo.find_changes_for_user.return_value = (
+        9, [{"id": 1, "amount": 5.0, "description": "x", "date": "2025-01-01",
+             "status": "approved", "comment": "ok", "review_date": "2025-01-02"}], [])
+    service = ExpenseService(MagicMock(spec=ExpenseRepository), approval_repo)
+
+    #Act
+    version, changes = service.get_status_changes(1, 4)
+
+    #Assert
+    assert version == 9
+    assert changes == [{"id": 1, "status": "approved", "comment": "ok", "review_date": "2025-01-02"}]
+
+#========================================================================================================
+# IDEMPOTENCY TESTS
+#========================================================================================================
+@pytest.fixture
+def idempotent_service(tmp_path):
+    db = DatabaseConnection(str(tmp_path / "idempotency.db"))
+    db.initialize_database()
+    expense_repo = MagicMock(spec=ExpenseRepository)
+    expense_repo.create.side_effect = lambda expense: dataclasses.replace(expense, id=expense_repo.create.call_count)
+    service = ExpenseService(expense_repo, MagicMock(spec=ApprovalRepository),
+                             idempotency=IdempotencyStore(IdempotencyRepository(db)))
+    return service, expense_repo
+
+#EU-092
+def test_submit_with_same_idempotency_key_creates_once(idempotent_service):
+    #Arrange
+    service, expense_repo = idempotent_service
+
+    #Act
+    first = service.submit_expense(1, 10.0, "Taxi", "2025-01-01", idempotency_key="abc")
+    retry = service.submit_expense(1, 10.0, "Taxi", "2025-01-01", idempotency_key="abc")
+
+    #Assert
+    assert retry == first
+    expense_repo.create.assert_called_once()
+
+#EU-093
+def test_failed_submit_releases_idempotency_key(idempotent_service):
+    #Arrange
+    service, expense_repo = idempotent_service
+    create = expense_repo.create.side_effect
+    expense_repo.create.side_effect = Exception("database is locked")
+
+    #Act
+    with pytest.raises(Exception, match="database is locked"):
+        service.submit_expense(1, 10.0, "Taxi", "2025-01-01", idempotency_key="abc")
+    expense_repo.create.side_effect = create
+    retried = service.submit_expense(1, 10.0, "Taxi", "2025-01-01", idempotency_key="abc")
+
+    #Assert
+    assert retried.id is not None
+    assert expense_repo.create.call_count == 2
+
+#========================================================================================================
+# SUMMARY TESTS
+#========================================================================================================
+#EU-094
+def test_get_summary_totals_by_status_and_month():
+    #Arrange
+    expense_repo = MagicMock(spec=ExpenseRepository)
+    expense_repo.find_summary.return_value = [
+        {'status': 'approved', 'month': '2025-03', 'expense_count': 2, 'total_cents': 2050},
+        {'status': 'pending', 'month': '2025-03', 'expense_count': 1, 'total_cents': 10},
+        {'status': 'pending', 'month': '2025-01', 'expense_count': 3, 'total_cents': 30000},
+    ]
+    service = ExpenseService(expense_repo, MagicMock(spec=ApprovalRepository))
+
+    #Act
+    summary = service.get_summary(1)
+
+    #Assert
+    expense_repo.find_summary.assert_called_once_with(1)
+    assert summary == {
+        'overall': {'count': 6, 'total': 320.6},
+        'by_status': {'approved': {'count': 2, 'total': 20.5}, 'pending': {'count': 4, 'total': 300.1}},
+        'by_month': {'2025-03': {'count': 3, 'total': 20.6}, '2025-01': {'count': 3, 'total': 300.0}},
+    }
+
+#EU-095
+def test_get_summary_without_expenses():
+    #Arrange
+    expense_repo = MagicMock(spec=ExpenseRepository)
+    expense_repo.find_summary.return_value = []
+    service = ExpenseService(expense_repo, MagicMock(spec=ApprovalRepository))
+
+    #Act
+    summary = service.get_summary(1)
+
+    #Assert
+    assert summary == {'overall': {'count': 0, 'total': 0.0}, 'by_status': {}, 'by_month': {}}
+
+#========================================================================================================
+# SEARCH TESTS
+#========================================================================================================
+#EU-096
+def test_search_expenses_quotes_words_and_pages():
+    #Arrange
+    approval_repo = MagicMock(spec=ApprovalRepository)
+    approval_repo.search_expense_fields.return_value = [{'id': 1}, {'id': 2}, {'id': 3}]
+    service = ExpenseService(MagicMock(spec=ExpenseRepository), approval_repo)
+
+    #Act
+    results = service.search_expenses(1, 'client "lunch" OR', limit=2, offset=4, fields=('id',))
+
+    #Assert
+    approval_repo.search_expense_fields.assert_called_once_with(1, '"client"* "lunch"* "OR"*', ('id',), 3, 4)
+    assert results == {'expenses': [{'id': 1}, {'id': 2}], 'count': 2, 'limit': 2, 'offset': 4, 'next_offset': 6}
+
+#EU-097
+def test_search_expenses_last_page_has_no_next_offset():
+    #Arrange
+    approval_repo = MagicMock(spec=ApprovalRepository)
+    approval_repo.search_expense_fields.return_value = [{'id': 1}]
+    service = ExpenseService(MagicMock(spec=ExpenseRepository), approval_repo)
+
+    #Act
+    results = service.search_expenses(1, 'taxi')
+
+    #Assert
+    assert results['next_offset'] is None
+    assert results['count'] == 1
+
+@pytest.mark.parametrize("query, limit, offset, message", [
+    ("", 20, 0, "at least one word"),
+    ("!!! ???", 20, 0, "at least one word"),
+    (" ".join(["word"] * 17), 20, 0, "at most 16 words"),
+    ("taxi", 0, 0, "limit must be between 1 and 100"),
+    ("taxi", 101, 0, "limit must be between 1 and 100"),
+    ("taxi", 20, -1, "offset must be non-negative"),
+])
+#EU-098
+def test_search_expenses_invalid_input_raises(query, limit, offset, message):
+    #Arrange
+    service = ExpenseService(MagicMock(spec=ExpenseRepository), MagicMock(spec=ApprovalRepository))
+
+    #Act / Assert
+    with pytest.raises(ValueError, match=message):
+        service.search_expenses(1, query, limit=limit, offset=offset)
+    service.approval_repository.search_expense_fields.assert_not_called()
+
+#========================================================================================================
+# FILTER TESTS
+#========================================================================================================
+#EU-099
+def test_build_expense_filter_normalises_criteria():
+    #Arrange
+    service = ExpenseService(MagicMock(spec=ExpenseRepository), MagicMock(spec=ApprovalRepository))
+
+    #Act
+    expense_filter = service.build_expense_filter(month='2024-02', min_amount='10', status='denied, pending',
+                                                  sort='-amount')
+
+    #Assert
+    assert expense_filter == ExpenseFilter(date_from='2024-02-01', date_to='2024-02-29', min_amount=10.0,
+                                           statuses=('pending', 'denied'), sort='-amount')
+    assert service.build_expense_filter() == ExpenseFilter(sort='-date')
+
+@pytest.mark.parametrize("criteria, message", [
+    ({'month': '2025-13'}, "month must be a YYYY-MM month"),
+    ({'month': '2025-01', 'date_to': '2025-01-31'}, "month cannot be combined"),
+    ({'date_from': '01/02/2025'}, "date_from must be a YYYY-MM-DD date"),
+    ({'date_from': '2025-02-01', 'date_to': '2025-01-01'}, "date_from must not be after date_to"),
+    ({'min_amount': 'ten'}, "min_amount must be a number"),
+    ({'max_amount': 'nan'}, "max_amount must be a number"),
+    ({'min_amount': '100', 'max_amount': '10'}, "min_amount must not be greater than max_amount"),
+    ({'status': 'pending,lost'}, "Unknown status"),
+    ({'sort': 'description'}, "sort must be one of"),
+])
+#EU-100
+def test_build_expense_filter_invalid_criteria_raises(criteria, message):
+    #Arrange
+    service = ExpenseService(MagicMock(spec=ExpenseRepository), MagicMock(spec=ApprovalRepository))
+
+    #Act / Assert
+    with pytest.raises(ValueError, match=message):
+        service.build_expense_filter(**criteria)
+
+#EU-101
+def test_filter_expenses_defaults_to_all_fields_and_is_cached():
+    #Arrange
+    approval_repo = MagicMock(spec=ApprovalRepository)
+    approval_repo.find_expense_fields_matching.return_value = [{'id': 1}]
+    service = ExpenseService(MagicMock(spec=ExpenseRepository), approval_repo, cache=ExpenseCache())
+    expense_filter = ExpenseFilter(date_from='2025-01-01', sort='amount')
+
+    #Act
+    first = service.filter_expenses(1, expense_filter)
+    second = service.filter_expenses(1, ExpenseFilter(date_from='2025-01-01', sort='amount'))
+
+    #Assert
+    assert first == second == [{'id': 1}]
+    approval_repo.find_expense_fields_matching.assert_called_once_with(1, expense_filter, tuple(EXPENSE_FIELDS))
+
+#EU-102
+def test_write_invalidates_cache_only_after_unit_of_work_commits(cached_service, tmp_path):
+    #Arrange
+    service, expense_repo, approval_repo = cached_service
+    approval_repo.find_expenses_with_status_for_user.return_value = []
+    expense_repo.create.return_value = Expense(1, 1, 10.0, "test", "2025-01-01")
+    service.get_user_expenses_with_status(1)
+    db = DatabaseConnection(str(tmp_path / "uow.db"))
+    db.initialize_database()
+
+    #Act
+    with UnitOfWork(db, write=True) as unit_of_work:
+        unit_of_work.connection()
+        service.submit_expense(1, 10.0, "test", "2025-01-01")
+        # A read between the write and its commit still sees the old rows
+        service.get_user_expenses_with_status(1)
+        calls_before_commit = approval_repo.find_expenses_with_status_for_user.call_count
+    service.get_user_expenses_with_status(1)
+
+    #Assert
+    assert calls_before_commit == 1
+    assert approval_repo.find_expenses_with_status_for_user.call_count == 2
+
+#EU-103
+def test_rolled_back_write_keeps_cache(cached_service, tmp_path):
+    #Arrange
+    service, expense_repo, approval_repo = cached_service
+    approval_repo.find_expenses_with_status_for_user.return_value = []
+    expense_repo.create.return_value = Expense(1, 1, 10.0, "test", "2025-01-01")
+    service.get_user_expenses_with_status(1)
+    db = DatabaseConnection(str(tmp_path / "uow.db"))
+    db.initialize_database()
+    version = service.data_version
+
+    #Act
+    with pytest.raises(RuntimeError):
+        with UnitOfWork(db, write=True) as unit_of_work:
+            unit_of_work.connection()
+            service.submit_expense(1, 10.0, "test", "2025-01-01")
+            raise RuntimeError("boom")
+    service.get_user_expenses_with_status(1)
+
+    #Assert
+    assert service.data_version == version
+    approval_repo.find_expenses_with_status_for_user.assert_called_once_with(1)
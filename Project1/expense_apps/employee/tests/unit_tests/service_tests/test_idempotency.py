@@ -0,0 +1,145 @@
+import sqlite3
+
+import pytest
+
+from src.repository import DatabaseConnection, IdempotencyRepository, RetryPolicy, UnitOfWork
+from src.repository import retry
+from src.service import IdempotencyStore, IdempotencyKeyInUse, IdempotencyKeyMismatch
+from src.service.idempotency import request_fingerprint
+
+
+@pytest.fixture
+def repository(tmp_path):
+    db = DatabaseConnection(str(tmp_path / "idempotency.db"))
+    db.initialize_database()
+    return IdempotencyRepository(db)
+
+
+@pytest.fixture
+def store(repository):
+    return IdempotencyStore(repository)
+
+
+REQUEST = request_fingerprint(10.0, "Taxi", "2025-01-01")
+RESPONSE = {"id": 5, "user_id": 1, "amount": 10.0, "description": "Taxi", "date": "2025-01-01"}
+
+
+def test_first_request_claims_key(store):
+    assert store.begin(1, "key-1", REQUEST) is None
+
+
+def test_retry_replays_stored_response(store):
+    store.begin(1, "key-1", REQUEST)
+    store.complete(1, "key-1", REQUEST, RESPONSE)
+
+    assert store.begin(1, "key-1", REQUEST) == RESPONSE
+
+
+def test_retry_on_another_worker_replays_from_database(store, repository):
+    store.begin(1, "key-1", REQUEST)
+    store.complete(1, "key-1", REQUEST, RESPONSE)
+    other_worker = IdempotencyStore(repository)
+
+    assert other_worker.begin(1, "key-1", REQUEST) == RESPONSE
+
+
+def test_keys_are_scoped_per_user(store):
+    store.begin(1, "key-1", REQUEST)
+    store.complete(1, "key-1", REQUEST, RESPONSE)
+
+    assert store.begin(2, "key-1", REQUEST) is None
+
+
+def test_retry_while_first_request_in_progress_raises(store, repository):
+    store.begin(1, "key-1", REQUEST)
+
+    with pytest.raises(IdempotencyKeyInUse):
+        IdempotencyStore(repository).begin(1, "key-1", REQUEST)
+
+
+@pytest.mark.parametrize("completed", [False, True])
+def test_key_reused_with_different_request_raises(store, completed):
+    store.begin(1, "key-1", REQUEST)
+    if completed:
+        store.complete(1, "key-1", REQUEST, RESPONSE)
+
+    with pytest.raises(IdempotencyKeyMismatch):
+        store.begin(1, "key-1", request_fingerprint(99.0, "Taxi", "2025-01-01"))
+
+
+def test_abandoned_key_can_be_claimed_again(store):
+    store.begin(1, "key-1", REQUEST)
+    store.abandon(1, "key-1")
+
+    assert store.begin(1, "key-1", REQUEST) is None
+
+
+class FailingCommitPolicy(RetryPolicy):
+    """Lets BEGIN through and fails COMMIT, as a full disk would."""
+
+    def run(self, fn, operation="default"):
+        if operation == "commit":
+            raise sqlite3.OperationalError("database or disk is full")
+        return super().run(fn, operation)
+
+
+def test_failed_commit_is_not_replayed_from_cache(store, repository, monkeypatch):
+    monkeypatch.setattr(retry, "_default_policy", FailingCommitPolicy())
+
+    with pytest.raises(sqlite3.OperationalError):
+        with UnitOfWork(repository.db_connection, write=True):
+            store.begin(1, "key-1", REQUEST)
+            store.complete(1, "key-1", REQUEST, RESPONSE)
+
+    # The claim was rolled back with the expense, so the retry runs the request again
+    assert store.begin(1, "key-1", REQUEST) is None
+
+
+def test_committed_response_is_cached(store, repository):
+    with UnitOfWork(repository.db_connection, write=True):
+        store.begin(1, "key-1", REQUEST)
+        store.complete(1, "key-1", REQUEST, RESPONSE)
+        assert store._cache == {}
+
+    assert (1, "key-1") in store._cache
+
+
+def test_expired_key_is_claimed_again(repository, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.service.idempotency.time.time", lambda: now[0])
+    store = IdempotencyStore(repository, ttl=60)
+    store.begin(1, "key-1", REQUEST)
+    store.complete(1, "key-1", REQUEST, RESPONSE)
+
+    now[0] += 61
+
+    assert store.begin(1, "key-1", REQUEST) is None
+
+
+def test_expired_keys_collected_in_batches(repository, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.service.idempotency.time.time", lambda: now[0])
+    for i in range(5):
+        repository.claim(1, f"old-{i}", REQUEST, now[0], expired_before=0, stale_before=0)
+    now[0] += 61
+    store = IdempotencyStore(repository, ttl=60, gc_interval=3600, gc_batch=2)
+
+    def remaining():
+        with repository.db_connection.get_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM idempotency_keys WHERE key LIKE 'old-%'").fetchone()[0]
+
+    store.begin(1, "new-0", REQUEST)
+    after_first = remaining()
+    store.begin(1, "new-1", REQUEST)
+    store.begin(1, "new-2", REQUEST)
+    store.begin(1, "new-3", REQUEST)
+
+    # A full batch makes the next request collect again; a partial one waits for the interval
+    assert after_first == 3
+    assert remaining() == 0
+
+
+@pytest.mark.parametrize("key", ["", "x" * 256, "bad\nkey"])
+def test_invalid_key_raises_value_error(store, key):
+    with pytest.raises(ValueError, match="Idempotency-Key"):
+        store.begin(1, key, REQUEST)
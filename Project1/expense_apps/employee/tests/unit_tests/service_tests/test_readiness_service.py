@@ -0,0 +1,143 @@
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+from src.monitoring import MetricsRegistry
+from src.repository import DatabaseConnection
+from src.service import ReadinessService, ReadinessThresholds
+
+
+@pytest.fixture
+def db_connection(tmp_path):
+    db = DatabaseConnection(str(tmp_path / "ready.db"))
+    db.initialize_database()
+    return db
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry()
+    registry.gauge("http_requests_in_flight", "In flight.")
+    registry.gauge("db_connections_open", "Open connections.")
+    registry.gauge("db_pool_waiting", "Waiting.")
+    return registry
+
+#EU-061
+def test_ready_when_database_responds(db_connection, registry):
+    #Arrange
+    service = ReadinessService(db_connection, registry=registry)
+
+    #Act
+    ready, report = service.check()
+
+    #Assert
+    assert ready is True
+    assert report["db_error"] is None
+    assert report["wal_bytes"] == 0
+    assert report["failures"] == []
+
+#EU-062
+def test_not_ready_when_database_locked(db_connection, registry):
+    #Arrange
+    locker = sqlite3.connect(db_connection.db_path)
+    locker.execute("BEGIN EXCLUSIVE")
+    service = ReadinessService(db_connection, ReadinessThresholds(max_db_latency_ms=50), registry=registry)
+
+    #Act
+    ready, report = service.check()
+    locker.rollback()
+
+    #Assert
+    assert ready is False
+    assert "locked" in report["db_error"]
+    assert report["db_latency_ms"] < 1000
+
+#EU-063
+def test_not_ready_when_database_missing(tmp_path, registry):
+    #Arrange
+    service = ReadinessService(DatabaseConnection(str(tmp_path / "missing.db")), registry=registry)
+
+    #Act
+    ready, report = service.check()
+
+    #Assert
+    assert ready is False
+    assert not (tmp_path / "missing.db").exists()
+
+#EU-064
+def test_probe_is_cached_within_interval(db_connection, registry):
+    #Arrange
+    service = ReadinessService(db_connection, interval_ms=60000, registry=registry)
+
+    #Act
+    with patch.object(service, "probe_database", wraps=service.probe_database) as probe:
+        service.check()
+        service.check()
+        service.check()
+
+    #Assert
+    assert probe.call_count == 1
+
+#EU-065
+def test_probe_refreshes_after_interval(db_connection, registry):
+    #Arrange
+    service = ReadinessService(db_connection, interval_ms=0, registry=registry)
+
+    #Act
+    with patch.object(service, "probe_database", wraps=service.probe_database) as probe:
+        service.check()
+        service.check()
+
+    #Assert
+    assert probe.call_count == 2
+
+@pytest.mark.parametrize("gauges, capacity, thresholds, failure", [
+    #EU-066
+    ({"http_requests_in_flight": 9}, 8, ReadinessThresholds(), "request threads saturated"),
+    #EU-067
+    ({"db_pool_waiting": 5}, None, ReadinessThresholds(max_queue_depth=4), "database pool queue above threshold"),
+])
+def test_not_ready_above_load_thresholds(db_connection, registry, gauges, capacity, thresholds, failure):
+    #Arrange
+    for name, value in gauges.items():
+        registry.get(name).set(value)
+    service = ReadinessService(db_connection, thresholds, capacity=capacity, registry=registry)
+
+    #Act
+    ready, report = service.check()
+
+    #Assert
+    assert ready is False
+    assert report["failures"] == [failure]
+
+#EU-068
+def test_not_ready_when_wal_too_large(db_connection, registry):
+    #Arrange
+    writer = sqlite3.connect(db_connection.db_path)
+    writer.execute("PRAGMA journal_mode=WAL")
+    writer.execute("INSERT INTO users (username, password, role) VALUES ('u', 'p', 'Employee')")
+    writer.commit()
+    service = ReadinessService(db_connection, ReadinessThresholds(max_wal_bytes=1024), registry=registry)
+
+    #Act
+    ready, report = service.check()
+    writer.close()
+
+    #Assert
+    assert ready is False
+    assert report["wal_bytes"] > 1024
+    assert report["failures"] == ["WAL size above threshold"]
+
+#EU-069
+def test_saturation_excludes_probe_request(db_connection, registry):
+    #Arrange
+    registry.get("http_requests_in_flight").set(1)
+    service = ReadinessService(db_connection, capacity=4, registry=registry)
+
+    #Act
+    ready, report = service.check()
+
+    #Assert
+    assert ready is True
+    assert report["in_flight_requests"] == 0
+    assert report["saturation"] == 0
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from src.service.single_flight import SingleFlight
+
+
+def run_concurrently(group, key, fn, count):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(group.do(key, fn)))
+               for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+#EU-072
+def test_concurrent_calls_with_same_key_run_once():
+    #Arrange
+    group = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "rows"
+
+    #Act
+    threads, results = run_concurrently(group, "key", fn, 4)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    #Assert
+    assert len(calls) == 1
+    assert sorted(results) == [("rows", False)] + [("rows", True)] * 3
+    assert group.shared == 3
+
+#EU-073
+def test_different_keys_do_not_share():
+    #Arrange
+    group = SingleFlight()
+
+    #Act
+    first = group.do("a", lambda: 1)
+    second = group.do("b", lambda: 2)
+
+    #Assert
+    assert first == (1, False)
+    assert second == (2, False)
+
+#EU-074
+def test_sequential_calls_run_again():
+    #Arrange
+    group = SingleFlight()
+    calls = []
+
+    #Act
+    group.do("key", lambda: calls.append(1))
+    group.do("key", lambda: calls.append(1))
+
+    #Assert
+    assert len(calls) == 2
+    assert group.shared == 0
+
+#EU-075
+def test_errors_propagate_to_waiting_callers():
+    #Arrange
+    group = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise RuntimeError("database is locked")
+
+    errors = []
+
+    def call():
+        try:
+            group.do("key", fn)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+
+    #Act
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    #Assert
+    assert errors == ["database is locked"] * 3
+    with pytest.raises(KeyError):
+        group._calls["key"]
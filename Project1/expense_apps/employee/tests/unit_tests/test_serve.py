@@ -0,0 +1,55 @@
+import gc
+import os
+
+import serve
+
+
+def test_parse_args_defaults_to_cpu_count_workers():
+    args = serve.parse_args([])
+
+    assert args.workers == serve.default_worker_count()
+    assert args.port == 5000
+    assert args.host == "0.0.0.0"
+
+
+def test_build_options_preloads_app_with_threaded_keepalive_workers():
+    options = serve.build_options(serve.parse_args(["--workers", "3", "--port", "5050", "--keepalive", "10"]))
+
+    assert options["bind"] == "0.0.0.0:5050"
+    assert options["workers"] == 3
+    assert options["worker_class"] == "gthread"
+    assert options["keepalive"] == 10
+    assert options["preload_app"] is True
+    assert options["pre_fork"] is serve.pre_fork
+
+
+def test_build_options_runs_at_least_one_worker():
+    options = serve.build_options(serve.parse_args(["--workers", "0"]))
+
+    assert options["workers"] == 1
+
+
+def test_pre_fork_freezes_gc():
+    try:
+        serve.pre_fork(None, None)
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+def test_prepare_metrics_dir_creates_temp_dir_when_unset(monkeypatch):
+    monkeypatch.delenv("METRICS_MULTIPROC_DIR", raising=False)
+
+    directory = serve.prepare_metrics_dir()
+
+    assert os.path.isdir(directory)
+    assert os.environ["METRICS_MULTIPROC_DIR"] == directory
+
+
+def test_prepare_metrics_dir_clears_stale_worker_files(monkeypatch, tmp_path):
+    monkeypatch.setenv("METRICS_MULTIPROC_DIR", str(tmp_path))
+    (tmp_path / "metrics_123.json").write_text("{}")
+
+    serve.prepare_metrics_dir()
+
+    assert list(tmp_path.iterdir()) == []